@@ -0,0 +1,5 @@
+"""Infrastructure shared by the link scrapers and the translation scripts.
+
+Scripts in ``scripts/links`` and ``scripts/translate`` add ``scripts/`` to
+``sys.path`` and import the helpers as ``common.<module>``.
+"""
@@ -0,0 +1,308 @@
+"""Persistent SQLite-backed HTTP response cache for the enrichment scripts.
+
+Responses are keyed by method, final request URL (including query string),
+request body and the request headers that select a representation
+(``KEY_HEADERS``), so SPARQL POSTs are cached as reliably as plain GETs and a
+JSON answer is never served for an HTML request. Each
+``CachedSession`` belongs to a *source* (``"wikidata"``, ``"pfaf"`` ...) whose
+TTL is fixed when a response is stored. GETs are cached; POSTs only for
+sessions created with ``cache_post=True`` (the SPARQL ones, whose POSTs are
+read-only queries). Streaming requests (``stream=True``) bypass the cache.
+
+Negative answers (404/410) are cached for the full source TTL, up to 30 days:
+a page that appears in the meantime is not seen until the entry expires or
+the source is cleared (``get_cache().clear("floraweb")``). The database is
+trimmed to ``max_bytes`` by dropping the least recently used entries.
+
+Requests that do reach the network are paced by the shared adaptive per-host
+limiter from ``rate_limit.py``; cache hits never wait.
+
+Environment overrides:
+
+``ENRICH_HTTP_CACHE``
+    Set to ``0``/``off``/``false`` to bypass the cache entirely.
+``ENRICH_HTTP_CACHE_PATH``
+    Alternative location of the SQLite file.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Mapping, Optional
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from .rate_limit import AdaptiveRateLimiter, get_limiter, host_of
+
+__all__ = [
+    "CachedSession",
+    "ResponseCache",
+    "SOURCE_TTLS",
+    "cache_enabled",
+    "get_cache",
+]
+
+DEFAULT_CACHE_PATH = Path(__file__).resolve().parents[1] / ".cache" / "http_cache.sqlite"
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+DAY = 24 * 60 * 60
+DEFAULT_TTL = 7 * DAY
+SOURCE_TTLS: Dict[str, float] = {
+    "inaturalist": 14 * DAY,
+    "plantarium": 30 * DAY,
+    "wikidata": 7 * DAY,
+    "pfaf": 30 * DAY,
+    "infoflora": 30 * DAY,
+    "floraweb": 30 * DAY,
+    "floraveg": 30 * DAY,
+    "mbg": 30 * DAY,
+    "duckduckgo": 1 * DAY,
+}
+
+# Negative answers (404/410) are cached too: "page does not exist" is exactly
+# what the direct-URL probes in the scrapers need to remember.
+CACHEABLE_STATUSES = frozenset({200, 203, 300, 301, 308, 404, 410})
+CACHEABLE_METHODS = frozenset({"GET"})
+# Request headers that change the response and therefore belong in the key
+KEY_HEADERS = ("accept", "accept-language", "authorization")
+_SKIPPED_HEADERS = frozenset({"set-cookie", "content-encoding", "transfer-encoding", "content-length"})
+_EVICT_EVERY = 64
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    source TEXT NOT NULL,
+    method TEXT NOT NULL,
+    url TEXT NOT NULL,
+    final_url TEXT NOT NULL,
+    status INTEGER NOT NULL,
+    reason TEXT,
+    headers TEXT NOT NULL,
+    encoding TEXT,
+    content BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    expires_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at);
+"""
+
+
+def cache_enabled() -> bool:
+    return os.environ.get("ENRICH_HTTP_CACHE", "1").strip().lower() not in {"0", "off", "false", "no"}
+
+
+def request_key(method: str, url: str, body: Optional[bytes | str],
+                headers: Optional[Mapping[str, str]] = None) -> str:
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+    digest = hashlib.sha256()
+    digest.update(method.upper().encode("ascii"))
+    digest.update(b"\0")
+    digest.update(url.encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(body or b"")
+    if headers:
+        headers = CaseInsensitiveDict(headers)
+        for name in KEY_HEADERS:
+            value = headers.get(name)
+            if value:
+                digest.update(b"\0" + name.encode("ascii") + b"=" + str(value).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class ResponseCache:
+    """Thread-safe SQLite store of serialised responses."""
+
+    def __init__(self, path: Path | str = DEFAULT_CACHE_PATH, max_bytes: int = DEFAULT_MAX_BYTES) -> None:
+        self.path = Path(path)
+        self.max_bytes = int(max_bytes)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._puts = 0
+        self._conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[dict]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT final_url, status, reason, headers, encoding, content, expires_at "
+                "FROM responses WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if row is None:
+                return None
+            if row[6] < now:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            self._conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+        final_url, status, reason, headers, encoding, content, _ = row
+        return {
+            "url": final_url,
+            "status": status,
+            "reason": reason,
+            "headers": json.loads(headers),
+            "encoding": encoding,
+            "content": bytes(content),
+        }
+
+    def put(self, key: str, source: str, method: str, url: str, response: requests.Response, ttl: float) -> None:
+        now = time.time()
+        headers = {k: v for k, v in response.headers.items() if k.lower() not in _SKIPPED_HEADERS}
+        content = response.content or b""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses "
+                "(key, source, method, url, final_url, status, reason, headers, encoding, content, size, "
+                "created_at, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    key,
+                    source,
+                    method,
+                    url,
+                    response.url or url,
+                    response.status_code,
+                    response.reason,
+                    json.dumps(headers),
+                    response.encoding,
+                    sqlite3.Binary(content),
+                    len(content),
+                    now,
+                    now + ttl,
+                    now,
+                ),
+            )
+            self._conn.commit()
+            self._puts += 1
+            if self._puts % _EVICT_EVERY == 0:
+                self._evict_locked()
+
+    def _evict_locked(self) -> None:
+        self._conn.execute("DELETE FROM responses WHERE expires_at < ?", (time.time(),))
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total > self.max_bytes:
+            excess = total - self.max_bytes
+            freed = 0
+            victims = []
+            for key, size in self._conn.execute("SELECT key, size FROM responses ORDER BY accessed_at"):
+                victims.append((key,))
+                freed += size
+                if freed >= excess:
+                    break
+            self._conn.executemany("DELETE FROM responses WHERE key = ?", victims)
+        self._conn.commit()
+
+    def evict(self) -> None:
+        """Drop expired entries and trim the store to ``max_bytes``."""
+        with self._lock:
+            self._evict_locked()
+
+    def clear(self, source: Optional[str] = None) -> None:
+        with self._lock:
+            if source is None:
+                self._conn.execute("DELETE FROM responses")
+            else:
+                self._conn.execute("DELETE FROM responses WHERE source = ?", (source,))
+            self._conn.commit()
+
+
+_shared_cache: Optional[ResponseCache] = None
+_shared_lock = threading.Lock()
+
+
+def get_cache() -> ResponseCache:
+    """Return the process-wide cache at the configured location."""
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is None:
+            path = os.environ.get("ENRICH_HTTP_CACHE_PATH") or DEFAULT_CACHE_PATH
+            _shared_cache = ResponseCache(path)
+        return _shared_cache
+
+
+def _rebuild_response(entry: dict, prepared: requests.PreparedRequest) -> requests.Response:
+    resp = requests.Response()
+    resp.status_code = entry["status"]
+    resp.reason = entry["reason"]
+    resp.headers = CaseInsensitiveDict(entry["headers"])
+    resp.encoding = entry["encoding"]
+    resp.url = entry["url"]
+    resp._content = entry["content"]
+    resp.request = prepared
+    resp.from_cache = True
+    return resp
+
+
+class CachedSession(requests.Session):
+    """``requests.Session`` that answers repeated requests from ``ResponseCache``."""
+
+    def __init__(
+        self,
+        source: str,
+        ttl: Optional[float] = None,
+        cache: Optional[ResponseCache] = None,
+        limiter: Optional[AdaptiveRateLimiter] = None,
+        cache_post: bool = False,
+    ) -> None:
+        super().__init__()
+        self.source = source
+        self.cacheable_methods = (CACHEABLE_METHODS | {"POST"}) if cache_post else CACHEABLE_METHODS
+        self.ttl = float(ttl if ttl is not None else SOURCE_TTLS.get(source, DEFAULT_TTL))
+        self._cache = cache
+        self.cache_enabled = cache_enabled()
+        self.limiter = limiter if limiter is not None else get_limiter()
+
+    @property
+    def cache(self) -> ResponseCache:
+        if self._cache is None:
+            self._cache = get_cache()
+        return self._cache
+
+    def request(self, method, url, params=None, data=None, headers=None, json=None, **kwargs):
+        method = method.upper()
+        if not self.cache_enabled or method not in self.cacheable_methods or kwargs.get("stream"):
+            return super().request(method, url, params=params, data=data, headers=headers, json=json, **kwargs)
+
+        prepared = self.prepare_request(
+            requests.Request(method, url, params=params, data=data, headers=headers, json=json)
+        )
+        key = request_key(method, prepared.url, prepared.body, prepared.headers)
+        entry = self.cache.get(key)
+        if entry is not None:
+            return _rebuild_response(entry, prepared)
+
+        response = super().request(method, url, params=params, data=data, headers=headers, json=json, **kwargs)
+        response.from_cache = False
+        if response.status_code in CACHEABLE_STATUSES:
+            self.cache.put(key, self.source, method, prepared.url, response, self.ttl)
+        return response
+
+    def send(self, request, **kwargs):
+        host = host_of(request.url)
+        self.limiter.acquire(host)
+        started = time.monotonic()
+        try:
+            response = super().send(request, **kwargs)
+        except requests.RequestException:
+            self.limiter.record(host, None)
+            raise
+        self.limiter.record(
+            host,
+            response.status_code,
+            time.monotonic() - started,
+            response.headers.get("Retry-After"),
+        )
+        return response
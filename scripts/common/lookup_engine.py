@@ -0,0 +1,114 @@
+"""Bounded-concurrency lookup engine for the link scrapers.
+
+The scrapers' ``find_*``/``search_*`` helpers are blocking ``requests`` calls.
+The engine runs them on a thread pool driven by an asyncio event loop and caps
+the number of in-flight lookups per host, so rows are resolved in parallel
+while every site still sees only a few concurrent requests.
+
+Results are delivered through ``on_result`` on the calling thread, which lets
+scripts update their tables without extra locking.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Hashable, Iterable, Mapping, Optional, Tuple
+
+__all__ = [
+    "DEFAULT_HOST_LIMIT",
+    "LookupEngine",
+    "LookupJob",
+    "run_lookups",
+]
+
+DEFAULT_HOST_LIMIT = 4
+DEFAULT_MAX_WORKERS = 16
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class LookupJob:
+    """One blocking lookup: ``func(*args)`` against ``host``."""
+
+    key: Hashable
+    host: str
+    func: Callable[..., Any]
+    args: Tuple[Any, ...] = field(default_factory=tuple)
+
+
+class LookupEngine:
+    """Run lookup jobs concurrently with a per-host concurrency cap."""
+
+    def __init__(
+        self,
+        host_limits: Optional[Mapping[str, int]] = None,
+        default_host_limit: int = DEFAULT_HOST_LIMIT,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        host_delay: float = 0.0,
+    ) -> None:
+        self.host_limits = dict(host_limits or {})
+        self.default_host_limit = max(1, int(default_host_limit))
+        self.max_workers = max(1, int(max_workers))
+        # Pause held by a slot after each lookup; keeps the old per-row
+        # politeness delays meaningful per concurrent slot.
+        self.host_delay = max(0.0, float(host_delay))
+
+    def _limit_for(self, host: str) -> int:
+        return max(1, int(self.host_limits.get(host, self.default_host_limit)))
+
+    async def _run_all(
+        self,
+        jobs: Iterable[LookupJob],
+        on_result: Optional[Callable[[Hashable, Any], None]],
+    ) -> Dict[Hashable, Any]:
+        loop = asyncio.get_running_loop()
+        semaphores: Dict[str, asyncio.Semaphore] = {}
+        results: Dict[Hashable, Any] = {}
+
+        async def run_one(job: LookupJob) -> None:
+            sem = semaphores.get(job.host)
+            if sem is None:
+                sem = semaphores[job.host] = asyncio.Semaphore(self._limit_for(job.host))
+            async with sem:
+                try:
+                    value = await loop.run_in_executor(executor, job.func, *job.args)
+                except Exception as exc:  # one bad row must not abort the batch
+                    logger.error("Lookup failed for %r on %s: %s", job.key, job.host, exc)
+                    value = None
+                results[job.key] = value
+                if on_result is not None:
+                    on_result(job.key, value)
+                if self.host_delay:
+                    await asyncio.sleep(self.host_delay)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            await asyncio.gather(*(run_one(job) for job in jobs))
+        return results
+
+    def run(
+        self,
+        jobs: Iterable[LookupJob],
+        on_result: Optional[Callable[[Hashable, Any], None]] = None,
+    ) -> Dict[Hashable, Any]:
+        """Run ``jobs`` to completion and return ``{job.key: result}``.
+
+        Exceptions raised by a lookup are logged and reported as ``None``.
+        """
+        return asyncio.run(self._run_all(list(jobs), on_result))
+
+
+def run_lookups(
+    jobs: Iterable[LookupJob],
+    on_result: Optional[Callable[[Hashable, Any], None]] = None,
+    workers: Optional[int] = None,
+    host_delay: float = 0.0,
+) -> Dict[Hashable, Any]:
+    """Convenience wrapper used by the scrapers' ``--workers`` option."""
+    engine = LookupEngine(
+        default_host_limit=workers or DEFAULT_HOST_LIMIT,
+        host_delay=host_delay,
+    )
+    return engine.run(jobs, on_result=on_result)
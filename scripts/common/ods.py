@@ -0,0 +1,629 @@
+"""Shared OpenDocument spreadsheet (``.ods``) I/O for the enrichment scripts.
+
+Reading
+-------
+``content.xml`` is read with ``ElementTree.iterparse`` straight from the zip
+member, and every row is dropped from the tree once it has been converted, so
+the whole document is never held in memory. LibreOffice likes to close a sheet
+with ``number-rows-repeated="1048000"`` or ``number-columns-repeated="1000"``
+empty cells; such repeats are never expanded. Blank runs are carried as a
+count and only materialised when real data follows them, so trailing empty
+rows and columns disappear and memory grows with the data, not with the
+sheet's declared size.
+
+Writing
+-------
+``OdsWorkbook`` keeps one sheet as a grid of strings and remembers which
+cells were changed; ``save()`` edits only those cell elements (splitting
+repeated rows/cells where needed) and keeps their styles. ``write_sheet_rows``
+diffs a whole new grid against the file and patches the same way. Only the
+row elements that hold a changed cell are parsed and re-serialised; the rest
+of ``content.xml`` and every other archive member is copied byte for byte,
+and the archive is replaced atomically.
+"""
+from __future__ import annotations
+
+import copy
+import html
+import os
+import re
+import tempfile
+import zipfile
+from pathlib import Path
+from typing import Dict, Iterator, List, Mapping, Optional, Sequence, Tuple, Union
+from xml.etree import ElementTree as ET
+
+__all__ = [
+    "NS",
+    "OdsError",
+    "OdsWorkbook",
+    "cell_text",
+    "diff_cells",
+    "iter_sheet_rows",
+    "patch_cells",
+    "read_sheet_rows",
+    "replace_member",
+    "write_sheet_rows",
+]
+
+NS = {
+    "office": "urn:oasis:names:tc:opendocument:xmlns:office:1.0",
+    "table": "urn:oasis:names:tc:opendocument:xmlns:table:1.0",
+    "text": "urn:oasis:names:tc:opendocument:xmlns:text:1.0",
+}
+
+_OFFICE = f"{{{NS['office']}}}"
+_TABLE = f"{{{NS['table']}}}"
+_TEXT = f"{{{NS['text']}}}"
+TABLE = _TABLE + "table"
+TABLE_ROW = _TABLE + "table-row"
+TABLE_CELL = _TABLE + "table-cell"
+COVERED_CELL = _TABLE + "covered-table-cell"
+ROWS_REPEATED = _TABLE + "number-rows-repeated"
+COLUMNS_REPEATED = _TABLE + "number-columns-repeated"
+TABLE_NAME = _TABLE + "name"
+TEXT_P = _TEXT + "p"
+TEXT_H = _TEXT + "h"
+TEXT_S = _TEXT + "s"
+TEXT_TAB = _TEXT + "tab"
+TEXT_LINE_BREAK = _TEXT + "line-break"
+ROW_CONTAINERS = frozenset(
+    _TABLE + tag for tag in ("table-header-rows", "table-rows", "table-row-group")
+)
+# Attributes describing a cell's typed value; dropped when a cell is rewritten.
+_VALUE_ATTRS = frozenset(
+    _OFFICE + name
+    for name in (
+        "value-type", "value", "date-value", "time-value", "boolean-value",
+        "string-value", "currency",
+    )
+)
+_CALCEXT_VALUE_TYPE = "{urn:org:documentfoundation:names:experimental:calc:xmlns:calcext:1.0}value-type"
+
+SheetRef = Union[int, str]
+
+
+class OdsError(RuntimeError):
+    """Raised when a file is not a readable ODS spreadsheet."""
+
+
+def _repeat(elem: ET.Element, attr: str) -> int:
+    try:
+        return max(1, int(elem.get(attr, "1")))
+    except ValueError:
+        return 1
+
+
+def _inline_text(elem: ET.Element) -> str:
+    parts = [elem.text or ""]
+    for child in elem:
+        if child.tag == TEXT_S:
+            parts.append(" " * _repeat(child, _TEXT + "c"))
+        elif child.tag == TEXT_TAB:
+            parts.append("\t")
+        elif child.tag == TEXT_LINE_BREAK:
+            parts.append("\n")
+        else:
+            parts.append(_inline_text(child))
+        parts.append(child.tail or "")
+    return "".join(parts)
+
+
+def cell_text(cell: ET.Element) -> str:
+    """Displayed text of a cell; paragraphs are joined with newlines."""
+    return "\n".join(_inline_text(p) for p in cell if p.tag in (TEXT_P, TEXT_H))
+
+
+def _row_values(row: ET.Element) -> List[str]:
+    """Cell texts of one row with trailing blank cells trimmed."""
+    values: List[str] = []
+    blanks = 0
+    for cell in row:
+        if cell.tag == TABLE_CELL:
+            value = cell_text(cell)
+        elif cell.tag == COVERED_CELL:
+            value = ""
+        else:
+            continue
+        repeat = _repeat(cell, COLUMNS_REPEATED)
+        if not value:
+            blanks += repeat
+            continue
+        if blanks:
+            values.extend([""] * blanks)
+            blanks = 0
+        values.extend([value] * repeat)
+    return values
+
+
+def _is_wanted(sheet: SheetRef, index: int, table: ET.Element) -> bool:
+    if isinstance(sheet, str):
+        return table.get(TABLE_NAME) == sheet
+    return index == sheet
+
+
+def iter_sheet_rows(path: Path | str, sheet: SheetRef = 0) -> Iterator[Tuple[List[str], int]]:
+    """Yield ``(values, repeat)`` runs for one sheet (index or name).
+
+    ``values`` has trailing blanks trimmed; a blank row is ``([], n)`` no
+    matter how many rows the file says it repeats.
+    """
+    try:
+        archive = zipfile.ZipFile(path)
+    except (OSError, zipfile.BadZipFile) as exc:
+        raise OdsError(f"{path} is not an ODS file: {exc}") from exc
+    with archive:
+        try:
+            stream = archive.open("content.xml")
+        except KeyError as exc:
+            raise OdsError(f"{path} is missing content.xml") from exc
+        with stream:
+            stack: List[ET.Element] = []
+            table_index = -1
+            active = False
+            found = False
+            nested = 0
+            for event, elem in ET.iterparse(stream, events=("start", "end")):
+                if event == "start":
+                    if elem.tag == TABLE:
+                        if nested == 0:
+                            table_index += 1
+                            active = _is_wanted(sheet, table_index, elem)
+                            found = found or active
+                        nested += 1
+                    stack.append(elem)
+                    continue
+
+                stack.pop()
+                if elem.tag == TABLE:
+                    nested -= 1
+                    if nested == 0:
+                        if active:
+                            return
+                        elem.clear()
+                    continue
+                if elem.tag != TABLE_ROW or nested != 1:
+                    continue
+                if active:
+                    yield _row_values(elem), _repeat(elem, ROWS_REPEATED)
+                # Converted rows are dropped so the parsed tree stays tiny
+                if stack:
+                    stack[-1].remove(elem)
+            if not found:
+                raise OdsError(f"{path} has no sheet {sheet!r}")
+
+
+def read_sheet_rows(path: Path | str, sheet: SheetRef = 0) -> List[List[str]]:
+    """Return the rows of one sheet as lists of strings.
+
+    Rows are not padded to a common width. Trailing blank rows and cells are
+    dropped; blank rows between data rows are kept as ``[]``.
+    """
+    rows: List[List[str]] = []
+    pending_blank = 0
+    for values, repeat in iter_sheet_rows(path, sheet):
+        if not values:
+            pending_blank += repeat
+            continue
+        if pending_blank:
+            rows.extend([] for _ in range(pending_blank))
+            pending_blank = 0
+        rows.extend(list(values) for _ in range(repeat))
+    return rows
+
+
+# ---------------------------------------------------------------- writing --
+
+def _root_namespaces(text: str) -> Dict[str, str]:
+    """Prefixes declared on the root element, registered so output keeps them."""
+    match = re.search(r"<[\w.-]+:document-content\b[^>]*>", text)
+    if match is None:
+        raise OdsError("content.xml has no document-content element")
+    namespaces = dict(re.findall(r'xmlns:([\w.-]+)="([^"]+)"', match.group(0)))
+    for prefix, uri in namespaces.items():
+        ET.register_namespace(prefix, uri)
+    return namespaces
+
+
+def _read_member(path: Path, name: str) -> bytes:
+    try:
+        with zipfile.ZipFile(path) as archive:
+            return archive.read(name)
+    except KeyError as exc:
+        raise OdsError(f"{path} is missing {name}") from exc
+    except (OSError, zipfile.BadZipFile) as exc:
+        raise OdsError(f"{path} is not an ODS file: {exc}") from exc
+
+
+def replace_member(path: Path | str, name: str, data: bytes, out_path: Path | str | None = None) -> None:
+    """Write a copy of the archive with member ``name`` replaced, atomically.
+
+    ``mimetype`` stays the first, uncompressed member as ODF requires; all
+    other members keep their bytes, order and compression.
+    """
+    path = Path(path)
+    target = Path(out_path) if out_path is not None else path
+    fd, temp_name = tempfile.mkstemp(suffix=target.suffix, prefix=f".{target.stem}_", dir=str(target.parent))
+    os.close(fd)
+    temp_path = Path(temp_name)
+    try:
+        with zipfile.ZipFile(path) as src, zipfile.ZipFile(temp_path, "w") as dst:
+            infos = sorted(src.infolist(), key=lambda info: info.filename != "mimetype")
+            for info in infos:
+                payload = data if info.filename == name else src.read(info.filename)
+                new_info = zipfile.ZipInfo(info.filename, date_time=info.date_time)
+                new_info.compress_type = zipfile.ZIP_STORED if info.filename == "mimetype" else info.compress_type
+                new_info.external_attr = info.external_attr
+                dst.writestr(new_info, payload)
+        temp_path.replace(target)
+        temp_path = None
+    finally:
+        if temp_path is not None and temp_path.exists():
+            temp_path.unlink()
+
+
+def _fill_paragraph(paragraph: ET.Element, line: str) -> None:
+    # ODF collapses whitespace inside text:p, so runs of spaces and tabs are
+    # written as text:s / text:tab like LibreOffice does.
+    parts = re.split(r"( {2,}|\t)", line)
+    paragraph.text = parts[0]
+    last: Optional[ET.Element] = None
+    for sep, rest in zip(parts[1::2], parts[2::2]):
+        if sep == "\t":
+            last = ET.SubElement(paragraph, TEXT_TAB)
+        else:
+            if last is None:
+                paragraph.text += " "
+            else:
+                last.tail = (last.tail or "") + " "
+            last = ET.SubElement(paragraph, TEXT_S)
+            if len(sep) > 2:
+                last.set(_TEXT + "c", str(len(sep) - 1))
+        last.tail = rest
+
+
+def _set_cell_value(cell: ET.Element, value: str) -> None:
+    """Replace a cell's content with a string, keeping its style and annotations."""
+    cell.tag = TABLE_CELL
+    for attr in list(cell.attrib):
+        if attr in _VALUE_ATTRS or attr == _CALCEXT_VALUE_TYPE:
+            del cell.attrib[attr]
+    for child in list(cell):
+        if child.tag in (TEXT_P, TEXT_H):
+            cell.remove(child)
+    if not value:
+        return
+    cell.set(_OFFICE + "value-type", "string")
+    for line in value.split("\n"):
+        _fill_paragraph(ET.SubElement(cell, TEXT_P), line)
+
+
+def _set_repeat(elem: ET.Element, attr: str, count: int) -> None:
+    if count > 1:
+        elem.set(attr, str(count))
+    else:
+        elem.attrib.pop(attr, None)
+
+
+def _split(parent: ET.Element, elem: ET.Element, offset: int, attr: str) -> Tuple[ET.Element, Optional[ET.Element]]:
+    """Cut repeat ``offset`` out of a repeated element.
+
+    Returns the single-repeat element for ``offset`` and the element holding
+    the repeats after it (``None`` if there are none).
+    """
+    repeat = _repeat(elem, attr)
+    if repeat == 1:
+        return elem, None
+    index = list(parent).index(elem)
+    pieces: List[ET.Element] = []
+    if offset > 0:
+        before = copy.deepcopy(elem)
+        _set_repeat(before, attr, offset)
+        pieces.append(before)
+    target = copy.deepcopy(elem)
+    _set_repeat(target, attr, 1)
+    pieces.append(target)
+    after = None
+    if repeat - offset - 1 > 0:
+        after = copy.deepcopy(elem)
+        _set_repeat(after, attr, repeat - offset - 1)
+        pieces.append(after)
+    parent.remove(elem)
+    for n, piece in enumerate(pieces):
+        parent.insert(index + n, piece)
+    return target, after
+
+
+def _patch_runs(
+    parent: ET.Element,
+    slots: Sequence[Tuple[ET.Element, ET.Element]],
+    attr: str,
+    targets: Mapping[int, object],
+    apply,
+    make_blank,
+    make_new,
+) -> None:
+    """Walk repeated ``slots`` and call ``apply(elem, targets[i])`` for every target index."""
+    order = sorted(targets)
+    ti = 0
+    pos = 0
+    for slot_parent, elem in slots:
+        end = pos + _repeat(elem, attr)
+        current, current_start = elem, pos
+        while ti < len(order) and order[ti] < end:
+            idx = order[ti]
+            target, after = _split(slot_parent, current, idx - current_start, attr)
+            apply(target, targets[idx])
+            ti += 1
+            if after is None:
+                break
+            current, current_start = after, idx + 1
+        pos = end
+    container = slots[-1][0] if slots else parent
+    while ti < len(order):
+        idx = order[ti]
+        if idx > pos:
+            container.append(make_blank(idx - pos))
+        elem = make_new()
+        container.append(elem)
+        apply(elem, targets[idx])
+        pos = idx + 1
+        ti += 1
+
+
+def _new_cell(repeat: int = 1) -> ET.Element:
+    cell = ET.Element(TABLE_CELL)
+    _set_repeat(cell, COLUMNS_REPEATED, repeat)
+    return cell
+
+
+def _new_row(repeat: int = 1) -> ET.Element:
+    row = ET.Element(TABLE_ROW)
+    _set_repeat(row, ROWS_REPEATED, repeat)
+    row.append(_new_cell())
+    return row
+
+
+def _patch_row(row: ET.Element, values: Mapping[int, str]) -> None:
+    slots = [(row, cell) for cell in row if cell.tag in (TABLE_CELL, COVERED_CELL)]
+    _patch_runs(row, slots, COLUMNS_REPEATED, values, _set_cell_value, _new_cell, _new_cell)
+
+
+def _tag_pattern(prefix: str, local: str) -> str:
+    return rf"<{re.escape(prefix)}:{local}(?=[\s/>])[^>]*>"
+
+
+def _sheet_bounds(text: str, tp: str, sheet: SheetRef) -> Tuple[int, int]:
+    """Return ``(content start, content end)`` of a top-level sheet in ``text``."""
+    token = re.compile(rf"{_tag_pattern(tp, 'table')}|</{re.escape(tp)}:table>")
+    depth = 0
+    index = -1
+    start = None
+    for match in token.finditer(text):
+        tag = match.group(0)
+        if tag.startswith("</"):
+            depth -= 1
+            if depth == 0 and start is not None:
+                return start, match.start()
+            continue
+        self_closing = tag.endswith("/>")
+        if depth == 0:
+            index += 1
+            name = re.search(rf'{re.escape(tp)}:name="([^"]*)"', tag)
+            name = html.unescape(name.group(1)) if name else None
+            wanted = name == sheet if isinstance(sheet, str) else index == sheet
+            if wanted:
+                if self_closing:
+                    raise OdsError(f"sheet {sheet!r} has no rows element to patch")
+                start = match.end()
+        if not self_closing:
+            depth += 1
+    raise OdsError(f"no sheet {sheet!r}")
+
+
+def _row_spans(text: str, tp: str, start: int, end: int) -> Iterator[Tuple[int, int, int]]:
+    """Yield ``(start, end, repeat)`` of each row element between ``start`` and ``end``."""
+    row_start = re.compile(_tag_pattern(tp, "table-row"))
+    row_end = f"</{tp}:table-row>"
+    repeat_attr = re.compile(rf'{re.escape(tp)}:number-rows-repeated="(\d+)"')
+    pos = start
+    while True:
+        match = row_start.search(text, pos, end)
+        if match is None:
+            return
+        tag = match.group(0)
+        if tag.endswith("/>"):
+            stop = match.end()
+        else:
+            close = text.find(row_end, match.end(), end)
+            if close < 0:
+                raise OdsError("unterminated table row")
+            stop = close + len(row_end)
+        repeat = repeat_attr.search(tag)
+        yield match.start(), stop, max(1, int(repeat.group(1))) if repeat else 1
+        pos = stop
+
+
+def _columns_end(text: str, tp: str, start: int, end: int) -> int:
+    """Offset just past the sheet's column definitions (``start`` if it has none).
+
+    Rows of an empty sheet must follow ``table:table-column`` and its
+    grouping elements to keep the document valid ODF.
+    """
+    pattern = re.compile(
+        rf"{_tag_pattern(tp, 'table-column')}|</{re.escape(tp)}:table-(?:columns|header-columns|column-group)>"
+    )
+    first_row = re.compile(_tag_pattern(tp, "table-row")).search(text, start, end)
+    stop = first_row.start() if first_row else end
+    last = start
+    for match in pattern.finditer(text, start, stop):
+        if match.group(0).startswith("</") or match.group(0).endswith("/>"):
+            last = match.end()
+        else:
+            close = text.find(f"</{tp}:table-column>", match.end(), stop)
+            last = close + len(f"</{tp}:table-column>") if close >= 0 else match.end()
+    return last
+
+
+def _serialize(elem: ET.Element) -> str:
+    """Serialise a fragment without repeating the root's xmlns declarations."""
+    xml = ET.tostring(elem, encoding="unicode")
+    head_end = xml.index(">")
+    head = re.sub(r'\s+xmlns:[\w.-]+="[^"]*"', "", xml[:head_end])
+    return head + xml[head_end:]
+
+
+def _patch_fragment(fragment: str, declarations: str, targets: Mapping[int, Mapping[int, str]]) -> str:
+    """Apply ``{repeat offset: {col: value}}`` to one (possibly repeated) row element."""
+    wrapper = ET.fromstring(f"<wrapper {declarations}>{fragment}</wrapper>")
+    slots = [(wrapper, child) for child in wrapper]
+    _patch_runs(wrapper, slots, ROWS_REPEATED, targets, _patch_row, _new_row, lambda: ET.Element(TABLE_ROW))
+    return "".join(_serialize(child) for child in wrapper)
+
+
+def _patch_content(text: str, cells: Mapping[Tuple[int, int], str], sheet: SheetRef) -> str:
+    namespaces = _root_namespaces(text)
+    tp = next((prefix for prefix, uri in namespaces.items() if uri == NS["table"]), "table")
+    declarations = " ".join(f'xmlns:{prefix}="{uri}"' for prefix, uri in namespaces.items())
+    by_row: Dict[int, Dict[int, str]] = {}
+    for (row, col), value in cells.items():
+        by_row.setdefault(row, {})[col] = value
+    pending = sorted(by_row)
+    next_row = 0
+
+    start, end = _sheet_bounds(text, tp, sheet)
+    out: List[str] = []
+    copied = 0
+    pos = 0
+    insert_at = _columns_end(text, tp, start, end)
+    for row_start, row_end, repeat in _row_spans(text, tp, start, end):
+        insert_at = row_end
+        targets = {}
+        while next_row < len(pending) and pending[next_row] < pos + repeat:
+            row = pending[next_row]
+            targets[row - pos] = by_row[row]
+            next_row += 1
+        if targets:
+            out.append(text[copied:row_start])
+            out.append(_patch_fragment(text[row_start:row_end], declarations, targets))
+            copied = row_end
+        pos += repeat
+        if next_row == len(pending):
+            break
+
+    if next_row < len(pending):
+        # Rows past the end of the sheet are appended after its last row
+        wrapper = ET.Element("wrapper")
+        _patch_runs(wrapper, [], ROWS_REPEATED, {row - pos: by_row[row] for row in pending[next_row:]},
+                    _patch_row, _new_row, lambda: ET.Element(TABLE_ROW))
+        out.append(text[copied:insert_at])
+        out.append("".join(_serialize(child) for child in wrapper))
+        copied = insert_at
+    out.append(text[copied:])
+    return "".join(out)
+
+
+def patch_cells(
+    path: Path | str,
+    cells: Mapping[Tuple[int, int], str],
+    sheet: SheetRef = 0,
+    out_path: Path | str | None = None,
+) -> None:
+    """Set ``{(row, col): value}`` in one sheet, leaving every other cell untouched.
+
+    Only the row elements holding a changed cell are parsed and rewritten;
+    the rest of ``content.xml`` is copied through as is.
+    """
+    path = Path(path)
+    text = _read_member(path, "content.xml").decode("utf-8")
+    try:
+        patched = _patch_content(text, cells, sheet) if cells else text
+    except (OdsError, ET.ParseError) as exc:
+        raise OdsError(f"{path}: {exc}") from exc
+    replace_member(path, "content.xml", patched.encode("utf-8"), out_path)
+
+
+def diff_cells(old: Sequence[Sequence[str]], new: Sequence[Sequence[str]]) -> Dict[Tuple[int, int], str]:
+    """Return ``{(row, col): value}`` turning grid ``old`` into ``new``.
+
+    Cells present only in ``old`` are cleared.
+    """
+    changes: Dict[Tuple[int, int], str] = {}
+    for r in range(max(len(old), len(new))):
+        old_row = old[r] if r < len(old) else ()
+        new_row = new[r] if r < len(new) else ()
+        for c in range(max(len(old_row), len(new_row))):
+            before = old_row[c] if c < len(old_row) else ""
+            after = (new_row[c] if c < len(new_row) else "") or ""
+            if before != after:
+                changes[(r, c)] = after
+    return changes
+
+
+def write_sheet_rows(
+    path: Path | str,
+    rows: Sequence[Sequence[str]],
+    sheet: SheetRef = 0,
+    out_path: Path | str | None = None,
+) -> int:
+    """Make one sheet hold ``rows``; return the number of cells written.
+
+    The current sheet is diffed against ``rows`` and only differing cells
+    are patched, so styles survive and small updates stay cheap.
+    """
+    changes = diff_cells(read_sheet_rows(path, sheet), rows)
+    if changes or out_path is not None:
+        patch_cells(path, changes, sheet, out_path)
+    return len(changes)
+
+
+class OdsWorkbook:
+    """One sheet of an ODS file as an editable grid of strings.
+
+    ``rows`` is trimmed like ``read_sheet_rows``; ``get`` returns ``""`` for
+    anything outside it. Only cells changed with ``set`` are written by
+    ``save``.
+    """
+
+    def __init__(self, path: Path | str, sheet: SheetRef = 0) -> None:
+        self.path = Path(path)
+        self.sheet = sheet
+        self.rows: List[List[str]] = read_sheet_rows(self.path, sheet)
+        self._changed: Dict[Tuple[int, int], str] = {}
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    @property
+    def ncols(self) -> int:
+        return max((len(row) for row in self.rows), default=0)
+
+    @property
+    def changed(self) -> bool:
+        return bool(self._changed)
+
+    def get(self, row: int, col: int) -> str:
+        if row < len(self.rows) and col < len(self.rows[row]):
+            return self.rows[row][col]
+        return ""
+
+    def set(self, row: int, col: int, value: Optional[str]) -> None:
+        value = "" if value is None else str(value)
+        if self.get(row, col) == value:
+            return
+        while len(self.rows) <= row:
+            self.rows.append([])
+        cells = self.rows[row]
+        if len(cells) <= col:
+            cells.extend([""] * (col + 1 - len(cells)))
+        cells[col] = value
+        self._changed[(row, col)] = value
+
+    def save(self, path: Path | str | None = None) -> None:
+        """Write changed cells back (to ``path`` instead, if given)."""
+        target = Path(path) if path is not None else self.path
+        if target == self.path and not self._changed:
+            return
+        patch_cells(self.path, self._changed, self.sheet, out_path=target)
+        if target == self.path:
+            self._changed.clear()
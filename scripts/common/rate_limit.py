@@ -0,0 +1,198 @@
+"""Adaptive per-host rate limiting for the enrichment scripts.
+
+Every host gets a token bucket whose refill rate follows AIMD:
+
+* each healthy response adds ``increase`` requests/second (additive increase);
+* a 429/503, a transport error or a response much slower than the host's
+  recent average multiplies the rate by ``decrease`` (multiplicative decrease);
+* a ``Retry-After`` header pauses the host for the requested time.
+
+``CachedSession`` (see ``http_cache.py``) consults the shared limiter before
+each network request, so responses served from the cache never wait.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+__all__ = [
+    "AdaptiveRateLimiter",
+    "HostPolicy",
+    "get_limiter",
+    "host_of",
+]
+
+THROTTLE_STATUSES = frozenset({429, 503})
+
+
+@dataclass
+class HostPolicy:
+    """Tunables of one host's bucket (rates are requests per second)."""
+
+    initial_rate: float = 2.0
+    min_rate: float = 0.1
+    max_rate: float = 10.0
+    increase: float = 0.1
+    decrease: float = 0.5
+    burst: float = 1.0
+    # A response slower than ``slow_factor`` times the running average counts
+    # as a congestion signal once ``warmup`` samples have been seen.
+    slow_factor: float = 3.0
+    warmup: int = 5
+
+
+DEFAULT_POLICIES: Dict[str, HostPolicy] = {
+    "query.wikidata.org": HostPolicy(initial_rate=2.0, max_rate=5.0),
+    "www.wikidata.org": HostPolicy(initial_rate=5.0, max_rate=20.0),
+    "api.inaturalist.org": HostPolicy(initial_rate=1.0, max_rate=1.5),
+    "www.plantarium.ru": HostPolicy(initial_rate=2.0, max_rate=6.0),
+    "www.missouribotanicalgarden.org": HostPolicy(initial_rate=0.5, max_rate=4.0),
+    "html.duckduckgo.com": HostPolicy(initial_rate=0.5, max_rate=1.0),
+    "duckduckgo.com": HostPolicy(initial_rate=0.5, max_rate=1.0),
+}
+
+
+def host_of(url: str) -> str:
+    return (urlsplit(url).hostname or "").lower()
+
+
+def _retry_after_seconds(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class _HostBucket:
+    def __init__(self, policy: HostPolicy) -> None:
+        self.policy = policy
+        self.rate = policy.initial_rate
+        self.tokens = policy.burst
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.last_decrease = 0.0
+        self.avg_latency: Optional[float] = None
+        self.samples = 0
+        self.lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.policy.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self) -> float:
+        waited = 0.0
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now >= self.blocked_until and self.tokens >= 1.0:
+                    self.tokens -= 1.0
+                    return waited
+                wait = max(self.blocked_until - now, (1.0 - self.tokens) / self.rate)
+            time.sleep(wait)
+            waited += wait
+
+    def _decrease(self, now: float) -> None:
+        # One cut per "round trip" of the current rate: a burst of failures
+        # from requests already in flight should not collapse the rate.
+        if now - self.last_decrease < 1.0 / self.rate:
+            return
+        self.rate = max(self.policy.min_rate, self.rate * self.policy.decrease)
+        self.tokens = min(self.tokens, 0.0)
+        self.last_decrease = now
+
+    def record(self, status: Optional[int], latency: Optional[float], retry_after: Optional[float]) -> None:
+        with self.lock:
+            now = time.monotonic()
+            if retry_after:
+                self.blocked_until = max(self.blocked_until, now + retry_after)
+            congested = status is None or status in THROTTLE_STATUSES
+            if not congested and latency is not None:
+                if self.avg_latency is not None and self.samples >= self.policy.warmup:
+                    congested = latency > self.avg_latency * self.policy.slow_factor
+                self.avg_latency = latency if self.avg_latency is None else 0.8 * self.avg_latency + 0.2 * latency
+                self.samples += 1
+            if congested:
+                self._decrease(now)
+            elif status is not None and status < 500:
+                self.rate = min(self.policy.max_rate, self.rate + self.policy.increase)
+
+
+class AdaptiveRateLimiter:
+    """Registry of per-host AIMD token buckets."""
+
+    def __init__(self, policies: Optional[Dict[str, HostPolicy]] = None, default: Optional[HostPolicy] = None) -> None:
+        self._policies = dict(DEFAULT_POLICIES if policies is None else policies)
+        self._default = default or HostPolicy()
+        self._buckets: Dict[str, _HostBucket] = {}
+        self._lock = threading.Lock()
+
+    def _bucket(self, host: str) -> _HostBucket:
+        with self._lock:
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                bucket = self._buckets[host] = _HostBucket(self._policies.get(host, self._default))
+            return bucket
+
+    def configure(self, host: str, interval: Optional[float] = None, **overrides: float) -> None:
+        """Override a host's policy, e.g. from a legacy ``--delay``/``--sleep`` option.
+
+        ``interval`` is the starting pause between requests in seconds; the
+        limiter still adapts from there. Repeating a call with the same
+        settings (every stage of a run does) keeps the rate learned so far.
+        """
+        base = self._policies.get(host, self._default)
+        fields = dict(base.__dict__)
+        if interval is not None and interval > 0:
+            fields["initial_rate"] = 1.0 / interval
+            fields["max_rate"] = max(fields["max_rate"], fields["initial_rate"])
+        fields.update(overrides)
+        policy = HostPolicy(**fields)
+        with self._lock:
+            if self._policies.get(host) == policy:
+                return
+            self._policies[host] = policy
+            self._buckets.pop(host, None)
+
+    def acquire(self, host: str) -> float:
+        """Block until ``host`` may receive a request; return seconds waited."""
+        return self._bucket(host).acquire()
+
+    def record(
+        self,
+        host: str,
+        status: Optional[int],
+        latency: Optional[float] = None,
+        retry_after: Optional[str | float] = None,
+    ) -> None:
+        """Feed back one outcome; ``status=None`` means a transport error."""
+        if isinstance(retry_after, str) or retry_after is None:
+            retry_after = _retry_after_seconds(retry_after)
+        self._bucket(host).record(status, latency, retry_after)
+
+    def current_rate(self, host: str) -> float:
+        return self._bucket(host).rate
+
+
+_shared_limiter: Optional[AdaptiveRateLimiter] = None
+_shared_lock = threading.Lock()
+
+
+def get_limiter() -> AdaptiveRateLimiter:
+    """Return the process-wide limiter shared by all sessions and scrapers."""
+    global _shared_limiter
+    with _shared_lock:
+        if _shared_limiter is None:
+            _shared_limiter = AdaptiveRateLimiter()
+        return _shared_limiter
@@ -12,7 +12,7 @@
     python search_plants_fixed.py links.ods -v --max-rows 20
 
 Требования:
-    pip install odfpy beautifulsoup4 requests
+    pip install beautifulsoup4 requests
 """
 
 import time
@@ -24,12 +24,26 @@ from pathlib import Path
 import urllib.parse
 import requests
 from bs4 import BeautifulSoup
-from odf import opendocument, table, text
 import re
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from common.http_cache import CachedSession
+from common.lookup_engine import LookupJob, run_lookups
+from common.ods import OdsError, OdsWorkbook
+from common.rate_limit import get_limiter
+from link_sources import LinkSource, single_column_resolver
+
 # Версия скрипта
 VERSION = "3.0"
 
+MBG_HOST = "www.missouribotanicalgarden.org"
+MBG_COLUMN = 2  # C
+
+# Ответы кэшируются на диске (scripts/common/http_cache.py), повторный запуск
+# не скачивает уже просмотренные страницы заново
+MBG_SESSION = CachedSession("mbg")
+DDG_SESSION = CachedSession("duckduckgo")
+
 # Настройка логирования
 logger = logging.getLogger(__name__)
 
@@ -86,7 +100,7 @@ def search_plant_direct(plant_name, verbose=False):
             logger.debug(f"URL запроса: {direct_search_url}")
         
         # Делаем запрос к странице поиска
-        response = requests.get(direct_search_url, headers=headers, timeout=30, allow_redirects=True)
+        response = MBG_SESSION.get(direct_search_url, headers=headers, timeout=30, allow_redirects=True)
         
         if verbose:
             logger.debug(f"Статус ответа: {response.status_code}")
@@ -191,7 +205,7 @@ def search_plant_google_fallback(plant_name, verbose=False):
             logger.debug(f"Резервный поиск через DuckDuckGo: {query}")
             logger.debug(f"URL: {search_url}")
         
-        response = requests.get(search_url, headers=headers, timeout=30)
+        response = DDG_SESSION.get(search_url, headers=headers, timeout=30)
         
         if response.status_code != 200:
             if verbose:
@@ -229,45 +243,40 @@ def search_plant_google_fallback(plant_name, verbose=False):
         return None
 
 
-def get_cell_text(cell):
+def find_mbg_link(plant_name, verbose=False):
     """
-    Извлекает текст из ячейки ODS
-    
+    Ищет растение на сайте MBG, при неудаче — через DuckDuckGo
+
     Args:
-        cell: объект ячейки таблицы
-        
+        plant_name: название растения для поиска
+        verbose: подробный вывод информации
+
     Returns:
-        str: текст ячейки
+        str: URL найденного растения или None
     """
-    text_nodes = cell.getElementsByType(text.P)
-    cell_text = ""
-    if text_nodes:
-        for p in text_nodes:
-            if p.firstChild:
-                cell_text += str(p.firstChild)
-    return cell_text.strip()
+    # Сначала пробуем прямой поиск на сайте MBG
+    found_link = search_plant_direct(plant_name, verbose=verbose)
 
+    # Если не нашли, пробуем через DuckDuckGo
+    if not found_link:
+        if verbose:
+            logger.debug(f"{plant_name}: прямой поиск не дал результатов, пробуем DuckDuckGo...")
+        found_link = search_plant_google_fallback(plant_name, verbose=verbose)
+    return found_link
 
-def set_cell_text(cell, new_text):
-    """
-    Устанавливает текст в ячейку ODS
-    
-    Args:
-        cell: объект ячейки таблицы
-        new_text: новый текст для ячейки
-    """
-    # Очищаем существующий текст
-    for child in list(cell.childNodes):
-        cell.removeChild(child)
-    
-    # Добавляем новый текст
-    p = text.P()
-    p.addText(new_text)
-    cell.appendChild(p)
+
+# Источник для sync_links: столбец C; ячейка без http-ссылки считается пустой
+LINK_SOURCE = LinkSource(
+    name="MBG",
+    headers={MBG_COLUMN: "MBG"},
+    resolve=single_column_resolver(MBG_COLUMN, MBG_HOST, find_mbg_link),
+    accepts=lambda name: name.lower() != 'sci',
+    is_filled=lambda value: value.strip().startswith('http'),
+)
 
 
 def process_ods_file(input_file, skip_existing=True, max_rows=None, 
-                     delay=2.5, verbose=False, in_place=False):
+                     delay=2.5, verbose=False, in_place=False, workers=None):
     """
     Обрабатывает ODS файл: читает названия растений из столбца A,
     выполняет поиск и записывает результаты в столбец C
@@ -276,9 +285,11 @@ def process_ods_file(input_file, skip_existing=True, max_rows=None,
         input_file: путь к входному файлу ODS
         skip_existing: пропускать строки, где уже есть ссылка в столбце C
         max_rows: максимальное количество строк для обработки (None = все)
-        delay: задержка между запросами в секундах
+        delay: начальный интервал между запросами к MBG в секундах
+               (дальше темп подстраивается адаптивным ограничителем)
         verbose: подробный вывод информации
         in_place: обновлять существующий файл вместо создания нового
+        workers: число параллельных запросов к сайту MBG
         
     Returns:
         dict: статистика обработки
@@ -290,20 +301,12 @@ def process_ods_file(input_file, skip_existing=True, max_rows=None,
     logger.info(f"Загрузка файла: {input_file}")
     
     try:
-        doc = opendocument.load(input_file)
-    except Exception as e:
+        wb = OdsWorkbook(input_file)
+    except OdsError as e:
         logger.error(f"Ошибка при загрузке файла: {e}")
         return None
     
-    sheets = doc.spreadsheet.getElementsByType(table.Table)
-    
-    if not sheets:
-        logger.error("Таблицы не найдены в файле")
-        return None
-    
-    sheet = sheets[0]
-    rows = sheet.getElementsByType(table.TableRow)
-    total_rows = len(rows)
+    total_rows = len(wb)
     
     logger.info(f"Всего строк в таблице: {total_rows}")
     
@@ -315,7 +318,8 @@ def process_ods_file(input_file, skip_existing=True, max_rows=None,
     else:
         logger.info("Режим: перезапись всех ссылок")
     
-    logger.info(f"Задержка между запросами: {delay} сек")
+    logger.info(f"Начальный интервал между запросами: {delay} сек")
+    get_limiter().configure(MBG_HOST, interval=delay)
     logger.info("")
     
     # Статистика
@@ -329,8 +333,9 @@ def process_ods_file(input_file, skip_existing=True, max_rows=None,
     
     start_time = time.time()
     
+    jobs = []
     # Пропускаем заголовок (первая строка)
-    for row_idx, row in enumerate(rows):
+    for row_idx in range(total_rows):
         if row_idx == 0:
             if verbose:
                 logger.debug(f"Строка {row_idx}: Заголовок - пропуск")
@@ -340,21 +345,14 @@ def process_ods_file(input_file, skip_existing=True, max_rows=None,
             logger.info(f"\nДостигнуто ограничение: {max_rows} строк")
             break
             
-        cells = row.getElementsByType(table.TableCell)
-        
-        if len(cells) < 1:
-            continue
-        
         # Читаем название растения из столбца A
-        plant_name = get_cell_text(cells[0])
+        plant_name = wb.get(row_idx, 0).strip()
         
         if not plant_name or plant_name.lower() == 'sci':
             continue
         
         # Проверяем, есть ли уже ссылка в столбце C
-        existing_link = ""
-        if len(cells) > 2:
-            existing_link = get_cell_text(cells[2])
+        existing_link = wb.get(row_idx, MBG_COLUMN).strip()
         
         if skip_existing and existing_link and existing_link.startswith('http'):
             logger.info(f"Строка {row_idx}: {plant_name}")
@@ -362,46 +360,29 @@ def process_ods_file(input_file, skip_existing=True, max_rows=None,
             stats['skipped'] += 1
             continue
         
-        logger.info(f"Строка {row_idx}: {plant_name}")
-        
         if verbose:
-            logger.debug(f"Начало поиска для: {plant_name}")
+            logger.debug(f"Строка {row_idx}: в очереди поиска: {plant_name}")
         
         stats['processed'] += 1
-        
-        # Сначала пробуем прямой поиск на сайте MBG
-        found_link = search_plant_direct(plant_name, verbose=verbose)
-        
-        # Если не нашли, пробуем через DuckDuckGo
-        if not found_link:
-            if verbose:
-                logger.debug("Прямой поиск не дал результатов, пробуем DuckDuckGo...")
-            found_link = search_plant_google_fallback(plant_name, verbose=verbose)
+        jobs.append(LookupJob(row_idx, MBG_HOST, find_mbg_link, (plant_name, verbose)))
+    
+    def on_result(row_idx, found_link):
+        logger.info(f"Строка {row_idx}: {wb.get(row_idx, 0).strip()}")
         
         if found_link:
             logger.info(f"  ✓ Найдено: {found_link}")
             stats['found'] += 1
             
-            # Убеждаемся, что в строке достаточно ячеек для столбца C
-            while len(cells) < 3:
-                new_cell = table.TableCell()
-                row.appendChild(new_cell)
-                cells = row.getElementsByType(table.TableCell)
-            
             # Записываем ссылку в столбец C
-            set_cell_text(cells[2], found_link)
+            wb.set(row_idx, MBG_COLUMN, found_link)
         else:
             logger.info(f"  ✗ Ссылка не найдена")
             stats['not_found'] += 1
         
-        # Задержка между запросами
-        if stats['processed'] < (max_rows or total_rows):
-            if verbose:
-                logger.debug(f"Пауза {delay} сек...")
-            time.sleep(delay)
-        
         logger.info("")
     
+    run_lookups(jobs, on_result=on_result, workers=workers)
+    
     # Определяем имя выходного файла
     if in_place:
         output_file = input_file
@@ -415,7 +396,7 @@ def process_ods_file(input_file, skip_existing=True, max_rows=None,
     logger.info(f"Сохранение результатов в: {output_file}")
     
     try:
-        doc.save(output_file)
+        wb.save(output_file)
         if verbose:
             logger.debug(f"Файл успешно сохранен")
     except Exception as e:
@@ -491,7 +472,15 @@ def parse_arguments():
         type=float,
         default=2.5,
         metavar='SEC',
-        help='Задержка между запросами в секундах (по умолчанию: 2.5)'
+        help='Начальный интервал между запросами в секундах, далее подстраивается (по умолчанию: 2.5)'
+    )
+    
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=None,
+        metavar='N',
+        help='Количество параллельных запросов к сайту MBG'
     )
     
     parser.add_argument(
@@ -536,7 +525,8 @@ def main():
         max_rows=args.max_rows,
         delay=args.delay,
         verbose=args.verbose,
-        in_place=in_place
+        in_place=in_place,
+        workers=args.workers
     )
     
     if stats is None:
@@ -9,16 +9,27 @@ What's new in v5
   If URL stays on /taxon/overview/... we accept it as found (even if the title is generic).
 - If not found: fall back to /taxon/list?q=...; then UI search at /taxon/.
 - Detailed logging of attempted URLs and collected links.
-- MBG still uses Google CSE; prefers PlantFinderDetails; supports one-word names.
+- MBG: MBG's own search first, then Google CSE (browser only); prefers
+  PlantFinderDetails; supports one-word names.
 - First row is always treated as headers; processing starts from row 2.
+- Plain HTTP (overview redirect check, list-page anchors naming the taxon,
+  MBG's own search) is tried first; only rows it cannot answer are sent to a browser.
+- Rows are shared by a pool of --browsers headless drivers (recycled every
+  --recycle-after page loads) that never load images, fonts or CSS.
 """
 from __future__ import annotations
 
 import argparse
+import queue
+import re
+import sys
+import threading
 import time
-from urllib.parse import quote
+from dataclasses import dataclass
+from pathlib import Path
+from urllib.parse import quote, unquote, urljoin
 
-import ezodf
+import requests
 
 # Selenium
 from selenium import webdriver
@@ -30,6 +41,15 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import WebDriverException, TimeoutException
 
 from name_utils import latin_binomial_key
+from result_journal import DEFAULT_COMPACT_EVERY, ResultJournal
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from common.http_cache import CachedSession
+from common.lookup_engine import LookupJob, run_lookups
+from common.ods import OdsWorkbook
+from common.rate_limit import get_limiter, host_of
+from L_MissouriBotanicalGarden import search_plant_direct as mbg_search_direct
+from link_sources import LinkSource
 
 FLO_BASE = "https://floraveg.eu"
 FLO_LIST_TPL = FLO_BASE + "/taxon/list?q={query}"
@@ -45,10 +65,24 @@ FLO_SEARCH_INPUT_SELECTORS = [
 # Google CSE for Missouri Botanical Garden
 MBG_CSE_TPL = "https://cse.google.com/cse?cx=015816930756675652018:7gxyi5crvvu&q={query}&sa=Search&sitesearch=&width=800"
 
-DEFAULT_SLEEP = 0.3
 FLO_WAIT_SEC = 5.0
 CSE_WAIT_SEC = 12.0
 
+HTTP_TIMEOUT_SEC = 10.0
+FLO_HOST = "floraveg.eu"
+
+DEFAULT_BROWSERS = 2
+DEFAULT_RECYCLE_AFTER = 200
+# How long a stopped worker may take to finish its current row
+WORKER_JOIN_SEC = 5.0
+
+# Only anchors and URLs are read, so images, fonts and stylesheets are never loaded
+BLOCKED_URL_PATTERNS = [
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.svg", "*.ico",
+    "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot",
+    "*.css",
+]
+
 
 def floraveg_candidate_queries(plant_name: str, binomial_key: str | None = None) -> list[str]:
     """Return list of candidate queries/slug segments to try for floraveg."""
@@ -78,8 +112,8 @@ def floraveg_candidate_queries(plant_name: str, binomial_key: str | None = None)
     return candidates
 
 
-def create_driver(browser="chrome", headless=True):
-    """Create Selenium WebDriver (chrome|firefox)."""
+def create_driver(browser="chrome", headless=True, block_assets=True):
+    """Create Selenium WebDriver (chrome|firefox), optionally without images/fonts/CSS."""
     if browser.lower() == "chrome":
         opts = ChromeOptions()
         if headless:
@@ -89,14 +123,50 @@ def create_driver(browser="chrome", headless=True):
         opts.add_argument("--disable-gpu")
         opts.add_argument("--window-size=1280,900")
         opts.set_capability("pageLoadStrategy", "eager")
-        return webdriver.Chrome(options=opts)
+        if block_assets:
+            opts.add_argument("--blink-settings=imagesEnabled=false")
+            opts.add_experimental_option(
+                "prefs", {"profile.managed_default_content_settings.images": 2}
+            )
+        driver = webdriver.Chrome(options=opts)
+        if block_assets:
+            driver.execute_cdp_cmd("Network.enable", {})
+            driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BLOCKED_URL_PATTERNS})
+        return driver
     else:
         opts = FirefoxOptions()
         if headless:
             opts.add_argument("--headless")
+        opts.page_load_strategy = "eager"
+        if block_assets:
+            opts.set_preference("permissions.default.image", 2)
+            opts.set_preference("permissions.default.stylesheet", 2)
+            opts.set_preference("browser.display.use_document_fonts", 0)
+            opts.set_preference("gfx.downloadable_fonts.enabled", False)
         return webdriver.Firefox(options=opts)
 
 
+def open_page(driver, url: str) -> None:
+    """driver.get() paced by the shared per-host rate limiter.
+
+    Selenium exposes no status code, so a successful load counts as healthy
+    and a WebDriver error as a congestion signal.
+    """
+    limiter = get_limiter()
+    host = host_of(url)
+    limiter.acquire(host)
+    started = time.monotonic()
+    try:
+        driver.get(url)
+    except WebDriverException:
+        limiter.record(host, None)
+        raise
+    finally:
+        # Read by BrowserWorker to decide when to recycle the browser
+        driver.pages_loaded = getattr(driver, "pages_loaded", 0) + 1
+    limiter.record(host, 200, time.monotonic() - started)
+
+
 def get_page_title(driver):
     try:
         return (driver.title or "").strip()
@@ -131,7 +201,7 @@ def try_floraveg_overview(driver, plant_name: str, verbose=False) -> str | None:
     try:
         if verbose:
             print("    floraveg: try overview URL:", url)
-        driver.get(url)
+        open_page(driver, url)
         # Wait until URL starts with overview prefix (it should immediately), and give content time
         WebDriverWait(driver, FLO_WAIT_SEC).until(
             lambda d: d.current_url.startswith(FLO_OVERVIEW_PREFIX)
@@ -181,7 +251,7 @@ def find_on_floraveg(
         try:
             if verbose:
                 print(f"    floraveg: open list URL ({candidate!r}):", list_url)
-            driver.get(list_url)
+            open_page(driver, list_url)
             WebDriverWait(driver, FLO_WAIT_SEC).until(
                 lambda d: len(floraveg_collect_overview_links(d)) > 0
             )
@@ -208,7 +278,7 @@ def find_on_floraveg(
         try:
             if verbose:
                 print(f"    floraveg: open UI for {candidate!r}:", FLO_TAXON_UI)
-            driver.get(FLO_TAXON_UI)
+            open_page(driver, FLO_TAXON_UI)
             input_el = None
             for sel in [
                 "input[type='search']",
@@ -265,6 +335,103 @@ def find_on_floraveg(
     return None
 
 
+# -------- plain-HTTP fast path --------
+def make_http_session() -> requests.Session:
+    session = CachedSession("floraveg")
+    session.headers.update({"User-Agent": "Mozilla/5.0 (compatible; floraveg-linker/1.0)"})
+    return session
+
+
+def _html_title(html: str) -> str:
+    m = re.search(r"<title[^>]*>(.*?)</title>", html, flags=re.IGNORECASE | re.DOTALL)
+    return " ".join(m.group(1).split()).lower() if m else ""
+
+
+def floraveg_http_overview(session, plant_name: str, verbose=False) -> str | None:
+    """
+    Plain-HTTP variant of try_floraveg_overview.
+    Accepts the page only when it stays on /taxon/overview/ and the server-rendered
+    title names the taxon; anything less conclusive is left to the browser.
+    """
+    url = FLO_OVERVIEW_PREFIX + quote(plant_name.strip(), safe="_")
+    try:
+        r = session.get(url, timeout=HTTP_TIMEOUT_SEC, allow_redirects=True)
+    except requests.RequestException as e:
+        if verbose:
+            print("    floraveg http: overview error:", e)
+        return None
+    if r.status_code != 200 or not r.url.startswith(FLO_OVERVIEW_PREFIX):
+        return None
+    key = latin_binomial_key(plant_name)
+    title = _html_title(r.text).replace("×", "x")
+    if key and all(part in title for part in key.split()):
+        return r.url
+    return None
+
+
+def _overview_names_taxon(url: str, key: str) -> bool:
+    """True if the /taxon/overview/<name> in `url` contains every word of `key`."""
+    slug = unquote(url[len(FLO_OVERVIEW_PREFIX):].split("?", 1)[0].split("#", 1)[0])
+    words = slug.replace("_", " ").replace("×", "x").lower().split()
+    return all(part in words for part in key.split())
+
+
+def floraveg_http_list(session, candidate: str, verbose=False) -> str | None:
+    """
+    Plain-HTTP variant of the /taxon/list?q= step.
+    Takes the first overview link whose taxon name matches the candidate, so
+    navigation or "related taxa" links elsewhere on the page are never accepted.
+    """
+    key = latin_binomial_key(candidate)
+    if not key:
+        return None
+    url = FLO_LIST_TPL.format(query=quote(candidate.strip()))
+    try:
+        r = session.get(url, timeout=HTTP_TIMEOUT_SEC)
+    except requests.RequestException as e:
+        if verbose:
+            print("    floraveg http: list error:", e)
+        return None
+    if r.status_code != 200:
+        return None
+    for href in re.findall(r'href=["\']([^"\']+)["\']', r.text):
+        absolute = urljoin(FLO_BASE + "/", href)
+        if absolute.startswith(FLO_OVERVIEW_PREFIX) and _overview_names_taxon(absolute, key):
+            return absolute
+    return None
+
+
+def find_on_floraveg_http(session, plant_name: str, verbose=False) -> str | None:
+    """Overview and list lookups without a browser; None means "needs JavaScript"."""
+    key = latin_binomial_key(plant_name)
+    if not key:
+        return None
+    candidates = floraveg_candidate_queries(plant_name, binomial_key=key)
+    for candidate in candidates:
+        url = floraveg_http_overview(session, candidate, verbose=verbose)
+        if url:
+            return url
+    for candidate in candidates:
+        url = floraveg_http_list(session, candidate, verbose=verbose)
+        if url:
+            return url
+    return None
+
+
+def resolve_row_http(session, task: "RowTask", verbose=False) -> dict[int, str]:
+    """Fill what plain HTTP can answer: floraveg overview/list and MBG (see find_on_mbg)."""
+    values: dict[int, str] = {}
+    if task.need_floraveg:
+        u1 = find_on_floraveg_http(session, task.name, verbose=verbose)
+        if u1:
+            values[1] = u1
+    if task.need_mbg:
+        u2 = find_on_mbg(None, task.name, verbose=verbose)
+        if u2:
+            values[2] = u2
+    return values
+
+
 # -------- MBG via Google CSE --------
 def find_on_mbg_cse(driver, plant_name: str, verbose=False) -> str | None:
     """
@@ -277,7 +444,7 @@ def find_on_mbg_cse(driver, plant_name: str, verbose=False) -> str | None:
     try:
         if verbose:
             print("    MBG CSE url:", url)
-        driver.get(url)
+        open_page(driver, url)
         wait = WebDriverWait(driver, CSE_WAIT_SEC)
         try:
             wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, ".gsc-results .gsc-webResult")))
@@ -317,118 +484,315 @@ def find_on_mbg_cse(driver, plant_name: str, verbose=False) -> str | None:
         return None
 
 
-# -------- ODS helpers --------
-def ensure_cell(ws, r, c):
-    """Ensure ws[r, c] exists."""
-    try:
-        return ws[r, c]
-    except IndexError:
-        if r >= ws.nrows():
-            ws.append_rows(r - ws.nrows() + 1)
-        if c >= ws.ncols():
-            ws.append_columns(c - ws.ncols() + 1)
-        return ws[r, c]
+def find_on_mbg(driver, plant_name: str, verbose=False) -> str | None:
+    """
+    The MBG resolver of both paths: MBG's own search first, Google CSE after it.
+    Without a driver (plain-HTTP path) only the first step runs; the direct
+    search is cached, so the browser repeating it costs no request.
+    """
+    url = mbg_search_direct(plant_name, verbose=verbose)
+    if url or driver is None:
+        return url
+    return find_on_mbg_cse(driver, plant_name, verbose=verbose)
 
 
-def process_ods(path: str, browser: str, headless: bool, max_rows: int | None, verbose: bool):
-    print(f"Opening ODS: {path}")
-    doc = ezodf.opendoc(path)
-    if not doc.sheets:
-        raise RuntimeError("ODS has no sheets.")
-    ws = doc.sheets[0]
+# -------- browser pool --------
+@dataclass(frozen=True)
+class RowTask:
+    """One sheet row to resolve; `need_*` tell which columns are still empty."""
 
-    # Always treat the first row as headers
-    first_data_row = 1 if ws.nrows() > 1 else 0
-    ensure_cell(ws, 0, 1).set_value("floraveg")
-    ensure_cell(ws, 0, 2).set_value("MBG")
+    row: int
+    name: str
+    need_floraveg: bool
+    need_mbg: bool
 
-    end_row = ws.nrows() if max_rows is None else min(ws.nrows(), first_data_row + max_rows)
-    total = max(0, end_row - first_data_row)
-    print(f"Rows to process: {total} (from {first_data_row} to {end_row-1})")
 
-    driver = create_driver(browser=browser, headless=headless)
-    print(f"Browser started: {browser} (headless={headless})")
+def resolve_row(driver, task: RowTask, verbose=False) -> dict[int, str]:
+    """Look up the empty columns of one row; returns {column index: value}."""
+    values: dict[int, str] = {}
 
-    changed = 0
+    # floraveg (binomials only)
+    if task.need_floraveg:
+        binomial_key = latin_binomial_key(task.name)
+        if binomial_key:
+            u1 = find_on_floraveg(driver, task.name, verbose=verbose, binomial_key=binomial_key)
+            values[1] = u1 or "no"
+        elif verbose:
+            print(f"  {task.name}: floraveg skipped (not binomial)")
+
+    # MBG (any non-empty name)
+    if task.need_mbg:
+        u2 = find_on_mbg(driver, task.name, verbose=verbose)
+        if u2:
+            values[2] = u2
+        elif verbose:
+            print(f"  {task.name}: MBG not found")
+
+    return values
+
+
+_WORKER_DONE = object()
+
+
+class BrowserWorker(threading.Thread):
+    """Owns one WebDriver and resolves rows from a shared queue.
+
+    The driver is recycled after `recycle_after` page loads to keep memory
+    growth and browser-side leaks bounded on long runs. The worker stops
+    taking rows once `stop` is set and always quits its driver on the way out.
+    """
+
+    def __init__(self, worker_id: int, tasks: queue.Queue, results: queue.Queue,
+                 browser: str, headless: bool, recycle_after: int, verbose: bool,
+                 stop: threading.Event):
+        super().__init__(name=f"browser-{worker_id}", daemon=True)
+        self.tasks = tasks
+        self.results = results
+        self.browser = browser
+        self.headless = headless
+        self.recycle_after = max(1, recycle_after)
+        self.verbose = verbose
+        self.stop = stop
+        self.driver = None
+
+    def _quit(self) -> None:
+        driver, self.driver = self.driver, None
+        if driver is not None:
+            quit_driver(driver)
+
+    def abort(self) -> None:
+        """Quit the driver from another thread, failing the row in progress."""
+        driver = self.driver
+        if driver is not None:
+            quit_driver(driver)
+
+    def run(self):
+        try:
+            while not self.stop.is_set():
+                try:
+                    task = self.tasks.get_nowait()
+                except queue.Empty:
+                    break
+                if self.driver is not None and getattr(self.driver, "pages_loaded", 0) >= self.recycle_after:
+                    if self.verbose:
+                        print(f"  {self.name}: recycling browser")
+                    self._quit()
+                if self.driver is None:
+                    try:
+                        self.driver = create_driver(browser=self.browser, headless=self.headless)
+                    except WebDriverException as e:
+                        print(f"  {self.name}: could not start browser: {e}")
+                        self.tasks.put(task)
+                        break
+                try:
+                    values = resolve_row(self.driver, task, verbose=self.verbose)
+                except WebDriverException as e:
+                    print(f"  {self.name}: browser error on {task.name!r}: {e}")
+                    self._quit()
+                    values = {}
+                self.results.put((task, values))
+        finally:
+            self._quit()
+            self.results.put(_WORKER_DONE)
+
+
+def quit_driver(driver) -> None:
     try:
-        for i, r in enumerate(range(first_data_row, end_row), start=1):
-            a = ws[r, 0]
-            name = (a.value or "").strip() if a else ""
-            if not name:
-                if verbose:
-                    print(f"[{i}/{total}] skip empty row")
+        driver.quit()
+    except Exception:
+        pass
+
+
+def resolve_rows(
+    row_tasks: list[RowTask],
+    on_result,
+    browser: str = "chrome",
+    headless: bool = True,
+    browsers: int = DEFAULT_BROWSERS,
+    recycle_after: int = DEFAULT_RECYCLE_AFTER,
+    http_fast_path: bool = True,
+    verbose: bool = False,
+) -> int:
+    """Resolve rows with plain HTTP first and the browser pool for the rest.
+
+    `on_result(task, {column: value})` is always called on this thread, so
+    the caller can update its table without locking. Returns the number of
+    rows left unprocessed because no browser could be started.
+    """
+    tasks: queue.Queue = queue.Queue()
+
+    # Plain HTTP first; only rows it cannot answer reach a browser.
+    if http_fast_path and row_tasks:
+        print(f"Rows needing lookups: {len(row_tasks)}; trying plain HTTP first")
+        session = make_http_session()
+
+        def on_http_result(task: RowTask, values) -> None:
+            values = values or {}
+            if values:
+                on_result(task, values)
+            # floraveg only knows binomials; the browser would skip the rest too
+            need_floraveg = task.need_floraveg and 1 not in values and bool(latin_binomial_key(task.name))
+            rest = RowTask(task.row, task.name, need_floraveg, task.need_mbg and 2 not in values)
+            if rest.need_floraveg or rest.need_mbg:
+                tasks.put(rest)
+
+        run_lookups(
+            [LookupJob(task, FLO_HOST, resolve_row_http, (session, task, verbose)) for task in row_tasks],
+            on_result=on_http_result,
+        )
+        print(f"Plain HTTP resolved {len(row_tasks) - tasks.qsize()} rows completely")
+    else:
+        for task in row_tasks:
+            tasks.put(task)
+
+    pending = tasks.qsize()
+    browsers = max(0, min(browsers, pending))
+    print(f"Rows needing a browser: {pending}; browsers: {browser} x{browsers} (headless={headless})")
+
+    # Each worker owns a WebDriver; results come back to this thread.
+    results: queue.Queue = queue.Queue()
+    stop = threading.Event()
+    workers = [
+        BrowserWorker(n, tasks, results, browser, headless, recycle_after, verbose, stop)
+        for n in range(browsers)
+    ]
+    done = 0
+    try:
+        for worker in workers:
+            worker.start()
+        finished_workers = 0
+        while finished_workers < len(workers):
+            item = results.get()
+            if item is _WORKER_DONE:
+                finished_workers += 1
                 continue
+            task, values = item
+            done += 1
+            print(f"[{done}/{pending}] {task.name}")
+            if values:
+                on_result(task, values)
+    finally:
+        # On Ctrl-C or an error in on_result no browser may outlive the run
+        stop.set()
+        for worker in workers:
+            if worker.is_alive():
+                worker.join(WORKER_JOIN_SEC)
+            if worker.is_alive():
+                worker.abort()
+                worker.join(WORKER_JOIN_SEC)
+    return pending - done
+
+
+def resolve_link_tasks(tasks, on_result) -> None:
+    """`LinkSource.resolve` for sync_links: columns B and C of the shared table."""
+    by_row = {task.row: task for task in tasks}
+    row_tasks = [RowTask(task.row, task.name, 1 in task.columns, 2 in task.columns) for task in tasks]
+    resolve_rows(row_tasks, lambda row_task, values: on_result(by_row[row_task.row], values))
+
+
+LINK_SOURCE = LinkSource(
+    name="floraveg",
+    headers={1: "floraveg", 2: "MBG"},
+    resolve=resolve_link_tasks,
+)
+
+
+def process_ods(
+    path: str,
+    browser: str,
+    headless: bool,
+    max_rows: int | None,
+    verbose: bool,
+    compact_every: int = DEFAULT_COMPACT_EVERY,
+    browsers: int = DEFAULT_BROWSERS,
+    recycle_after: int = DEFAULT_RECYCLE_AFTER,
+    http_fast_path: bool = True,
+):
+    print(f"Opening ODS: {path}")
+    wb = OdsWorkbook(path)
+
+    # Always treat the first row as headers
+    first_data_row = 1 if len(wb) > 1 else 0
+    wb.set(0, 1, "floraveg")
+    wb.set(0, 2, "MBG")
+
+    # Results are journalled per cell; the workbook is rewritten only every
+    # `compact_every` results. Replay what an interrupted run left behind.
+    journal = ResultJournal(path, "floraveg", compact_every)
+    names = [wb.get(r, 0).strip() for r in range(len(wb))]
+    resumed = 0
+    for r, c, value in journal.replay(names):
+        if r >= first_data_row:
+            wb.set(r, c, value)
+            resumed += 1
+    if resumed:
+        print(f"Resumed {resumed} cells from {journal.path.name}")
+
+    def store(row: int, name: str, column: int, value: str) -> None:
+        wb.set(row, column, value)
+        if journal.record(name, column, value):
+            wb.save()
+            journal.compacted()
+
+    end_row = len(wb) if max_rows is None else min(len(wb), first_data_row + max_rows)
+    total = max(0, end_row - first_data_row)
+    print(f"Rows to process: {total} (from {first_data_row} to {end_row-1})")
 
-            flo_cell = ensure_cell(ws, r, 1)
-            mbg_cell = ensure_cell(ws, r, 2)
+    tasks: list[RowTask] = []
+    for r in range(first_data_row, end_row):
+        name = wb.get(r, 0).strip()
+        if not name:
+            if verbose:
+                print(f"[row {r}] skip empty row")
+            continue
+        need_flo = not wb.get(r, 1).strip()
+        need_mbg = not wb.get(r, 2).strip()
+        if need_flo or need_mbg:
+            tasks.append(RowTask(r, name, need_flo, need_mbg))
 
-            print(f"[{i}/{total}] {name}")
+    changed = 0
 
-            # floraveg (binomials only)
-            if not (flo_cell.value or "").strip():
-                binomial_key = latin_binomial_key(name)
-                if binomial_key:
-                    u1 = find_on_floraveg(
-                        driver, name, verbose=verbose, binomial_key=binomial_key
-                    )
-                    if u1:
-                        flo_cell.set_value(u1)
-                        doc.save()
-                        changed += 1
-                        if verbose:
-                            print("  floraveg:", u1)
-                    else:
-                        flo_cell.set_value("no")
-                        doc.save()
-                        changed += 1
-                        if verbose:
-                            print("  floraveg: not found (marked 'no')")
-                else:
-                    if verbose:
-                        print("  floraveg: skipped (not binomial)")
-
-            # MBG via CSE (any non-empty name)
-            if not (mbg_cell.value or "").strip():
-                u2 = find_on_mbg_cse(driver, name, verbose=verbose)
-                if u2:
-                    mbg_cell.set_value(u2)
-                    doc.save()
-                    changed += 1
-                    if verbose:
-                        print("  MBG:", u2)
-                else:
-                    if verbose:
-                        print("  MBG: not found")
-
-            time.sleep(DEFAULT_SLEEP)
+    def on_result(task: RowTask, values: dict[int, str]) -> None:
+        nonlocal changed
+        for column, value in sorted(values.items()):
+            store(task.row, task.name, column, value)
+            changed += 1
+            if verbose:
+                print(f"  {task.name}: {'floraveg' if column == 1 else 'MBG'}: {value}")
 
+    try:
+        unprocessed = resolve_rows(tasks, on_result, browser=browser, headless=headless, browsers=browsers,
+                                   recycle_after=recycle_after, http_fast_path=http_fast_path, verbose=verbose)
     finally:
-        try:
-            driver.quit()
-        except Exception:
-            pass
-        try:
-            doc.save()
-        finally:
-            try:
-                doc.close()
-            except Exception:
-                pass
+        wb.save()
+        journal.compacted()
 
+    if unprocessed:
+        print(f"Warning: {unprocessed} rows were not processed (no working browser).")
     print(f"Done. Cells updated: {changed}")
 
 
 def main():
-    p = argparse.ArgumentParser(description="Fill ODS with links from floraveg.eu and MBG (via CSE).")
+    p = argparse.ArgumentParser(description="Fill ODS with links from floraveg.eu and MBG (own search, then CSE).")
     p.add_argument("ods_path", help="Path to .ods file")
     p.add_argument("--browser", default="chrome", choices=["chrome", "firefox"], help="Browser for Selenium")
     p.add_argument("--no-headless", action="store_true", help="Run browser with UI")
     p.add_argument("--max-rows", type=int, default=None, help="Limit processed rows")
+    p.add_argument("--browsers", type=int, default=DEFAULT_BROWSERS,
+                   help="Number of parallel headless browsers")
+    p.add_argument("--recycle-after", type=int, default=DEFAULT_RECYCLE_AFTER,
+                   help="Restart each browser after this many page loads")
+    p.add_argument("--no-http-fast-path", action="store_true",
+                   help="Always use the browser, skip plain-HTTP lookups")
+    p.add_argument("--compact-every", type=int, default=DEFAULT_COMPACT_EVERY,
+                   help="Rewrite the ODS from the result journal every N results")
     p.add_argument("-v", "--verbose", action="store_true", help="Verbose output")
     args = p.parse_args()
 
     process_ods(args.ods_path, browser=args.browser, headless=not args.no_headless,
-                max_rows=args.max_rows, verbose=args.verbose)
+                max_rows=args.max_rows, verbose=args.verbose, compact_every=args.compact_every,
+                browsers=args.browsers, recycle_after=args.recycle_after,
+                http_fast_path=not args.no_http_fast_path)
 
 
 if __name__ == "__main__":
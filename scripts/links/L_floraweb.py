@@ -5,16 +5,24 @@
 """
 
 import argparse
+import bisect
 import logging
 import sys
-import time
 import re
+import threading
 from pathlib import Path
 import requests
 from bs4 import BeautifulSoup
-import pandas as pd
-from openpyxl import load_workbook
-from openpyxl.utils.dataframe import dataframe_to_rows
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from common.http_cache import CachedSession
+from common.lookup_engine import LookupJob, run_lookups
+from common.ods import OdsError, OdsWorkbook
+from result_journal import DEFAULT_COMPACT_EVERY, ResultJournal
+from link_sources import LinkSource
+
+FLORAWEB_HOST = "www.floraweb.de"
+FLORAWEB_COLUMN = 3  # D
 
 # Настройка логирования
 def setup_logging(verbose):
@@ -27,23 +35,20 @@ def setup_logging(verbose):
     return logging.getLogger(__name__)
 
 def read_ods_file(filepath):
-    """Чтение ODS файла с помощью pandas"""
+    """Чтение первого листа ODS файла"""
     try:
-        # Читаем ODS файл
-        df = pd.read_excel(filepath, engine='odf', header=None)
+        wb = OdsWorkbook(filepath)
         logging.info(f"Успешно загружен файл {filepath}")
-        logging.info(f"Размер таблицы: {len(df)} строк × {len(df.columns)} столбцов")
-        return df
-    except Exception as e:
+        logging.info(f"Размер таблицы: {len(wb)} строк × {wb.ncols} столбцов")
+        return wb
+    except OdsError as e:
         logging.error(f"Ошибка при чтении файла {filepath}: {e}")
         sys.exit(1)
 
-def save_ods_file(df, filepath):
-    """Сохранение DataFrame обратно в ODS файл"""
+def save_ods_file(wb, filepath):
+    """Запись изменённых ячеек обратно в ODS файл"""
     try:
-        # Сохраняем в ODS формат
-        with pd.ExcelWriter(filepath, engine='odf', mode='w') as writer:
-            df.to_excel(writer, index=False, header=False)
+        wb.save(filepath)
         logging.info(f"Файл {filepath} успешно сохранён")
     except Exception as e:
         logging.error(f"Ошибка при сохранении файла: {e}")
@@ -122,105 +127,127 @@ def search_plant_via_taxoquery(plant_name, session, timeout=5):
         logging.error(f"Неожиданная ошибка при поиске через taxoquery {plant_name}: {e}")
         return None
 
-def search_plant_on_floraweb(plant_name, session, timeout=5):
-    """Поиск растения на сайте floraweb.de - сначала через алфавитный указатель, потом через taxoquery"""
-    
-    # Метод 1: Поиск через алфавитный указатель
-    first_letters = get_first_letters(plant_name)
-    if not first_letters:
-        logging.warning(f"Не удалось определить буквы для поиска: {plant_name}")
-        # Переходим сразу к методу 2
-        return search_plant_via_taxoquery(plant_name, session, timeout)
-    
-    # Формируем URL для алфавитного указателя
-    url = f"https://www.floraweb.de/php/register.php?lower={first_letters}"
-    
-    logging.debug(f"Метод 1 - Алфавитный указатель: {url}")
-    
-    try:
-        response = session.get(url, timeout=timeout)
-        response.raise_for_status()
-        
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        # Структура страницы: список <li> с ссылками <a>
-        # Ищем все элементы списка
-        list_items = soup.find_all('li')
-        
-        logging.debug(f"Найдено элементов списка: {len(list_items)}")
-        
-        for li in list_items:
-            # В каждом <li> ищем ссылку
-            link = li.find('a')
-            if not link:
+def floraweb_absolute_url(href):
+    """Полный URL для ссылки со страниц floraweb.de"""
+    if href.startswith('/'):
+        return f"https://www.floraweb.de{href}"
+    if href.startswith('http'):
+        return href
+    # Относительный путь от текущей директории
+    return f"https://www.floraweb.de/php/{href}"
+
+
+class FlorawebRegisterIndex:
+    """
+    Локальный индекс алфавитного указателя floraweb.de (register.php?lower=XX).
+
+    Каждая двухбуквенная страница скачивается один раз; все её записи
+    разбираются в словарь «название → ссылка», так что десять видов Rosa
+    стоят одного запроса к странице «Ro». Страница, которую не удалось
+    загрузить, не запоминается и запрашивается снова при следующем поиске.
+    """
+
+    def __init__(self, session, timeout=5):
+        self.session = session
+        self.timeout = timeout
+        # название из записи (до стрелки) -> (порядок на странице, текст, URL)
+        self._entries = {}
+        # префикс -> отсортированный список ключей записей этого префикса
+        self._sorted_keys = {}
+        self._prefix_locks = {}
+        self._lock = threading.Lock()
+
+    def _parse_register(self, html):
+        soup = BeautifulSoup(html, 'html.parser')
+        entries = {}
+        # Сначала записи списка <li>, затем остальные ссылки страницы —
+        # тот же приоритет, что был у поиска по странице
+        anchors = [li.find('a') for li in soup.find_all('li')]
+        anchors.extend(soup.find_all('a'))
+        for order, link in enumerate(anchors):
+            if link is None:
+                continue
+            href = link.get('href')
+            if not href:
                 continue
-            
             link_text = link.get_text(strip=True)
-            
             # Убираем стрелку и текст после неё (например, "→ Hunds-Rose")
-            if '→' in link_text:
-                # Берём только часть до стрелки
-                plant_part = link_text.split('→')[0].strip()
-            else:
-                plant_part = link_text
-            
-            # Теперь проверяем совпадение
-            # plant_part может быть "Rosa canina L." или "Rosa canina Mill." и т.д.
-            if plant_part.startswith(plant_name):
-                # Проверяем, что после названия идёт пробел, точка или конец строки
-                if len(plant_part) == len(plant_name) or \
-                   (len(plant_part) > len(plant_name) and plant_part[len(plant_name)] in ' .'):
-                    
-                    href = link.get('href')
-                    if href:
-                        # Формируем полный URL
-                        if href.startswith('/'):
-                            full_url = f"https://www.floraweb.de{href}"
-                        elif href.startswith('http'):
-                            full_url = href
-                        else:
-                            # Относительный путь от текущей директории
-                            full_url = f"https://www.floraweb.de/php/{href}"
-                        
-                        logging.info(f"✓ Найдено в алфавитном указателе: {plant_name} → '{link_text}' → {full_url}")
-                        return full_url
-        
-        # Если не нашли в списках, пробуем поискать просто в ссылках
-        all_links = soup.find_all('a')
-        
-        for link in all_links:
-            link_text = link.get_text(strip=True)
-            
-            # Обработка текста со стрелками
-            if '→' in link_text:
-                plant_part = link_text.split('→')[0].strip()
-            else:
-                plant_part = link_text
-            
-            if plant_part.startswith(plant_name):
-                if len(plant_part) == len(plant_name) or \
-                   (len(plant_part) > len(plant_name) and plant_part[len(plant_name)] in ' .'):
-                    
-                    href = link.get('href')
-                    if href:
-                        if href.startswith('/'):
-                            full_url = f"https://www.floraweb.de{href}"
-                        elif href.startswith('http'):
-                            full_url = href
-                        else:
-                            full_url = f"https://www.floraweb.de/php/{href}"
-                        
-                        logging.info(f"✓ Найдено в алфавитном указателе (вне списка): {plant_name} → '{link_text}' → {full_url}")
-                        return full_url
-        
+            plant_part = link_text.split('→')[0].strip() if '→' in link_text else link_text
+            if plant_part and plant_part not in entries:
+                entries[plant_part] = (order, link_text, floraweb_absolute_url(href))
+        return entries
+
+    def _load_prefix(self, prefix):
+        with self._lock:
+            if prefix in self._sorted_keys:
+                return
+            lock = self._prefix_locks.setdefault(prefix, threading.Lock())
+        with lock:
+            if prefix in self._sorted_keys:
+                return
+            url = f"https://www.floraweb.de/php/register.php?lower={prefix}"
+            logging.debug(f"Загрузка алфавитного указателя: {url}")
+            try:
+                response = self.session.get(url, timeout=self.timeout)
+                response.raise_for_status()
+                entries = self._parse_register(response.text)
+                logging.debug(f"Указатель {prefix}: {len(entries)} записей")
+            except requests.Timeout:
+                logging.error(f"Превышено время ожидания для алфавитного указателя: {prefix}")
+                return
+            except requests.RequestException as e:
+                logging.error(f"Ошибка при запросе алфавитного указателя {prefix}: {e}")
+                return
+            with self._lock:
+                self._entries.update(entries)
+                self._sorted_keys[prefix] = sorted(entries)
+
+    def prefetch(self, plant_names, workers=None):
+        """Параллельно загружает все страницы указателя, нужные для plant_names"""
+        prefixes = sorted({p for p in map(get_first_letters, plant_names) if p})
+        logging.info(f"Алфавитный указатель: загрузка {len(prefixes)} страниц")
+        jobs = [LookupJob(prefix, FLORAWEB_HOST, self._load_prefix, (prefix,)) for prefix in prefixes]
+        run_lookups(jobs, workers=workers)
+
+    def lookup(self, plant_name):
+        """
+        Ищет plant_name в указателе так же, как поиск по странице: запись
+        совпадает с названием (с учётом регистра) или начинается с него,
+        а дальше идёт пробел или точка (например, "Rosa canina L.").
+        Из подходящих берётся первая на странице. Возвращает (текст записи, URL) или None.
+        """
+        prefix = get_first_letters(plant_name)
+        if not prefix:
+            return None
+        self._load_prefix(prefix)
+        keys = self._sorted_keys.get(prefix, [])
+        best = None
+        for candidate in keys[bisect.bisect_left(keys, plant_name):]:
+            if not candidate.startswith(plant_name):
+                break
+            if len(candidate) == len(plant_name) or candidate[len(plant_name)] in ' .':
+                entry = self._entries[candidate]
+                if best is None or entry[0] < best[0]:
+                    best = entry
+        return (best[1], best[2]) if best else None
+
+
+def search_plant_on_floraweb(plant_name, session, timeout=5, index=None):
+    """Поиск растения на сайте floraweb.de - сначала через алфавитный указатель, потом через taxoquery"""
+    
+    if index is None:
+        index = FlorawebRegisterIndex(session, timeout)
+    
+    # Метод 1: Поиск через алфавитный указатель (из локального индекса)
+    if not get_first_letters(plant_name):
+        logging.warning(f"Не удалось определить буквы для поиска: {plant_name}")
+    else:
+        hit = index.lookup(plant_name)
+        if hit:
+            link_text, full_url = hit
+            logging.info(f"✓ Найдено в алфавитном указателе: {plant_name} → '{link_text}' → {full_url}")
+            return full_url
         logging.debug(f"Не найдено в алфавитном указателе: {plant_name}")
-        
-    except requests.Timeout:
-        logging.error(f"Превышено время ожидания для алфавитного указателя: {plant_name}")
-    except requests.RequestException as e:
-        logging.error(f"Ошибка при запросе алфавитного указателя для {plant_name}: {e}")
-    except Exception as e:
-        logging.error(f"Неожиданная ошибка при поиске в алфавитном указателе {plant_name}: {e}")
     
     # Метод 2: Если не нашли в алфавитном указателе, пробуем через taxoquery
     logging.debug(f"Переключаемся на метод 2 - taxoquery для: {plant_name}")
@@ -231,43 +258,76 @@ def search_plant_on_floraweb(plant_name, session, timeout=5):
     
     return result
 
-def process_plants(filepath, max_rows=None, verbose=False):
+
+def make_session():
+    """HTTP-сессия с кэшем ответов floraweb.de"""
+    session = CachedSession("floraweb")
+    session.headers.update({
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+    })
+    return session
+
+def resolve_link_tasks(tasks, on_result, workers=None):
+    """Поиск для sync_links: указатель загружается один раз на все строки"""
+    session = make_session()
+    index = FlorawebRegisterIndex(session)
+    index.prefetch([task.name for task in tasks], workers=workers)
+    jobs = [LookupJob(task, FLORAWEB_HOST, search_plant_on_floraweb, (task.name, session, 5, index)) for task in tasks]
+    run_lookups(
+        jobs,
+        on_result=lambda task, link: on_result(task, {FLORAWEB_COLUMN: link} if link else {}),
+        workers=workers,
+    )
+
+# Источник для sync_links: столбец D, только названия из 2+ слов
+LINK_SOURCE = LinkSource(
+    name="floraweb",
+    headers={FLORAWEB_COLUMN: "floraweb"},
+    resolve=resolve_link_tasks,
+    accepts=lambda name: len(name.split()) >= 2,
+)
+
+def process_plants(filepath, max_rows=None, verbose=False, workers=None, compact_every=DEFAULT_COMPACT_EVERY):
     """Основная функция обработки растений"""
     
     logger = setup_logging(verbose)
     
     # Читаем файл
-    df = read_ods_file(filepath)
+    wb = read_ods_file(filepath)
     
-    # Убеждаемся, что столбец D (индекс 3) существует
-    while len(df.columns) <= 3:
-        df[len(df.columns)] = None
+    # Результаты прошлого прерванного запуска из журнала
+    journal = ResultJournal(filepath, "floraweb", compact_every)
+    resumed = 0
+    for idx, col, value in journal.replay([row[0] if row else "" for row in wb.rows]):
+        wb.set(idx, col, value)
+        resumed += 1
+    if resumed:
+        logging.info(f"Восстановлено из журнала {journal.path.name}: {resumed} ссылок")
     
     # Создаём сессию для HTTP запросов
-    session = requests.Session()
-    session.headers.update({
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-    })
+    session = make_session()
     
     processed = 0
     found = 0
     skipped = 0
     
     # Определяем количество строк для обработки
-    rows_to_process = min(len(df), max_rows) if max_rows else len(df)
+    rows_to_process = min(len(wb), max_rows) if max_rows else len(wb)
     
     logging.info(f"Начинаем обработку {rows_to_process} строк")
     
+    index = FlorawebRegisterIndex(session)
+    jobs = []
     for idx in range(rows_to_process):
         # Получаем значение из столбца A (индекс 0)
-        plant_name = df.iloc[idx, 0] if pd.notna(df.iloc[idx, 0]) else None
+        plant_name = wb.get(idx, 0)
         
-        if not plant_name:
+        if not plant_name.strip():
             logging.debug(f"Строка {idx + 1}: пустая, пропускаем")
             skipped += 1
             continue
         
-        plant_name = str(plant_name).strip()
+        plant_name = plant_name.strip()
         
         # Проверяем, что название содержит 2+ слова
         words = plant_name.split()
@@ -277,30 +337,38 @@ def process_plants(filepath, max_rows=None, verbose=False):
             continue
         
         # Проверяем, не заполнен ли уже столбец D
-        existing_link = df.iloc[idx, 3] if len(df.columns) > 3 else None
-        if pd.notna(existing_link) and existing_link:
+        existing_link = wb.get(idx, FLORAWEB_COLUMN)
+        if existing_link.strip():
             logging.debug(f"Строка {idx + 1}: '{plant_name}' - ссылка уже есть, пропускаем")
             skipped += 1
             continue
         
         logging.info(f"Обработка строки {idx + 1}: '{plant_name}'")
-        
-        # Ищем растение на сайте
-        link = search_plant_on_floraweb(plant_name, session)
-        
+        jobs.append(LookupJob(idx, FLORAWEB_HOST, search_plant_on_floraweb, (plant_name, session, 5, index)))
+    
+    # Каждая страница указателя скачивается один раз для всех растений
+    index.prefetch([job.args[0] for job in jobs], workers=workers)
+    
+    def on_result(idx, link):
+        nonlocal processed, found
+        processed += 1
         if link:
             # Записываем ссылку в столбец D (индекс 3)
-            df.iloc[idx, 3] = link
+            wb.set(idx, FLORAWEB_COLUMN, link)
             found += 1
             
-            # Сохраняем файл после каждой найденной ссылки
-            save_ods_file(df, filepath)
-        
-        processed += 1
-        
-        # Небольшая задержка между запросами
-        if processed < rows_to_process:
-            time.sleep(0.5)
+            # Ссылка сразу попадает в журнал; ODS перезаписывается раз в compact_every находок
+            if journal.record(wb.get(idx, 0).strip(), FLORAWEB_COLUMN, link):
+                save_ods_file(wb, filepath)
+                journal.compacted()
+    
+    # Запросы идут параллельно, но не больше `workers` одновременно к floraweb.de;
+    # темп задаёт адаптивный ограничитель в CachedSession
+    run_lookups(jobs, on_result=on_result, workers=workers)
+    
+    if found or resumed:
+        save_ods_file(wb, filepath)
+    journal.compacted()
     
     # Финальная статистика
     logging.info("=" * 50)
@@ -331,6 +399,18 @@ def main():
         default=None,
         help='Максимальное количество строк для обработки'
     )
+    parser.add_argument(
+        '--compact-every',
+        type=int,
+        default=DEFAULT_COMPACT_EVERY,
+        help='Сохранять ODS из журнала результатов каждые N найденных ссылок'
+    )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=None,
+        help='Количество параллельных запросов к floraweb.de'
+    )
     
     args = parser.parse_args()
     
@@ -345,7 +425,7 @@ def main():
     
     # Запускаем обработку
     try:
-        found_count = process_plants(filepath, args.max_rows, args.verbose)
+        found_count = process_plants(filepath, args.max_rows, args.verbose, args.workers, args.compact_every)
         sys.exit(0 if found_count > 0 else 1)
     except KeyboardInterrupt:
         print("\nОбработка прервана пользователем")
@@ -3,17 +3,25 @@ import logging
 import math
 import re
 import sys
+from pathlib import Path
 from typing import Optional, List
-import pandas as pd
 import requests
 from urllib.parse import quote_plus
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from common.http_cache import CachedSession
+from common.lookup_engine import LookupJob, run_lookups
+from common.ods import OdsWorkbook
+from link_sources import LinkSource, single_column_resolver
+
 # ----------- HTTP session -----------
-SESSION = requests.Session()
+SESSION = CachedSession("infoflora")
 SESSION.headers.update({
     "User-Agent": "Mozilla/5.0 (compatible; InfofloraLinker/1.0; +https://example.com)"
 })
 REQUEST_TIMEOUT = 5  # seconds
+INFOFLORA_HOST = "www.infoflora.ch"
+INFOFLORA_COLUMN = 4  # E
 
 # ----------- Utilities -----------
 def is_empty(val) -> bool:
@@ -164,28 +172,32 @@ def find_infoflora_url(name: str) -> Optional[str]:
     url = try_duckduckgo(name)
     return url
 
+# ----------- In-process source for sync_links -----------
+LINK_SOURCE = LinkSource(
+    name="infoflora",
+    headers={INFOFLORA_COLUMN: "infoflora"},
+    resolve=single_column_resolver(INFOFLORA_COLUMN, INFOFLORA_HOST, find_infoflora_url),
+    accepts=lambda name: word_count(name) >= 2,
+)
+
 # ----------- I/O with ODS -----------
-def load_ods(path: str) -> pd.DataFrame:
+def load_ods(path: str) -> OdsWorkbook:
     logging.info(f"Loading ODS: {path}")
     # первая вкладка по умолчанию
-    return pd.read_excel(path, engine="odf")
+    return OdsWorkbook(path)
 
-def save_ods(df: pd.DataFrame, path: str) -> None:
+def save_ods(wb: OdsWorkbook, path: str) -> None:
     logging.info(f"Writing back to ODS: {path}")
-    # перезаписываем файл тем же именем; другие столбцы сохраняются
-    with pd.ExcelWriter(path, engine="odf") as writer:
-        df.to_excel(writer, index=False)
+    # записываются только изменённые ячейки; другие столбцы и стили сохраняются
+    wb.save(path)
 
 # ----------- Main routine -----------
-def process_file(path: str, max_rows: Optional[int] = None) -> None:
-    df = load_ods(path)
+def process_file(path: str, max_rows: Optional[int] = None, workers: Optional[int] = None) -> None:
+    wb = load_ods(path)
 
-    # гарантируем наличие нужных столбцов
-    # столбец A -> индекс 0, столбец E -> индекс 4
-    # если датафрейм уже с именованными колонками, работаем по позиции
-    if df.shape[1] < 5:
-        logging.error("File must have at least 5 columns (A..E).")
-        sys.exit(1)
+    # столбец A -> индекс 0, столбец E -> индекс 4; первая строка — заголовки
+    if not wb.get(0, INFOFLORA_COLUMN).strip():
+        wb.set(0, INFOFLORA_COLUMN, "infoflora")
 
     processed = 0
     updated = 0
@@ -193,12 +205,13 @@ def process_file(path: str, max_rows: Optional[int] = None) -> None:
     skipped_short = 0
     failed = 0
 
-    n_rows = len(df) if max_rows is None else min(len(df), max_rows)
-    logging.info(f"Rows to check: {n_rows}")
+    n_rows = len(wb) if max_rows is None else min(len(wb), 1 + max_rows)
+    logging.info(f"Rows to check: {max(0, n_rows - 1)}")
 
-    for idx in range(n_rows):
-        name_cell = df.iat[idx, 0]
-        link_cell = df.iat[idx, 4] if df.shape[1] >= 5 else None
+    jobs = []
+    for idx in range(1, n_rows):
+        name_cell = wb.get(idx, 0)
+        link_cell = wb.get(idx, INFOFLORA_COLUMN)
 
         if not is_empty(link_cell):
             skipped_filled += 1
@@ -210,24 +223,29 @@ def process_file(path: str, max_rows: Optional[int] = None) -> None:
             logging.debug(f"Row {idx}: empty name, skip.")
             continue
 
-        name_str = str(name_cell).strip()
+        name_str = name_cell.strip()
         if word_count(name_str) < 2:
             skipped_short += 1
             logging.debug(f"Row {idx}: single word '{name_str}', skip.")
             continue
 
         processed += 1
-        url = find_infoflora_url(name_str)
+        jobs.append(LookupJob(idx, INFOFLORA_HOST, find_infoflora_url, (name_str,)))
+
+    def on_result(idx, url):
+        nonlocal updated, failed
         if url:
-            df.iat[idx, 4] = url
+            wb.set(idx, INFOFLORA_COLUMN, url)
             updated += 1
             logging.info(f"Row {idx}: set URL -> {url}")
         else:
             failed += 1
-            logging.warning(f"Row {idx}: not found -> '{name_str}'")
+            logging.warning(f"Row {idx}: not found -> '{wb.get(idx, 0)}'")
+
+    run_lookups(jobs, on_result=on_result, workers=workers)
 
     # сохраняем изменения, даже если ни одной ссылки не найдено (но файл не будет повреждён)
-    save_ods(df, path)
+    save_ods(wb, path)
 
     logging.info("Done.")
     logging.info(f"Processed: {processed}, Updated: {updated}, "
@@ -240,6 +258,7 @@ def parse_args(argv=None):
     )
     p.add_argument("path", help="Path to links.ods")
     p.add_argument("--max-rows", type=int, default=None, help="Limit number of processed rows")
+    p.add_argument("--workers", type=int, default=None, help="Concurrent requests to infoflora.ch")
     p.add_argument("-v", "--verbose", action="store_true", help="Verbose logging")
     return p.parse_args(argv)
 
@@ -250,7 +269,7 @@ def main():
         format="%(levelname)s: %(message)s"
     )
     try:
-        process_file(args.path, args.max_rows)
+        process_file(args.path, args.max_rows, args.workers)
     except Exception as e:
         logging.error(f"Fatal error: {e}")
         sys.exit(2)
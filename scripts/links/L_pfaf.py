@@ -2,23 +2,30 @@
 import argparse
 import logging
 import sys
-import time
 import re
+from pathlib import Path
 from urllib.parse import quote_plus, urljoin, urlparse, parse_qs
 import requests
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
-import pandas as pd
 from bs4 import BeautifulSoup
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from common.http_cache import CachedSession
+from common.lookup_engine import LookupJob, run_lookups
+from common.ods import OdsError, OdsWorkbook
+from link_sources import LinkSource, single_column_resolver
+
 PFAF_BASE = "https://pfaf.org"
+PFAF_HOST = "pfaf.org"
+PFAF_COLUMN = 5  # F
 TIMEOUT = 5  # seconds
 HEADERS = {
     "User-Agent": "Mozilla/5.0 (compatible; pfaf-linker/1.0; +https://example.org)"
 }
 
 def make_session():
-    s = requests.Session()
+    s = CachedSession("pfaf")
     retries = Retry(
         total=3,
         connect=2,
@@ -122,12 +129,26 @@ def find_pfaf_link(session: requests.Session, latin_name: str) -> str | None:
         return link
     return None
 
+def resolve_link_tasks(tasks, on_result):
+    session = make_session()
+    resolve = single_column_resolver(PFAF_COLUMN, PFAF_HOST, lambda name: find_pfaf_link(session, name))
+    resolve(tasks, on_result)
+
+# Источник для sync_links: столбец F, только названия из 2+ слов
+LINK_SOURCE = LinkSource(
+    name="pfaf",
+    headers={PFAF_COLUMN: "pfaf"},
+    resolve=resolve_link_tasks,
+    accepts=is_multitoken_latin,
+)
+
 def main():
     parser = argparse.ArgumentParser(
         description="Заполняет столбец F файла .ods ссылками на страницы растений с pfaf.org."
     )
     parser.add_argument("ods_path", help="Путь к файлу .ods (например, links.ods)")
     parser.add_argument("--max-rows", type=int, default=None, help="Максимум обрабатываемых строк")
+    parser.add_argument("--workers", type=int, default=None, help="Параллельных запросов к pfaf.org")
     parser.add_argument("-v", "--verbose", action="store_true", help="Подробный лог")
     args = parser.parse_args()
 
@@ -141,62 +162,58 @@ def main():
     logging.info(f"Чтение файла: {ods_path}")
 
     try:
-        df = pd.read_excel(ods_path, engine="odf", header=0)
-    except Exception as e:
+        wb = OdsWorkbook(ods_path)
+    except OdsError as e:
         logging.error(f"Не удалось прочитать .ods: {e}")
         sys.exit(1)
 
-    if df.shape[1] <= 5:
-        for _ in range(6 - df.shape[1]):
-            df[f"_tmp_{_}"] = pd.NA
+    if not wb.get(0, PFAF_COLUMN).strip():
+        wb.set(0, PFAF_COLUMN, "pfaf")
 
     session = make_session()
 
     processed = 0
     updated_rows = 0
 
-    total_rows = len(df)
+    total_rows = max(0, len(wb) - 1)
     logging.info(f"Строк в таблице: {total_rows}")
 
-    col_name_A = df.columns[0]
-    col_name_F = df.columns[5]
-
-    for idx, row in df.iterrows():
+    jobs = []
+    for idx in range(1, len(wb)):
         if args.max_rows is not None and processed >= args.max_rows:
             break
+        processed += 1
 
-        name = str(row[col_name_A]).strip() if pd.notna(row[col_name_A]) else ""
-        existing = str(row[col_name_F]).strip() if pd.notna(row[col_name_F]) else ""
+        name = wb.get(idx, 0).strip()
+        existing = wb.get(idx, PFAF_COLUMN).strip()
 
         if not is_multitoken_latin(name):
             logging.debug(f"[{idx}] Пропуск: '{name}' — пусто/одно слово")
-            processed += 1
             continue
 
         if existing and existing.lower() != "nan":
             logging.debug(f"[{idx}] Пропуск: столбец F уже заполнен: {existing}")
-            processed += 1
             continue
 
         logging.info(f"[{idx}] Поиск: {name}")
-        link = find_pfaf_link(session, name)
+        jobs.append(LookupJob(idx, PFAF_HOST, find_pfaf_link, (session, name)))
 
+    def on_result(idx, link):
+        nonlocal updated_rows
         if link:
-            df.at[idx, col_name_F] = link
+            wb.set(idx, PFAF_COLUMN, link)
             updated_rows += 1
             logging.info(f"[{idx}] Найдено: {link}")
         else:
             logging.warning(f"[{idx}] Не найдено на pfaf.org")
 
-        processed += 1
-        time.sleep(0.2)
+    run_lookups(jobs, on_result=on_result, workers=args.workers)
 
     logging.info(f"Обновлено строк: {updated_rows}. Сохранение файла...")
 
     try:
-        with pd.ExcelWriter(ods_path, engine="odf", mode="w") as writer:
-            df.to_excel(writer, index=False)
-    except Exception as e:
+        wb.save()
+    except (OdsError, OSError) as e:
         logging.error(f"Не удалось записать .ods: {e}")
         sys.exit(1)
 
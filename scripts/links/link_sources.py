@@ -0,0 +1,260 @@
+"""In-process link sources for ``sync_links.py``.
+
+Every ``L_*.py`` scraper exposes a module-level ``LINK_SOURCE`` describing the
+columns of ``links.ods`` it fills and a ``resolve`` callable that looks up a
+batch of rows. ``sync_links`` imports the scrapers once, hands them the rows
+of the workbook it already holds in memory and writes the result once, instead
+of starting one Python process per scraper that re-reads and rewrites the
+whole file.
+"""
+from __future__ import annotations
+
+import importlib
+import logging
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, FrozenSet, Iterable, List, Mapping, Optional, Sequence, Set, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from common.lookup_engine import LookupJob, run_lookups
+
+__all__ = [
+    "LinkSource",
+    "LinkTask",
+    "column_lanes",
+    "discover_link_sources",
+    "run_link_sources",
+    "single_column_resolver",
+]
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class LinkTask:
+    """One sheet row handed to a source; ``columns`` are the cells still empty."""
+
+    row: int
+    name: str
+    columns: FrozenSet[int]
+
+
+ResultCallback = Callable[[LinkTask, Dict[int, str]], None]
+# on_record(task, column, value_or_None): called once per looked-up cell
+RecordCallback = Callable[[LinkTask, int, Optional[str]], None]
+
+
+def _has_text(value: str) -> bool:
+    return bool((value or "").strip())
+
+
+@dataclass(frozen=True)
+class LinkSource:
+    """Description of one scraper.
+
+    ``resolve(tasks, on_result)`` must report every task it finishes through
+    ``on_result(task, {column: value})`` on the calling thread.
+    """
+
+    name: str
+    headers: Mapping[int, str]
+    resolve: Callable[[List[LinkTask], ResultCallback], None]
+    accepts: Callable[[str], bool] = _has_text
+    is_filled: Callable[[str], bool] = _has_text
+
+    @property
+    def columns(self) -> FrozenSet[int]:
+        return frozenset(self.headers)
+
+    def tasks_for(self, rows: Sequence[Sequence[str]], row_indices: Optional[Iterable[int]] = None) -> List[LinkTask]:
+        """Build tasks for data rows (row 0 is the header) with empty cells."""
+        indices = range(1, len(rows)) if row_indices is None else sorted(set(row_indices))
+        tasks: List[LinkTask] = []
+        for idx in indices:
+            if idx < 1 or idx >= len(rows):
+                continue
+            row = rows[idx]
+            name = (row[0] if row else "").strip()
+            if not name or not self.accepts(name):
+                continue
+            missing = frozenset(
+                col for col in self.headers if not self.is_filled(row[col] if col < len(row) else "")
+            )
+            if missing:
+                tasks.append(LinkTask(idx, name, missing))
+        return tasks
+
+
+def single_column_resolver(
+    column: int,
+    host: str,
+    lookup: Callable[[str], Optional[str]],
+    workers: Optional[int] = None,
+) -> Callable[[List[LinkTask], ResultCallback], None]:
+    """Adapt a blocking ``lookup(name) -> url | None`` to ``LinkSource.resolve``."""
+
+    def resolve(tasks: List[LinkTask], on_result: ResultCallback) -> None:
+        jobs = [LookupJob(task, host, lookup, (task.name,)) for task in tasks]
+        run_lookups(
+            jobs,
+            on_result=lambda task, value: on_result(task, {column: value} if value else {}),
+            workers=workers,
+        )
+
+    return resolve
+
+
+def discover_link_sources(links_dir: Path) -> List[LinkSource]:
+    """Import every ``L_*.py`` in ``links_dir`` and collect its ``LINK_SOURCE``.
+
+    A scraper whose dependencies are missing is logged and skipped so the
+    remaining sources still run.
+    """
+    if str(links_dir) not in sys.path:
+        sys.path.insert(0, str(links_dir))
+    sources: List[LinkSource] = []
+    for path in sorted(links_dir.glob("L_*.py")):
+        try:
+            module = importlib.import_module(path.stem)
+        except Exception as exc:
+            logger.error("Could not load %s: %s", path.name, exc)
+            continue
+        source = getattr(module, "LINK_SOURCE", None)
+        if not isinstance(source, LinkSource):
+            logger.warning("%s does not define LINK_SOURCE, skipping", path.name)
+            continue
+        sources.append(source)
+    return sources
+
+
+def _ensure_width(rows: List[List[str]], width: int) -> None:
+    for row in rows:
+        if len(row) < width:
+            row.extend([""] * (width - len(row)))
+
+
+def _run_source(
+    rows: List[List[str]],
+    source: LinkSource,
+    row_indices: Optional[List[int]],
+    on_record: Optional[RecordCallback] = None,
+) -> int:
+    tasks = source.tasks_for(rows, row_indices)
+    if not tasks:
+        logger.info("%s: nothing to look up", source.name)
+        return 0
+    logger.info("%s: looking up %d rows", source.name, len(tasks))
+    found = 0
+
+    def on_result(task: LinkTask, values: Dict[int, str]) -> None:
+        nonlocal found
+        values = values or {}
+        for col in sorted(task.columns):
+            value = values.get(col) or None
+            if value:
+                rows[task.row][col] = value
+                found += 1
+            if on_record is not None:
+                on_record(task, col, value)
+
+    try:
+        source.resolve(tasks, on_result)
+    except Exception as exc:  # one broken scraper must not lose the others' results
+        logger.error("%s failed: %s", source.name, exc)
+    logger.info("%s: filled %d cells", source.name, found)
+    return found
+
+
+def column_lanes(sources: Sequence[LinkSource]) -> List[List[LinkSource]]:
+    """Group sources so that no two groups write the same column.
+
+    Sources sharing a column (floraveg and MBG both fill C) stay in one lane
+    and keep their relative order; lanes are ordered by their first source.
+    """
+    lanes: List[List[int]] = []
+    lane_columns: List[Set[int]] = []
+    for idx, source in enumerate(sources):
+        hits = [n for n, cols in enumerate(lane_columns) if cols & source.columns]
+        if not hits:
+            lanes.append([idx])
+            lane_columns.append(set(source.columns))
+            continue
+        target = hits[0]
+        for n in reversed(hits[1:]):
+            lanes[target].extend(lanes.pop(n))
+            lane_columns[target] |= lane_columns.pop(n)
+        lanes[target].append(idx)
+        lane_columns[target] |= source.columns
+    return [[sources[i] for i in sorted(lane)] for lane in lanes]
+
+
+def _run_lane(
+    rows: Sequence[Sequence[str]],
+    lane: List[LinkSource],
+    row_indices: Optional[List[int]],
+    on_record: Optional[RecordCallback] = None,
+) -> Dict[Tuple[int, int], str]:
+    """Run one lane on a private copy of ``rows``; return the cells it changed."""
+    scratch = [list(row) for row in rows]
+    for source in lane:
+        _run_source(scratch, source, row_indices, on_record)
+    columns = sorted({col for source in lane for col in source.columns})
+    return {
+        (r, col): scratch[r][col]
+        for r in range(1, len(rows))
+        for col in columns
+        if scratch[r][col] != rows[r][col]
+    }
+
+
+def run_link_sources(
+    rows: List[List[str]],
+    sources: Sequence[LinkSource],
+    row_indices: Optional[Iterable[int]] = None,
+    parallel: bool = False,
+    on_record: Optional[RecordCallback] = None,
+) -> int:
+    """Run ``sources`` against ``rows`` in place; return the number of cells filled.
+
+    Sequentially, a later source sharing a column only sees the cells an
+    earlier one left empty. With ``parallel=True`` the column lanes (see
+    ``column_lanes``) run at the same time into separate result sets, which
+    are then merged lane by lane in row/column order, so the outcome does not
+    depend on which lane finished first.
+
+    ``on_record`` sees every looked-up cell as soon as its result arrives,
+    misses included (value ``None``); in parallel mode it is called from the
+    lane threads.
+    """
+    if not rows:
+        return 0
+    width = max([len(rows[0])] + [col + 1 for source in sources for col in source.columns])
+    _ensure_width(rows, width)
+    header = rows[0]
+    for source in sources:
+        for col, label in sorted(source.headers.items()):
+            if not header[col].strip():
+                header[col] = label
+
+    indices = None if row_indices is None else list(row_indices)
+    if not parallel:
+        return sum(_run_source(rows, source, indices, on_record) for source in sources)
+
+    lanes = column_lanes(sources)
+    logger.info(
+        "Running %d lanes in parallel: %s",
+        len(lanes),
+        "; ".join(" -> ".join(source.name for source in lane) for lane in lanes),
+    )
+    with ThreadPoolExecutor(max_workers=max(1, len(lanes)), thread_name_prefix="links-lane") as pool:
+        futures = [pool.submit(_run_lane, rows, lane, indices, on_record) for lane in lanes]
+        lane_results = [future.result() for future in futures]
+
+    filled = 0
+    for results in lane_results:
+        for (r, col), value in sorted(results.items()):
+            rows[r][col] = value
+            filled += 1
+    return filled
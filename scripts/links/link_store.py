@@ -0,0 +1,352 @@
+"""SQLite working store for the link columns of ``links.ods``.
+
+Plants are keyed by ``canonical_name_key``; a name that occurs more than once
+in the sheet gets one entry per occurrence (``paulownia``, ``paulownia#2``),
+so duplicate rows keep their own links. The ``links`` table holds one column
+per source (``floraveg``, ``mbg``, ``floraweb`` ...) plus, for each source,
+when it was last looked up, the outcome as an HTTP-like status (200 found,
+404 not found) and the value the sheet last showed. Columns with a blank
+header, or a header clashing with an earlier one, are stored by position.
+Two small tables keep the sheet layout: the header labels and which plant
+sits in which row.
+
+Lookups write here one transaction per result, so concurrent sources and
+interrupted runs are safe; ``links.ods`` is regenerated from the store with
+``export_ods``. Edits made in ``links.ods`` since the last export are taken
+over by ``merge_rows`` (see there for conflicts).
+"""
+from __future__ import annotations
+
+import re
+import sqlite3
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from name_utils import canonical_name_key
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from common.ods import write_sheet_rows
+
+__all__ = [
+    "DEFAULT_STORE_PATH",
+    "LinkStore",
+    "MergeResult",
+]
+
+DEFAULT_STORE_PATH = Path(__file__).resolve().parent / "links.sqlite"
+
+FOUND = 200
+NOT_FOUND = 404
+# Values the scrapers write for "looked up, nothing there"
+_MISS_VALUES = frozenset({"", "no"})
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS links (
+    key TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sheet_columns (
+    position INTEGER PRIMARY KEY,
+    label TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sheet_rows (
+    position INTEGER PRIMARY KEY,
+    key TEXT NOT NULL,
+    name TEXT NOT NULL
+);
+"""
+
+
+def column_name(label: str) -> str:
+    """SQL column for a sheet header label (``"MBG"`` -> ``"mbg"``)."""
+    name = re.sub(r"[^0-9a-z]+", "_", label.strip().lower()).strip("_")
+    return f"c_{name}" if not name or name[0].isdigit() else name
+
+
+def storage_columns(labels: Sequence[str]) -> List[str]:
+    """SQL column per sheet column (``""`` for the name column).
+
+    Blank headers are stored by position, and so is a label that normalizes
+    to the name of an earlier column (``"MBG"`` next to ``"mbg"``).
+    """
+    columns: List[str] = [""]
+    for position, label in enumerate(labels[1:], start=1):
+        name = column_name(label) if label.strip() else ""
+        if not name:
+            name = f"c_blank_{position}"
+        elif name in columns:
+            name = f"{name}_{position}"
+        columns.append(name)
+    return columns
+
+
+def row_keys(names: Sequence[str]) -> List[str]:
+    """Store keys for sheet names in order: the n-th repeat of a name gets ``#n``."""
+    seen: Dict[str, int] = {}
+    keys: List[str] = []
+    for name in names:
+        key = canonical_name_key(name)
+        if key:
+            seen[key] = seen.get(key, 0) + 1
+            if seen[key] > 1:
+                key = f"{key}#{seen[key]}"
+        keys.append(key)
+    return keys
+
+
+@dataclass
+class MergeResult:
+    """Outcome of ``LinkStore.merge_rows``."""
+
+    adopted: int = 0
+    conflicts: List[str] = field(default_factory=list)
+
+
+class LinkStore:
+    """Thread-safe store of link values keyed by canonical Latin name and occurrence."""
+
+    def __init__(self, path: Path | str = DEFAULT_STORE_PATH) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+        self._columns = {row[1] for row in self._conn.execute("PRAGMA table_info(links)")}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    # -- layout -------------------------------------------------------------
+
+    def is_empty(self) -> bool:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM sheet_columns").fetchone()[0] == 0
+
+    def header(self) -> List[str]:
+        with self._lock:
+            return self._header_locked()
+
+    def _ensure_column_locked(self, name: str) -> str:
+        for column, sql_type in ((name, "TEXT"), (f"{name}_checked_at", "REAL"),
+                                 (f"{name}_status", "INTEGER"), (f"{name}_sheet", "TEXT")):
+            if column not in self._columns:
+                self._conn.execute(f'ALTER TABLE links ADD COLUMN "{column}" {sql_type}')
+                self._columns.add(column)
+        return name
+
+    def _set_header_locked(self, rows: Sequence[Sequence[str]]) -> List[str]:
+        """Record the header of ``rows``; columns holding data but no label count too."""
+        header = rows[0] if rows else []
+        width = max((len(row) for row in rows), default=0)
+        current = [label for (label,) in self._conn.execute("SELECT label FROM sheet_columns ORDER BY position")]
+        labels = [
+            (header[i] if i < len(header) else "").strip() or (current[i] if i < len(current) else "")
+            for i in range(max(width, len(current)))
+        ]
+        self._conn.execute("DELETE FROM sheet_columns")
+        self._conn.executemany(
+            "INSERT INTO sheet_columns (position, label) VALUES (?, ?)", list(enumerate(labels))
+        )
+        return [self._ensure_column_locked(name) if name else "" for name in storage_columns(labels)]
+
+    def _set_layout_locked(self, rows: Sequence[Sequence[str]]) -> Iterator[Tuple[int, str, str, Sequence[str]]]:
+        """Upsert the plants of ``rows`` and record their positions.
+
+        Yields ``(position, key, name, row)`` per plant row.
+        """
+        now = time.time()
+        self._conn.execute("DELETE FROM sheet_rows")
+        names = [(row[0] if row else "").strip() for row in rows[1:]]
+        for position, (key, name, row) in enumerate(zip(row_keys(names), names, rows[1:]), start=1):
+            if not key:
+                continue
+            self._conn.execute(
+                "INSERT INTO links (key, name, created_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET name = excluded.name",
+                (key, name, now),
+            )
+            self._conn.execute("INSERT INTO sheet_rows (position, key, name) VALUES (?, ?, ?)", (position, key, name))
+            yield position, key, name, row
+
+    # -- bulk ---------------------------------------------------------------
+
+    def replace_rows(self, rows: Sequence[Sequence[str]]) -> None:
+        """Make the sheet layout follow ``rows`` (header first).
+
+        Plants are upserted and non-empty cells stored; a stored value is never
+        blanked by an empty cell. Plants no longer in ``rows`` keep their links
+        and reappear with them if they are added back.
+        """
+        with self._lock, self._conn:
+            columns = self._set_header_locked(rows)
+            for _, key, _, row in self._set_layout_locked(rows):
+                for idx, column in enumerate(columns):
+                    value = (row[idx] if idx < len(row) else "").strip()
+                    if column and value:
+                        self._conn.execute(
+                            f'UPDATE links SET "{column}" = ?, "{column}_sheet" = ? '
+                            f'WHERE key = ? AND COALESCE("{column}", \'\') = \'\'',
+                            (value, value, key),
+                        )
+
+    def merge_rows(self, rows: Sequence[Sequence[str]], sheet_mtime: Optional[float] = None) -> MergeResult:
+        """Take over cells edited in the sheet (by hand, or by a standalone
+        ``L_*.py`` run on ``links.ods``) since the store last exported it.
+
+        A cell counts as edited when it differs from the value last exported;
+        the edit, including clearing a cell, replaces the store value unless
+        the store has changed that cell too. Such a conflict goes to the
+        newer side: the sheet if ``sheet_mtime`` is later than the store's
+        last lookup of the cell, the store otherwise. Conflicts are reported
+        in the result. Without an export on record only non-empty cells the
+        store lacks or disagrees with are considered.
+
+        The sheet also sets the row layout; plants new to the store are added.
+        """
+        result = MergeResult()
+        with self._lock, self._conn:
+            columns = self._set_header_locked(rows)
+            for _, key, name, row in list(self._set_layout_locked(rows)):
+                cur = self._conn.execute("SELECT * FROM links WHERE key = ?", (key,))
+                stored = dict(zip([d[0] for d in cur.description], cur.fetchone()))
+                for idx, column in enumerate(columns):
+                    if not column:
+                        continue
+                    sheet = (row[idx] if idx < len(row) else "").strip()
+                    value = (stored.get(column) or "").strip()
+                    exported = stored.get(f"{column}_sheet")
+                    if sheet == value:
+                        if exported != sheet:
+                            self._conn.execute(
+                                f'UPDATE links SET "{column}_sheet" = ? WHERE key = ?', (sheet, key)
+                            )
+                        continue
+                    if exported is not None and sheet == exported.strip():
+                        continue  # sheet untouched; the store is newer
+                    if exported is None and not sheet:
+                        continue
+                    if not value or (exported is not None and value == exported.strip()):
+                        take_sheet = True
+                    else:
+                        checked = stored.get(f"{column}_checked_at")
+                        take_sheet = sheet_mtime is not None and (checked is None or sheet_mtime > checked)
+                        kept = "sheet" if take_sheet else "store"
+                        result.conflicts.append(
+                            f"{name} / {self._label_locked(idx)}: sheet {sheet!r}, store {value!r} -> kept {kept}"
+                        )
+                    if take_sheet:
+                        status = NOT_FOUND if sheet in _MISS_VALUES else FOUND
+                        self._conn.execute(
+                            f'UPDATE links SET "{column}" = ?, "{column}_sheet" = ?, "{column}_status" = ? '
+                            "WHERE key = ?",
+                            (sheet or None, sheet, status, key),
+                        )
+                        result.adopted += 1
+        return result
+
+    def _header_locked(self) -> List[str]:
+        return [label for (label,) in self._conn.execute("SELECT label FROM sheet_columns ORDER BY position")]
+
+    def _label_locked(self, position: int) -> str:
+        row = self._conn.execute("SELECT label FROM sheet_columns WHERE position = ?", (position,)).fetchone()
+        return (row[0] if row else "") or f"column {position + 1}"
+
+    def _load_locked(self) -> Tuple[List[str], List[str], list]:
+        header = self._header_locked()
+        columns = storage_columns(header)
+        selected = ", ".join(
+            f'l."{c}"' if c in self._columns else "NULL" for c in columns[1:]
+        ) or "NULL"
+        body = self._conn.execute(
+            f"SELECT r.position, r.key, r.name, {selected} FROM sheet_rows r JOIN links l ON l.key = r.key "
+            "ORDER BY r.position"
+        ).fetchall()
+        return header, columns, body
+
+    def load_rows(self) -> List[List[str]]:
+        """Return the sheet (header first) as the store currently has it."""
+        with self._lock:
+            header, _, body = self._load_locked()
+        rows: List[List[str]] = [list(header)]
+        for position, _, name, *values in body:
+            while len(rows) < position:
+                rows.append([""] * len(header))
+            row = [name] + ["" if v is None else str(v) for v in values[: max(0, len(header) - 1)]]
+            rows.append(row + [""] * (len(header) - len(row)))
+        return rows
+
+    def export_ods(self, ods_path: Path | str) -> int:
+        """Write the store to ``ods_path``; returns the number of cells changed.
+
+        The exported values are remembered, so ``merge_rows`` can tell later
+        edits of the sheet from values the store has changed since.
+        """
+        changed = write_sheet_rows(ods_path, self.load_rows())
+        with self._lock, self._conn:
+            _, columns, body = self._load_locked()
+            for _, key, _, *values in body:
+                for column, value in zip(columns[1:], values):
+                    if column in self._columns:
+                        self._conn.execute(
+                            f'UPDATE links SET "{column}_sheet" = ? WHERE key = ?',
+                            ("" if value is None else str(value).strip(), key),
+                        )
+        return changed
+
+    # -- single results -----------------------------------------------------
+
+    def record(self, row: int, column: int, value: Optional[str], status: Optional[int] = None) -> None:
+        """Store one lookup outcome for sheet cell ``(row, column)``.
+
+        The cell maps to the same SQL column as in ``replace_rows`` and
+        ``export_ods``. ``value=None`` records a lookup that found nothing
+        without touching the stored value; ``status`` defaults to 200/404
+        from ``value``.
+        """
+        if column <= 0:
+            return
+        if status is None:
+            status = NOT_FOUND if value is None or value.strip() in _MISS_VALUES else FOUND
+        now = time.time()
+        with self._lock, self._conn:
+            found = self._conn.execute("SELECT key FROM sheet_rows WHERE position = ?", (row,)).fetchone()
+            if found is None:
+                return
+            key = found[0]
+            columns = storage_columns(self._header_locked())
+            if column >= len(columns):
+                return
+            col = self._ensure_column_locked(columns[column])
+            if value is None:
+                self._conn.execute(
+                    f'UPDATE links SET "{col}_checked_at" = ?, "{col}_status" = ? WHERE key = ?',
+                    (now, status, key),
+                )
+            else:
+                self._conn.execute(
+                    f'UPDATE links SET "{col}" = ?, "{col}_checked_at" = ?, "{col}_status" = ? WHERE key = ?',
+                    (value, now, status, key),
+                )
+
+    def stats(self) -> Dict[str, int]:
+        """Number of stored values per source column."""
+        with self._lock:
+            labels = self._header_locked()
+            out: Dict[str, int] = {}
+            for label, col in zip(labels[1:], storage_columns(labels)[1:]):
+                if not label:
+                    continue
+                if col in self._columns:
+                    out[label] = self._conn.execute(
+                        f'SELECT COUNT(*) FROM links WHERE COALESCE("{col}", \'\') != \'\''
+                    ).fetchone()[0]
+            return out
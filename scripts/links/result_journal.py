@@ -0,0 +1,89 @@
+"""Crash-safe append-only journal of link-scraper results.
+
+Instead of re-serialising ``links.ods`` after every hit, scrapers append each
+result as one JSON line to ``<workbook>.<source>.journal.jsonl`` and fsync it.
+The journal is compacted into the workbook every N results and at the end of
+a run. A run that was interrupted replays the journal on start-up, so no
+finished lookup is lost.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+from name_utils import canonical_name_key
+
+__all__ = [
+    "DEFAULT_COMPACT_EVERY",
+    "ResultJournal",
+]
+
+DEFAULT_COMPACT_EVERY = 50
+
+logger = logging.getLogger(__name__)
+
+
+class ResultJournal:
+    """JSONL journal of ``(latin name, column index, value)`` results."""
+
+    def __init__(self, workbook_path: Path | str, source: str, compact_every: int = DEFAULT_COMPACT_EVERY) -> None:
+        workbook_path = Path(workbook_path)
+        self.path = workbook_path.with_name(f"{workbook_path.stem}.{source}.journal.jsonl")
+        self.compact_every = max(1, int(compact_every))
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def entries(self) -> List[Tuple[str, int, str]]:
+        """Return journalled results in write order.
+
+        A torn last line (crash mid-write) is ignored.
+        """
+        if not self.path.exists():
+            return []
+        out: List[Tuple[str, int, str]] = []
+        with self.path.open("r", encoding="utf-8") as fh:
+            for line_no, line in enumerate(fh, start=1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    item = json.loads(line)
+                    out.append((str(item["name"]), int(item["column"]), str(item["value"])))
+                except (ValueError, KeyError, TypeError):
+                    logger.warning("%s:%d: skipping unreadable journal line", self.path.name, line_no)
+        return out
+
+    def replay(self, row_names: Sequence[str]) -> Iterator[Tuple[int, int, str]]:
+        """Yield ``(row index, column, value)`` for journalled rows present in ``row_names``."""
+        rows_by_key: Dict[str, List[int]] = {}
+        for idx, name in enumerate(row_names):
+            key = canonical_name_key(name or "")
+            if key:
+                rows_by_key.setdefault(key, []).append(idx)
+        for name, column, value in self.entries():
+            for idx in rows_by_key.get(canonical_name_key(name), []):
+                yield idx, column, value
+
+    def record(self, name: str, column: int, value: str) -> bool:
+        """Durably append one result; return True when a compaction is due."""
+        line = json.dumps({"name": name, "column": column, "value": value}, ensure_ascii=False)
+        with self._lock:
+            with self.path.open("a", encoding="utf-8") as fh:
+                fh.write(line + "\n")
+                fh.flush()
+                os.fsync(fh.fileno())
+            self._pending += 1
+            return self._pending >= self.compact_every
+
+    def compacted(self) -> None:
+        """Forget journalled results once they are safely in the workbook."""
+        with self._lock:
+            self._pending = 0
+            try:
+                self.path.unlink()
+            except FileNotFoundError:
+                pass
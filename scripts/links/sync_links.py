@@ -1,47 +1,24 @@
 #!/usr/bin/env python3
-"""Synchronise links.ods Latin names with PlantData.csv."""
+"""Synchronise links.ods Latin names with PlantData.csv.
+
+The links themselves live in the SQLite store of ``link_store.py``; links.ods
+is exported from it at the end of every run (or alone with ``--export-only``).
+"""
 from __future__ import annotations
 
 import argparse
 import csv
-import os
-import re
-import subprocess
+import logging
 import sys
-import tempfile
-import zipfile
 from pathlib import Path
 from typing import Iterable, List, Sequence, Tuple
-import xml.etree.ElementTree as ET
 
+from link_sources import LinkTask, discover_link_sources, run_link_sources
+from link_store import DEFAULT_STORE_PATH, LinkStore
 from name_utils import canonical_name_key
 
-# Namespaces used in ODF content.xml files
-NAMESPACES = {
-    "office": "urn:oasis:names:tc:opendocument:xmlns:office:1.0",
-    "table": "urn:oasis:names:tc:opendocument:xmlns:table:1.0",
-    "text": "urn:oasis:names:tc:opendocument:xmlns:text:1.0",
-    "style": "urn:oasis:names:tc:opendocument:xmlns:style:1.0",
-    "fo": "urn:oasis:names:tc:opendocument:xmlns:xsl-fo-compatible:1.0",
-    "meta": "urn:oasis:names:tc:opendocument:xmlns:meta:1.0",
-    "number": "urn:oasis:names:tc:opendocument:xmlns:datastyle:1.0",
-    "draw": "urn:oasis:names:tc:opendocument:xmlns:drawing:1.0",
-    "svg": "urn:oasis:names:tc:opendocument:xmlns:svg-compatible:1.0",
-    "dc": "http://purl.org/dc/elements/1.1/",
-    "xlink": "http://www.w3.org/1999/xlink",
-    "chart": "urn:oasis:names:tc:opendocument:xmlns:chart:1.0",
-    "dr3d": "urn:oasis:names:tc:opendocument:xmlns:dr3d:1.0",
-    "math": "http://www.w3.org/1998/Math/MathML",
-    "form": "urn:oasis:names:tc:opendocument:xmlns:form:1.0",
-    "script": "urn:oasis:names:tc:opendocument:xmlns:script:1.0",
-    "dom": "http://www.w3.org/2001/xml-events",
-    "xforms": "http://www.w3.org/2002/xforms",
-    "xsd": "http://www.w3.org/2001/XMLSchema",
-    "xsi": "http://www.w3.org/2001/XMLSchema-instance",
-}
-
-for prefix, uri in NAMESPACES.items():
-    ET.register_namespace(prefix, uri)
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from common.ods import OdsError, read_sheet_rows
 
 
 def parse_args(argv: Sequence[str] | None = None) -> argparse.Namespace:
@@ -60,6 +37,27 @@ def parse_args(argv: Sequence[str] | None = None) -> argparse.Namespace:
         default=Path(__file__).resolve().parent / "links.ods",
         help="Path to links.ods (default: scripts/links/links.ods)",
     )
+    parser.add_argument(
+        "--store",
+        type=Path,
+        default=DEFAULT_STORE_PATH,
+        help="SQLite link store (default: scripts/links/links.sqlite, created from links.ods)",
+    )
+    parser.add_argument(
+        "--export-only",
+        action="store_true",
+        help="Only regenerate links.ods from the link store",
+    )
+    parser.add_argument(
+        "--parallel",
+        action="store_true",
+        help="Run link sources that fill different columns at the same time",
+    )
+    parser.add_argument(
+        "--all-rows",
+        action="store_true",
+        help="Let link sources fill empty cells of every row, not only new entries",
+    )
     return parser.parse_args(argv)
 
 
@@ -79,34 +77,11 @@ def read_plant_names(csv_path: Path) -> List[Tuple[int, str]]:
     return names
 
 
-def extract_namespace_declarations(xml_text: str) -> None:
-    default_match = re.search(r"xmlns=\"([^\"]+)\"", xml_text)
-    if default_match:
-        ET.register_namespace("", default_match.group(1))
-    for prefix, uri in re.findall(r"xmlns:([A-Za-z0-9_-]+)=\"([^\"]+)\"", xml_text):
-        ET.register_namespace(prefix, uri)
-
-
-def read_ods_rows(ods_path: Path) -> Tuple[List[List[str]], str]:
-    with zipfile.ZipFile(ods_path) as archive:
-        content_bytes = archive.read("content.xml")
-        content_text = content_bytes.decode("utf-8")
-    extract_namespace_declarations(content_text)
-    root = ET.fromstring(content_text)
-    ns = {"table": NAMESPACES["table"], "text": NAMESPACES["text"]}
-    table_elem = root.find(".//table:table", ns)
-    if table_elem is None:
-        raise RuntimeError("Could not find table element in links.ods")
-    rows: List[List[str]] = []
-    for row in table_elem.findall("table:table-row", ns):
-        cells: List[str] = []
-        for cell in row.findall("table:table-cell", ns):
-            repeat = int(cell.get(f"{{{NAMESPACES['table']}}}number-columns-repeated", "1"))
-            texts = ["".join(text_part for text_part in p.itertext()) for p in cell.findall("text:p", ns)]
-            value = "\n".join(texts)
-            cells.extend([value] * repeat)
-        rows.append(cells)
-    return rows, content_text
+def read_ods_rows(ods_path: Path) -> List[List[str]]:
+    try:
+        return read_sheet_rows(ods_path)
+    except OdsError as exc:
+        raise RuntimeError(f"Could not read links.ods: {exc}") from exc
 
 
 def normalize_table(rows: Iterable[List[str]], column_count: int) -> List[List[str]]:
@@ -174,90 +149,80 @@ def build_updated_rows(
     return updated_rows, new_entries, removed
 
 
-def update_content_xml(content_text: str, rows: List[List[str]]) -> bytes:
-    root = ET.fromstring(content_text)
-    ns = {
-        "table": NAMESPACES["table"],
-        "text": NAMESPACES["text"],
-        "office": NAMESPACES["office"],
-    }
-    table_elem = root.find(".//table:table", ns)
-    if table_elem is None:
-        raise RuntimeError("Could not find table element while writing links.ods")
-
-    for row_elem in list(table_elem.findall("table:table-row", ns)):
-        table_elem.remove(row_elem)
-
-    for row in rows:
-        row_elem = ET.Element(f"{{{ns['table']}}}table-row")
-        for value in row:
-            cell_attrs = {f"{{{ns['office']}}}value-type": "string"}
-            if value:
-                cell_attrs[f"{{{ns['office']}}}string-value"] = value
-            cell_elem = ET.Element(f"{{{ns['table']}}}table-cell", cell_attrs)
-            paragraphs = value.split("\n") if value else [""]
-            for paragraph in paragraphs:
-                text_elem = ET.Element(f"{{{ns['text']}}}p")
-                if paragraph:
-                    text_elem.text = paragraph
-                cell_elem.append(text_elem)
-            row_elem.append(cell_elem)
-        table_elem.append(row_elem)
-
-    return ET.tostring(root, encoding="UTF-8", xml_declaration=True)
-
-
-def write_ods(ods_path: Path, new_content: bytes) -> None:
-    with zipfile.ZipFile(ods_path) as archive:
-        members = {name: archive.read(name) for name in archive.namelist() if name != "content.xml"}
-    temp_dir = ods_path.parent
-    temp_fd, temp_path = tempfile.mkstemp(
-        suffix=".ods", prefix="links_sync_", dir=str(temp_dir)
-    )
-    os.close(temp_fd)
-    temp_path_obj = Path(temp_path)
-    try:
-        with zipfile.ZipFile(temp_path_obj, "w") as archive:
-            mimetype_data = members.get("mimetype")
-            if mimetype_data is not None:
-                archive.writestr("mimetype", mimetype_data, compress_type=zipfile.ZIP_STORED)
-            for name, data in members.items():
-                if name == "mimetype":
-                    continue
-                archive.writestr(name, data, compress_type=zipfile.ZIP_DEFLATED)
-            archive.writestr("content.xml", new_content, compress_type=zipfile.ZIP_DEFLATED)
-        temp_path_obj.replace(ods_path)
-        temp_path_obj = None
-    finally:
-        if temp_path_obj is not None and temp_path_obj.exists():
-            temp_path_obj.unlink()
-
-
-def run_link_scripts(links_dir: Path, ods_path: Path) -> None:
-    scripts = sorted(
-        p for p in links_dir.iterdir() if p.suffix == ".py" and p.name != Path(__file__).name
+def new_row_indices(
+    plant_rows: List[Tuple[int, str]], new_entries: List[Tuple[int, str]]
+) -> List[int]:
+    """Return the positions in ``updated_rows`` of the entries ``build_updated_rows`` added.
+
+    ``updated_rows`` is the header followed by one row per ``plant_rows`` item,
+    so a CSV row index maps to exactly one sheet row.
+    """
+    positions = {csv_row_index: pos for pos, (csv_row_index, _) in enumerate(plant_rows, start=1)}
+    return [positions[csv_row_index] for csv_row_index, _ in new_entries]
+
+
+def fill_links(
+    rows: List[List[str]],
+    links_dir: Path,
+    row_indices: List[int] | None = None,
+    parallel: bool = False,
+    store: LinkStore | None = None,
+) -> int:
+    """Run every L_*.py source in this process against ``rows``.
+
+    Only ``row_indices`` are looked up when given; ``None`` means every row.
+    With ``store`` every result is committed to it as soon as it arrives.
+    """
+    sources = discover_link_sources(links_dir)
+    if not sources:
+        return 0
+    print("Running link sources: " + ", ".join(source.name for source in sources))
+    def record_in_store(task: LinkTask, column: int, value: str | None) -> None:
+        store.record(task.row, column, value)
+
+    return run_link_sources(
+        rows, sources, row_indices=row_indices, parallel=parallel,
+        on_record=record_in_store if store is not None else None,
     )
-    for script_path in scripts:
-        cmd = [sys.executable, str(script_path), str(ods_path)]
-        print(f"Running {script_path.name} ...")
-        subprocess.run(cmd, check=True, cwd=links_dir)
 
 
 def main(argv: Sequence[str] | None = None) -> None:
     args = parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
     plant_rows = read_plant_names(args.plant_data)
     if not plant_rows:
         print("PlantData.csv appears to be empty or missing data.")
         return
 
-    ods_rows, original_content_text = read_ods_rows(args.links_ods)
-    if not ods_rows:
-        raise RuntimeError("links.ods does not contain any rows")
+    ods_rows = read_ods_rows(args.links_ods)
+    store = LinkStore(args.store)
+    try:
+        if store.is_empty():
+            if not ods_rows:
+                raise RuntimeError("links.ods does not contain any rows")
+            store.replace_rows(ods_rows)
+            print(f"Link store {args.store.name} initialised from links.ods.")
+        elif ods_rows:
+            merged = store.merge_rows(ods_rows, sheet_mtime=args.links_ods.stat().st_mtime)
+            for conflict in merged.conflicts:
+                print(f"Conflict: {conflict}")
+            if merged.adopted:
+                print(f"Took over {merged.adopted} cells edited in links.ods.")
+        if args.export_only:
+            changed = store.export_ods(args.links_ods)
+            print(f"links.ods exported ({changed} cells changed).")
+            return
+        sync_store(store, args, plant_rows)
+    finally:
+        store.close()
+
 
-    column_count = max((len(row) for row in ods_rows), default=0)
+def sync_store(store: LinkStore, args: argparse.Namespace, plant_rows: List[Tuple[int, str]]) -> None:
+    stored_rows = store.load_rows()
+    column_count = max((len(row) for row in stored_rows), default=0)
     if column_count == 0:
         raise RuntimeError("links.ods has no columns to process")
-    normalized_original = normalize_table(ods_rows, column_count)
+    normalized_original = normalize_table(stored_rows, column_count)
     header = normalized_original[0]
     existing_rows = normalized_original[1:]
 
@@ -266,12 +231,12 @@ def main(argv: Sequence[str] | None = None) -> None:
     )
 
     if normalize_table(updated_rows, column_count) == normalized_original:
-        print("links.ods is already synchronised.")
+        if store.export_ods(args.links_ods):
+            print("links.ods re-exported from the link store.")
+        else:
+            print("links.ods is already synchronised.")
         return
 
-    new_content = update_content_xml(original_content_text, updated_rows)
-    write_ods(args.links_ods, new_content)
-    print(f"links.ods updated with {len(new_entries)} new entries.")
     if new_entries:
         formatted_new = []
         for csv_row_index, plant_name in new_entries:
@@ -284,8 +249,23 @@ def main(argv: Sequence[str] | None = None) -> None:
             + ", ".join(removed_names)
         )
 
-    if new_entries:
-        run_link_scripts(Path(__file__).resolve().parent, args.links_ods)
+    # Plants dropped earlier come back with the links the store kept for them.
+    store.replace_rows(updated_rows)
+    rows = normalize_table(store.load_rows(), column_count)
+
+    # Each lookup is committed to the store as it arrives; links.ods is only
+    # regenerated once at the end, also after an interrupted run.
+    filled = 0
+    try:
+        if new_entries:
+            row_indices = None if args.all_rows else new_row_indices(plant_rows, new_entries)
+            filled = fill_links(
+                rows, Path(__file__).resolve().parent, row_indices, args.parallel, store
+            )
+    finally:
+        store.replace_rows(rows)
+        store.export_ods(args.links_ods)
+    print(f"links.ods written ({filled} links filled).")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,58 @@
+"""Shared fixtures for the tests of the Python enrichment scripts.
+
+The scripts are run as plain files rather than installed, so the directories
+they import from are put on ``sys.path`` here the same way the scripts do it.
+"""
+from __future__ import annotations
+
+import sys
+import zipfile
+from pathlib import Path
+from typing import Sequence
+from xml.sax.saxutils import escape
+
+import pytest
+
+SCRIPTS = Path(__file__).resolve().parents[1]
+for path in (SCRIPTS, SCRIPTS / "links", SCRIPTS / "translate"):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
+
+_CONTENT = """<?xml version="1.0" encoding="UTF-8"?>
+<office:document-content xmlns:office="urn:oasis:names:tc:opendocument:xmlns:office:1.0" \
+xmlns:table="urn:oasis:names:tc:opendocument:xmlns:table:1.0" \
+xmlns:text="urn:oasis:names:tc:opendocument:xmlns:text:1.0" office:version="1.2">\
+<office:body><office:spreadsheet><table:table table:name="Sheet1">\
+<table:table-column table:number-columns-repeated="{columns}"/>{rows}</table:table>\
+</office:spreadsheet></office:body></office:document-content>"""
+
+_MANIFEST = """<?xml version="1.0" encoding="UTF-8"?>
+<manifest:manifest xmlns:manifest="urn:oasis:names:tc:opendocument:xmlns:manifest:1.0" manifest:version="1.2">\
+<manifest:file-entry manifest:full-path="/" manifest:media-type="application/vnd.oasis.opendocument.spreadsheet"/>\
+<manifest:file-entry manifest:full-path="content.xml" manifest:media-type="text/xml"/>\
+</manifest:manifest>"""
+
+
+def _cell(value: str) -> str:
+    if not value:
+        return "<table:table-cell/>"
+    return f'<table:table-cell office:value-type="string"><text:p>{escape(value)}</text:p></table:table-cell>'
+
+
+def write_ods(path: Path, rows: Sequence[Sequence[str]]) -> Path:
+    """Write a minimal one-sheet ODS holding ``rows``."""
+    body = "".join("<table:table-row>" + "".join(_cell(v) for v in row) + "</table:table-row>" for row in rows)
+    columns = max((len(row) for row in rows), default=1)
+    with zipfile.ZipFile(path, "w") as zf:
+        zf.writestr(zipfile.ZipInfo("mimetype"), "application/vnd.oasis.opendocument.spreadsheet")
+        zf.writestr("content.xml", _CONTENT.format(columns=columns, rows=body), zipfile.ZIP_DEFLATED)
+        zf.writestr("META-INF/manifest.xml", _MANIFEST, zipfile.ZIP_DEFLATED)
+    return path
+
+
+@pytest.fixture
+def make_ods(tmp_path):
+    def make(rows: Sequence[Sequence[str]], name: str = "sheet.ods") -> Path:
+        return write_ods(tmp_path / name, rows)
+
+    return make
@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import threading
+import time
+
+import pytest
+from selenium.common.exceptions import WebDriverException
+
+import L_floraveg as floraveg
+from L_floraveg import RowTask
+
+
+class FakeDriver:
+    def __init__(self, registry: list) -> None:
+        self.pages_loaded = 0
+        self.quit_calls = 0
+        registry.append(self)
+
+    def quit(self) -> None:
+        self.quit_calls += 1
+
+
+@pytest.fixture
+def drivers(monkeypatch):
+    created: list = []
+    monkeypatch.setattr(floraveg, "create_driver", lambda **kwargs: FakeDriver(created))
+    return created
+
+
+def make_tasks(n: int) -> list:
+    return [RowTask(i, f"Genus species{i}", True, True) for i in range(n)]
+
+
+def test_pool_resolves_every_row_and_quits_browsers(monkeypatch, drivers):
+    def resolve_row(driver, task, verbose=False):
+        driver.pages_loaded += 1
+        return {1: f"https://floraveg/{task.row}"}
+
+    monkeypatch.setattr(floraveg, "resolve_row", resolve_row)
+    results = {}
+    left = floraveg.resolve_rows(
+        make_tasks(10), lambda task, values: results.update({task.row: values}),
+        browsers=3, recycle_after=2, http_fast_path=False,
+    )
+    assert left == 0
+    assert sorted(results) == list(range(10))
+    # Recycled after two page loads, and every driver quit exactly once
+    assert len(drivers) >= 5
+    assert all(d.quit_calls == 1 for d in drivers)
+
+
+def test_interrupt_stops_workers_and_quits_browsers(monkeypatch, drivers):
+    started = threading.Event()
+
+    def resolve_row(driver, task, verbose=False):
+        started.set()
+        time.sleep(0.01)
+        return {1: "x"}
+
+    def on_result(task, values):
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(floraveg, "resolve_row", resolve_row)
+    with pytest.raises(KeyboardInterrupt):
+        floraveg.resolve_rows(make_tasks(50), on_result, browsers=3, http_fast_path=False)
+    assert started.is_set()
+    assert drivers and all(d.quit_calls >= 1 for d in drivers)
+
+
+def test_rows_are_left_when_no_browser_starts(monkeypatch):
+    def create_driver(**kwargs):
+        raise WebDriverException("no browser")
+
+    monkeypatch.setattr(floraveg, "create_driver", create_driver)
+    left = floraveg.resolve_rows(make_tasks(4), lambda task, values: None, browsers=2, http_fast_path=False)
+    assert left == 4
+
+
+def test_non_binomial_rows_never_reach_the_browser(monkeypatch, drivers):
+    monkeypatch.setattr(floraveg, "make_http_session", lambda: None)
+    # HTTP answers MBG for everyone but finds nothing on floraveg
+    monkeypatch.setattr(floraveg, "resolve_row_http", lambda session, task, verbose=False: {2: "https://mbg"})
+    browsed = []
+
+    def resolve_row(driver, task, verbose=False):
+        browsed.append(task.name)
+        return {}
+
+    monkeypatch.setattr(floraveg, "resolve_row", resolve_row)
+    tasks = [
+        RowTask(0, "Acer campestre", True, True),
+        RowTask(1, "Acer", True, True),
+        RowTask(2, "Rosaceae", True, True),
+    ]
+    floraveg.resolve_rows(tasks, lambda task, values: None, browsers=2)
+    assert browsed == ["Acer campestre"]
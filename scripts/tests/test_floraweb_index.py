@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import requests
+
+from L_floraweb import FlorawebRegisterIndex
+
+REGISTER_RO = """
+<html><body>
+<a href="/php/nav.php">Rosa canina Startseite</a>
+<ul>
+  <li><a href="artenhome.php?id=1">Rosa canina L. → Hunds-Rose</a></li>
+  <li><a href="artenhome.php?id=2">Rosa caninaeformis Sm.</a></li>
+  <li><a href="artenhome.php?id=3">Rosa rubiginosa L.</a></li>
+  <li><a href="artenhome.php?id=4">Rosa</a></li>
+</ul>
+</body></html>
+"""
+
+
+def make_response(url: str, text: str, status: int = 200) -> requests.Response:
+    resp = requests.Response()
+    resp.status_code = status
+    resp.url = url
+    resp._content = text.encode("utf-8")
+    resp.encoding = "utf-8"
+    return resp
+
+
+class FakeSession:
+    def __init__(self, pages=None, fail_first: int = 0) -> None:
+        self.pages = pages or {}
+        self.fail_first = fail_first
+        self.urls = []
+
+    def get(self, url, timeout=None):
+        self.urls.append(url)
+        if len(self.urls) <= self.fail_first:
+            raise requests.ConnectionError("offline")
+        prefix = url.rsplit("=", 1)[-1]
+        if prefix not in self.pages:
+            return make_response(url, "", 404)
+        return make_response(url, self.pages[prefix])
+
+
+def test_lookup_matches_like_the_page_search():
+    session = FakeSession({"Ro": REGISTER_RO})
+    index = FlorawebRegisterIndex(session)
+    text, url = index.lookup("Rosa canina")
+    assert text == "Rosa canina L. → Hunds-Rose"
+    assert url == "https://www.floraweb.de/php/artenhome.php?id=1"
+    assert index.lookup("Rosa rubiginosa")[1].endswith("id=3")
+    # "caninaeformis" is not "canina" followed by a space or a dot
+    assert index.lookup("Rosa canin") is None
+    # one page request serves every name with the same prefix
+    assert len(session.urls) == 1
+
+
+def test_lookup_is_case_sensitive():
+    index = FlorawebRegisterIndex(FakeSession({"Ro": REGISTER_RO}))
+    assert index.lookup("Rosa Canina") is None
+    assert index.lookup("rosa canina") is None
+
+
+def test_failed_page_is_fetched_again():
+    session = FakeSession({"Ro": REGISTER_RO}, fail_first=1)
+    index = FlorawebRegisterIndex(session)
+    assert index.lookup("Rosa canina") is None
+    assert index.lookup("Rosa canina") is not None
+    assert len(session.urls) == 2
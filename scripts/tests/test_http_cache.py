@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import requests
+from requests.adapters import BaseAdapter
+
+from common.http_cache import CachedSession, ResponseCache, request_key
+from common.rate_limit import AdaptiveRateLimiter, HostPolicy
+
+
+def make_response(url: str, content: bytes = b"ok", status: int = 200) -> requests.Response:
+    resp = requests.Response()
+    resp.status_code = status
+    resp.url = url
+    resp._content = content
+    return resp
+
+
+class CountingAdapter(BaseAdapter):
+    """Answers every request offline and counts how many reached it."""
+
+    def __init__(self, status: int = 200) -> None:
+        super().__init__()
+        self.status = status
+        self.sent = 0
+
+    def send(self, request, **kwargs):
+        self.sent += 1
+        resp = make_response(request.url, f"reply {self.sent}".encode(), self.status)
+        resp.request = request
+        return resp
+
+    def close(self) -> None:
+        pass
+
+
+def make_session(tmp_path, **kwargs):
+    limiter = AdaptiveRateLimiter(policies={}, default=HostPolicy(initial_rate=1000.0, max_rate=1000.0, burst=100.0))
+    session = CachedSession("test", cache=ResponseCache(tmp_path / "cache.sqlite"), limiter=limiter, **kwargs)
+    session.cache_enabled = True
+    adapter = CountingAdapter()
+    session.mount("https://", adapter)
+    return session, adapter
+
+
+def test_request_key_covers_body_and_selecting_headers():
+    base = request_key("GET", "https://x.example/a", None)
+    assert request_key("get", "https://x.example/a", b"") == base
+    assert request_key("POST", "https://x.example/a", "q=1") != request_key("POST", "https://x.example/a", "q=2")
+    json_key = request_key("GET", "https://x.example/a", None, {"Accept": "application/json"})
+    html_key = request_key("GET", "https://x.example/a", None, {"accept": "text/html"})
+    assert len({base, json_key, html_key}) == 3
+    # Headers that do not select a representation stay out of the key
+    assert request_key("GET", "https://x.example/a", None, {"User-Agent": "bot"}) == base
+
+
+def test_expired_entry_is_dropped(tmp_path):
+    cache = ResponseCache(tmp_path / "cache.sqlite")
+    cache.put("fresh", "test", "GET", "https://x.example/f", make_response("https://x.example/f"), ttl=60)
+    cache.put("stale", "test", "GET", "https://x.example/s", make_response("https://x.example/s"), ttl=-1)
+    assert cache.get("fresh")["content"] == b"ok"
+    assert cache.get("stale") is None
+    assert cache._conn.execute("SELECT COUNT(*) FROM responses WHERE key = 'stale'").fetchone()[0] == 0
+
+
+def test_eviction_drops_least_recently_used_first(tmp_path):
+    cache = ResponseCache(tmp_path / "cache.sqlite", max_bytes=250)
+    for key in ("a", "b", "c"):
+        cache.put(key, "test", "GET", f"https://x.example/{key}", make_response("u", b"x" * 100), ttl=60)
+    cache._conn.execute("UPDATE responses SET accessed_at = accessed_at - 10 WHERE key = 'a'")
+    cache._conn.execute("UPDATE responses SET accessed_at = accessed_at - 20 WHERE key = 'b'")
+    cache.get("a")  # touching "a" makes "b" the oldest
+    cache.evict()
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+
+
+def test_get_is_served_from_cache(tmp_path):
+    session, adapter = make_session(tmp_path)
+    first = session.get("https://x.example/page")
+    second = session.get("https://x.example/page")
+    assert adapter.sent == 1
+    assert second.from_cache and not first.from_cache
+    assert second.text == first.text
+
+
+def test_post_is_cached_only_on_opt_in(tmp_path):
+    session, adapter = make_session(tmp_path)
+    session.post("https://x.example/sparql", data={"query": "q"})
+    session.post("https://x.example/sparql", data={"query": "q"})
+    assert adapter.sent == 2
+
+    sparql, adapter = make_session(tmp_path, cache_post=True)
+    sparql.post("https://x.example/sparql", data={"query": "q"})
+    sparql.post("https://x.example/sparql", data={"query": "q"})
+    assert adapter.sent == 1
+
+
+def test_streaming_requests_bypass_cache(tmp_path):
+    session, adapter = make_session(tmp_path)
+    session.get("https://x.example/big", stream=True)
+    session.get("https://x.example/big", stream=True)
+    assert adapter.sent == 2
+    session.get("https://x.example/big")
+    assert adapter.sent == 3
@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import time
+
+import pytest
+
+from common.ods import read_sheet_rows, write_sheet_rows
+from link_store import LinkStore
+
+HEADER = ["sci", "floraveg", "MBG"]
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = LinkStore(tmp_path / "links.sqlite")
+    yield store
+    store.close()
+
+
+def test_replace_rows_round_trip(store):
+    rows = [HEADER, ["Daucus carota", "https://f/dc", "no"], ["Abies alba", "", "https://m/aa"]]
+    store.replace_rows(rows)
+    assert store.load_rows() == rows
+
+
+def test_duplicate_names_keep_their_own_links(store, make_ods):
+    rows = [
+        HEADER,
+        ["Paulownia", "", "https://m/a888"],
+        ["Abies alba", "", ""],
+        ["Paulownia", "", "https://m/287035"],
+    ]
+    path = make_ods(rows)
+    store.replace_rows(rows)
+    assert store.export_ods(path) == 0
+    assert read_sheet_rows(path)[3] == ["Paulownia", "", "https://m/287035"]
+
+    store.record(3, 2, "https://m/new")
+    store.export_ods(path)
+    assert [row[2] for row in read_sheet_rows(path)[1::2]] == ["https://m/a888", "https://m/new"]
+
+
+def test_replace_rows_never_blanks_stored_values(store):
+    store.replace_rows([HEADER, ["Daucus carota", "https://f/dc", ""]])
+    store.replace_rows([HEADER, ["Daucus carota", "", ""]])
+    assert store.load_rows()[1] == ["Daucus carota", "https://f/dc", ""]
+
+
+def test_merge_rows_adopts_hand_edits(store, make_ods):
+    rows = [HEADER, ["Daucus carota", "https://f/old", "no"]]
+    path = make_ods(rows)
+    store.replace_rows(rows)
+    store.export_ods(path)
+
+    write_sheet_rows(path, [HEADER, ["Daucus carota", "https://f/fixed", ""]])
+    result = store.merge_rows(read_sheet_rows(path), sheet_mtime=path.stat().st_mtime)
+    assert result.adopted == 2
+    assert result.conflicts == []
+    assert store.load_rows()[1] == ["Daucus carota", "https://f/fixed", ""]
+
+
+def test_merge_rows_keeps_store_changes_on_an_untouched_sheet(store, make_ods):
+    rows = [HEADER, ["Daucus carota", "", ""]]
+    path = make_ods(rows)
+    store.replace_rows(rows)
+    store.export_ods(path)
+    store.record(1, 1, "https://f/dc")
+
+    result = store.merge_rows(read_sheet_rows(path), sheet_mtime=path.stat().st_mtime)
+    assert result.adopted == 0
+    assert store.load_rows()[1][1] == "https://f/dc"
+
+
+def test_merge_rows_reports_conflicts_and_the_newer_side_wins(store, make_ods):
+    rows = [HEADER, ["Daucus carota", "https://f/old", ""]]
+    path = make_ods(rows)
+    store.replace_rows(rows)
+    store.export_ods(path)
+    store.record(1, 1, "https://f/store")
+    write_sheet_rows(path, [HEADER, ["Daucus carota", "https://f/sheet", ""]])
+
+    older = store.merge_rows(read_sheet_rows(path), sheet_mtime=time.time() - 3600)
+    assert len(older.conflicts) == 1
+    assert store.load_rows()[1][1] == "https://f/store"
+
+    newer = store.merge_rows(read_sheet_rows(path), sheet_mtime=time.time() + 3600)
+    assert len(newer.conflicts) == 1
+    assert newer.adopted == 1
+    assert store.load_rows()[1][1] == "https://f/sheet"
+
+
+def test_merge_rows_adds_plants_new_to_the_store(store):
+    store.replace_rows([HEADER, ["Daucus carota", "", ""]])
+    result = store.merge_rows([HEADER, ["Daucus carota", "", ""], ["Abies alba", "https://f/aa", ""]])
+    assert result.adopted == 1
+    assert store.load_rows()[2] == ["Abies alba", "https://f/aa", ""]
+
+
+def test_blank_header_columns_survive_export(store, make_ods):
+    rows = [HEADER + [""], ["Daucus carota", "", "", "note"]]
+    path = make_ods(rows)
+    store.replace_rows(rows)
+    assert store.export_ods(path) == 0
+    assert read_sheet_rows(path)[1] == ["Daucus carota", "", "", "note"]
+
+
+def test_record_and_export_agree_on_clashing_labels(store, make_ods):
+    rows = [["sci", "MBG", "mbg"], ["Daucus carota", "", ""]]
+    path = make_ods(rows)
+    store.replace_rows(rows)
+    store.record(1, 2, "https://m/second")
+    store.export_ods(path)
+    assert read_sheet_rows(path)[1] == ["Daucus carota", "", "https://m/second"]
+    assert store.stats() == {"MBG": 0, "mbg": 1}
@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+import threading
+import time
+
+from common.lookup_engine import LookupEngine, LookupJob, run_lookups
+
+
+class Probe:
+    """Blocking lookup that records how many calls per host overlap."""
+
+    def __init__(self, delay: float = 0.05) -> None:
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.active = {}
+        self.peak = {}
+
+    def __call__(self, host: str, value):
+        with self.lock:
+            self.active[host] = self.active.get(host, 0) + 1
+            self.peak[host] = max(self.peak.get(host, 0), self.active[host])
+        time.sleep(self.delay)
+        with self.lock:
+            self.active[host] -= 1
+        return value
+
+
+def test_concurrency_is_capped_per_host():
+    probe = Probe()
+    jobs = [LookupJob(("a", i), "a.example", probe, ("a.example", i)) for i in range(8)]
+    jobs += [LookupJob(("b", i), "b.example", probe, ("b.example", i)) for i in range(8)]
+    engine = LookupEngine(host_limits={"a.example": 1}, default_host_limit=3)
+    results = engine.run(jobs)
+    assert results == {job.key: job.args[1] for job in jobs}
+    assert probe.peak["a.example"] == 1
+    assert 1 < probe.peak["b.example"] <= 3
+
+
+def test_failing_lookup_reports_none():
+    def boom():
+        raise RuntimeError("offline")
+
+    seen = []
+    results = run_lookups(
+        [LookupJob("bad", "h", boom), LookupJob("good", "h", lambda: "ok")],
+        on_result=lambda key, value: seen.append((key, value, threading.current_thread())),
+    )
+    assert results == {"bad": None, "good": "ok"}
+    assert {(key, value) for key, value, _ in seen} == {("bad", None), ("good", "ok")}
+    assert all(thread is threading.main_thread() for _, _, thread in seen)
+
+
+def test_host_delay_holds_the_slot():
+    jobs = [LookupJob(i, "h", lambda i=i: i) for i in range(3)]
+    started = time.monotonic()
+    LookupEngine(default_host_limit=1, host_delay=0.1).run(jobs)
+    assert time.monotonic() - started >= 0.3
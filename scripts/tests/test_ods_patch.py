@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+import zipfile
+
+import pytest
+
+from common.ods import OdsError, patch_cells, read_sheet_rows, write_sheet_rows
+
+
+def test_patch_cells_changes_only_the_given_cells(make_ods):
+    path = make_ods([["sci", "ru"], ["Daucus carota", "морковь"], ["Abies alba", ""]])
+    patch_cells(path, {(2, 1): "пихта белая", (1, 3): "x"})
+    assert read_sheet_rows(path) == [
+        ["sci", "ru"],
+        ["Daucus carota", "морковь", "", "x"],
+        ["Abies alba", "пихта белая"],
+    ]
+
+
+def test_patch_cells_appends_rows_past_the_end(make_ods):
+    path = make_ods([["sci"]])
+    patch_cells(path, {(3, 0): "Abies alba"})
+    assert read_sheet_rows(path) == [["sci"], [], [], ["Abies alba"]]
+
+
+def test_patch_cells_on_an_empty_sheet_keeps_columns_first(make_ods):
+    path = make_ods([])
+    patch_cells(path, {(0, 0): "sci"})
+    assert read_sheet_rows(path) == [["sci"]]
+    with zipfile.ZipFile(path) as zf:
+        content = zf.read("content.xml").decode("utf-8")
+    assert content.index("table:table-column") < content.index("table:table-row")
+
+
+def test_patch_cells_keeps_other_members(make_ods):
+    path = make_ods([["sci"]])
+    patch_cells(path, {(0, 0): "name"})
+    with zipfile.ZipFile(path) as zf:
+        assert zf.namelist()[0] == "mimetype"
+        assert "META-INF/manifest.xml" in zf.namelist()
+
+
+def test_patch_cells_unknown_sheet(make_ods):
+    path = make_ods([["sci"]])
+    with pytest.raises(OdsError):
+        patch_cells(path, {(0, 0): "x"}, sheet="missing")
+
+
+def test_write_sheet_rows_writes_only_the_difference(make_ods):
+    path = make_ods([["sci", "ru"], ["Daucus carota", "морковь"]])
+    assert write_sheet_rows(path, [["sci", "ru"], ["Daucus carota", "морковь"]]) == 0
+    assert write_sheet_rows(path, [["sci", "ru"], ["Daucus carota", ""]]) == 1
+    assert read_sheet_rows(path) == [["sci", "ru"], ["Daucus carota"]]
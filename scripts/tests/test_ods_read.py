@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+import zipfile
+
+from common.ods import OdsWorkbook, read_sheet_rows
+
+
+def test_read_sheet_rows_trims_trailing_blanks(make_ods):
+    path = make_ods([["sci", "ru", ""], ["Daucus carota", "", ""], ["", "", ""]])
+    assert read_sheet_rows(path) == [["sci", "ru"], ["Daucus carota"]]
+
+
+def test_row_and_column_repeats_expand(make_ods):
+    path = make_ods([["sci"]])
+    with zipfile.ZipFile(path) as zf:
+        content = zf.read("content.xml").decode("utf-8")
+    content = content.replace(
+        "</table:table-row>",
+        '<table:table-cell table:number-columns-repeated="16000"/></table:table-row>'
+        '<table:table-row table:number-rows-repeated="1000"><table:table-cell/></table:table-row>'
+        '<table:table-row><table:table-cell table:number-columns-repeated="2"/>'
+        '<table:table-cell office:value-type="string"><text:p>x</text:p></table:table-cell></table:table-row>',
+        1,
+    )
+    with zipfile.ZipFile(path, "w") as zf:
+        zf.writestr("mimetype", "application/vnd.oasis.opendocument.spreadsheet")
+        zf.writestr("content.xml", content)
+    rows = read_sheet_rows(path)
+    assert len(rows) == 1002
+    assert rows[0] == ["sci"] and rows[-1] == ["", "", "x"]
+
+
+def test_workbook_get_outside_the_grid(make_ods):
+    wb = OdsWorkbook(make_ods([["sci", "ru"]]))
+    assert wb.get(0, 1) == "ru"
+    assert wb.get(5, 5) == ""
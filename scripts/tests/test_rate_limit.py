@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import time
+
+import pytest
+
+from common.rate_limit import AdaptiveRateLimiter, HostPolicy
+
+HOST = "x.example"
+
+
+def make_limiter(**policy) -> AdaptiveRateLimiter:
+    return AdaptiveRateLimiter(policies={HOST: HostPolicy(**policy)})
+
+
+def test_success_increases_rate_up_to_max():
+    limiter = make_limiter(initial_rate=1.0, max_rate=1.25, increase=0.1)
+    limiter.record(HOST, 200, 0.1)
+    assert limiter.current_rate(HOST) == pytest.approx(1.1)
+    for _ in range(10):
+        limiter.record(HOST, 200, 0.1)
+    assert limiter.current_rate(HOST) == pytest.approx(1.25)
+
+
+@pytest.mark.parametrize("status", [429, 503, None])
+def test_throttling_halves_rate_once_per_round_trip(status):
+    limiter = make_limiter(initial_rate=4.0, decrease=0.5, min_rate=0.5)
+    limiter.record(HOST, status)
+    assert limiter.current_rate(HOST) == pytest.approx(2.0)
+    # Failures of requests already in flight do not cut again right away
+    limiter.record(HOST, status)
+    assert limiter.current_rate(HOST) == pytest.approx(2.0)
+
+
+def test_rate_never_drops_below_min():
+    limiter = make_limiter(initial_rate=1.0, decrease=0.1, min_rate=0.5)
+    bucket = limiter._bucket(HOST)
+    for _ in range(3):
+        bucket.last_decrease = 0.0
+        limiter.record(HOST, 429)
+    assert limiter.current_rate(HOST) == pytest.approx(0.5)
+
+
+def test_slow_response_counts_as_congestion_after_warmup():
+    limiter = make_limiter(initial_rate=2.0, increase=0.0, warmup=3, slow_factor=3.0)
+    limiter.record(HOST, 200, 5.0)  # slow, but still warming up
+    assert limiter.current_rate(HOST) == pytest.approx(2.0)
+    for _ in range(20):
+        limiter.record(HOST, 200, 0.1)
+    limiter.record(HOST, 200, 5.0)
+    assert limiter.current_rate(HOST) == pytest.approx(1.0)
+
+
+def test_retry_after_blocks_host():
+    limiter = make_limiter(initial_rate=100.0, burst=10.0)
+    limiter.record(HOST, 429, retry_after="0.2")
+    started = time.monotonic()
+    limiter.acquire(HOST)
+    assert time.monotonic() - started >= 0.15
+    # Other hosts are not affected
+    started = time.monotonic()
+    limiter.acquire("other.example")
+    assert time.monotonic() - started < 0.1
+
+
+def test_configure_with_same_settings_keeps_learned_rate():
+    limiter = make_limiter(initial_rate=1.0, increase=0.5)
+    limiter.configure(HOST, interval=0.5)
+    limiter.record(HOST, 200, 0.1)
+    assert limiter.current_rate(HOST) == pytest.approx(2.5)
+    limiter.configure(HOST, interval=0.5)
+    assert limiter.current_rate(HOST) == pytest.approx(2.5)
+    limiter.configure(HOST, interval=1.0)
+    assert limiter.current_rate(HOST) == pytest.approx(1.0)
@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+from result_journal import ResultJournal
+
+
+def test_journal_path_sits_next_to_workbook(tmp_path):
+    journal = ResultJournal(tmp_path / "links.ods", "floraweb")
+    assert journal.path == tmp_path / "links.floraweb.journal.jsonl"
+
+
+def test_record_and_replay_by_name(tmp_path):
+    journal = ResultJournal(tmp_path / "links.ods", "floraveg")
+    journal.record("Acer campestre", 1, "https://a")
+    journal.record("Bellis  PERENNIS", 2, "https://b")
+    journal.record("Gone away", 1, "https://c")
+
+    # A fresh instance (new run) sees the same entries in write order
+    reopened = ResultJournal(tmp_path / "links.ods", "floraveg")
+    assert [e[0] for e in reopened.entries()] == ["Acer campestre", "Bellis  PERENNIS", "Gone away"]
+
+    rows = ["Bellis perennis", "", "Acer campestre", "Acer campestre"]
+    assert sorted(reopened.replay(rows)) == [
+        (0, 2, "https://b"),
+        (2, 1, "https://a"),
+        (3, 1, "https://a"),
+    ]
+
+
+def test_torn_last_line_is_skipped(tmp_path):
+    journal = ResultJournal(tmp_path / "links.ods", "mbg")
+    journal.record("Acer campestre", 1, "https://a")
+    with journal.path.open("a", encoding="utf-8") as fh:
+        fh.write('{"name": "Bellis per')
+    assert journal.entries() == [("Acer campestre", 1, "https://a")]
+
+
+def test_compaction_is_due_every_n_results(tmp_path):
+    journal = ResultJournal(tmp_path / "links.ods", "floraweb", compact_every=3)
+    due = [journal.record(f"Name {i}", 1, str(i)) for i in range(4)]
+    assert due == [False, False, True, True]
+
+    journal.compacted()
+    assert not journal.path.exists()
+    assert journal.entries() == []
+    assert journal.record("Name 9", 1, "9") is False
+    journal.compacted()
+    journal.compacted()  # nothing left to remove
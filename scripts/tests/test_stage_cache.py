@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import pytest
+
+from stage_api import PlantTable, Stage, finish_updates
+from stage_cache import BuildCache
+from translation_pipeline import run_stages
+
+
+def rows(ru=""):
+    return [["sci", "ru"], ["Daucus carota", ru]]
+
+
+def stage(run=None, **kwargs):
+    run = run or (lambda records, on_update=None: {0: {"ru": "морковь"}})
+    return Stage("inat", "iNaturalist", ("ru",), run, reads=("sci",), **kwargs)
+
+
+@pytest.fixture
+def cache_path(tmp_path):
+    return tmp_path / "build_cache.json"
+
+
+def test_fresh_after_update(cache_path):
+    table = PlantTable.from_rows(rows("морковь"))
+    cache = BuildCache(cache_path, "plants")
+    assert not cache.is_fresh(stage(), table)
+    cache.update([stage()], table)
+    assert BuildCache(cache_path, "plants").is_fresh(stage(), table)
+
+
+def test_changed_inputs_are_not_fresh(cache_path, tmp_path):
+    reference = tmp_path / "names.csv"
+    reference.write_text("a\n", encoding="utf-8")
+    table = PlantTable.from_rows(rows("морковь"))
+    cache = BuildCache(cache_path, "plants")
+    cache.update([stage(inputs=(reference,))], table)
+
+    assert not cache.is_fresh(stage(inputs=(reference,)), PlantTable.from_rows(rows()))
+    assert not cache.is_fresh(stage(inputs=(reference,), options={"passes": 3}), table)
+    assert not BuildCache(cache_path, "other.csv").is_fresh(stage(inputs=(reference,)), table)
+    reference.write_text("b\n", encoding="utf-8")
+    assert not cache.is_fresh(stage(inputs=(reference,)), table)
+
+
+def test_force_is_never_fresh_but_records(cache_path):
+    table = PlantTable.from_rows(rows("морковь"))
+    forced = BuildCache(cache_path, "plants", force=True)
+    forced.update([stage()], table)
+    assert not forced.is_fresh(stage(), table)
+    assert BuildCache(cache_path, "plants").is_fresh(stage(), table)
+
+
+def test_incomplete_stage_is_not_recorded(cache_path):
+    calls = []
+
+    def flaky(records, on_update=None):
+        calls.append(1)
+        return finish_updates({}, 1)
+
+    table = PlantTable.from_rows(rows())
+    BuildCache(cache_path, "plants").update([stage()], table)  # an earlier complete run
+
+    cache = BuildCache(cache_path, "plants", force=True)
+    run_stages([stage(flaky)], table, cache=cache)
+    cache.update([stage(flaky)], table)
+
+    again = BuildCache(cache_path, "plants")
+    assert not again.is_fresh(stage(flaky), table)
+    run_stages([stage(flaky)], table, cache=again)
+    assert len(calls) == 2
+
+
+def test_finish_updates_marks_pending_rows():
+    updates = {0: {"ru": "x"}}
+    assert finish_updates(updates, 0) is updates
+    incomplete = finish_updates(updates, 2)
+    assert incomplete == updates
+    assert incomplete.pending == 2
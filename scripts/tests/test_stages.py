@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import threading
+import time
+
+import pytest
+
+from stage_api import PlantTable, Stage, stage_branches
+from translation_pipeline import StageError, run_stages
+
+ROWS = [["sci", "ru", "en", "nl"], ["Daucus carota", "", "", ""], ["Abies alba", "", "", ""]]
+
+
+def fill(column, value, seen=None, name=None):
+    """A stage run that fills every empty ``column`` and logs its order in ``seen``."""
+
+    def run(records, on_update=None):
+        if seen is not None:
+            with _lock:
+                seen.append(name)
+        return {i: {column: value} for i, record in enumerate(records) if not record.get(column)}
+
+    return run
+
+
+_lock = threading.Lock()
+
+
+def names(branches):
+    return [[stage.name for stage in branch] for branch in branches]
+
+
+def test_stage_branches_groups_by_column_and_after():
+    stages = [
+        Stage("inat", "", ("ru",), fill("ru", "a")),
+        Stage("wikidata", "", ("en",), fill("en", "b")),
+        Stage("plantarium", "", ("ru",), fill("ru", "c"), after=("inat",)),
+        Stage("dutch", "", ("nl",), fill("nl", "d")),
+    ]
+    assert names(stage_branches(stages)) == [["inat", "plantarium"], ["wikidata"], ["dutch"]]
+
+
+def test_stage_branches_orders_by_dependency_not_list_order():
+    stages = [
+        Stage("wikidata_nl", "", ("nl",), fill("nl", "a"), after=("dutch_csv",)),
+        Stage("dutch_csv", "", ("nl",), fill("nl", "b")),
+    ]
+    assert names(stage_branches(stages)) == [["dutch_csv", "wikidata_nl"]]
+
+
+def test_stage_branches_rejects_cycles():
+    stages = [
+        Stage("a", "", ("ru",), fill("ru", "a"), after=("b",)),
+        Stage("b", "", ("ru",), fill("ru", "b"), after=("a",)),
+    ]
+    with pytest.raises(ValueError):
+        stage_branches(stages)
+
+
+@pytest.mark.parametrize("sequential", [True, False])
+def test_run_stages_respects_after_in_both_modes(sequential):
+    seen = []
+    stages = [
+        Stage("wikidata_nl", "", ("nl",), fill("nl", "wikidata", seen, "wikidata_nl"), after=("dutch_csv",)),
+        Stage("dutch_csv", "", ("nl",), fill("nl", "csv", seen, "dutch_csv")),
+        Stage("wikidata", "", ("en",), fill("en", "en", seen, "wikidata")),
+    ]
+    table = PlantTable.from_rows(ROWS)
+    assert run_stages(stages, table, sequential=sequential) == 4
+    assert seen.index("dutch_csv") < seen.index("wikidata_nl")
+    assert table.column_values("nl") == ["csv", "csv"]
+    assert table.column_values("en") == ["en", "en"]
+
+
+def test_run_stages_single_stage():
+    table = PlantTable.from_rows(ROWS)
+    assert run_stages([Stage("inat", "", ("ru",), fill("ru", "x"))], table) == 2
+
+
+def test_failing_branch_aborts_without_waiting_for_the_others():
+    started = []
+
+    def slow(name):
+        def run(records, on_update=None):
+            started.append(name)
+            time.sleep(0.5)
+            return {}
+
+        return run
+
+    def boom(records, on_update=None):
+        raise StageError("offline")
+
+    stages = [
+        Stage("inat", "", ("ru",), slow("inat")),
+        Stage("plantarium", "", ("ru",), slow("plantarium"), after=("inat",)),
+        Stage("wikidata", "", ("en",), boom),
+    ]
+    table = PlantTable.from_rows(ROWS)
+    begun = time.monotonic()
+    with pytest.raises(StageError):
+        run_stages(stages, table)
+    assert time.monotonic() - begun < 0.4
+    time.sleep(0.7)
+    assert started == ["inat"]
+    assert table.column_values("ru") == ["", ""]
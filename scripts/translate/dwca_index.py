@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Offline vernacular-name index built from a Darwin Core Archive.
+
+iNaturalist and GBIF publish their taxonomies as Darwin Core Archives: a zip
+with a taxon core file, one or more VernacularName extension files and a
+``meta.xml`` describing their columns. ``build_index`` reads the files
+straight from the zip (nothing is unpacked) and streams them row by row into
+SQLite, so memory use does not grow with the archive:
+
+1. core rows -> ``taxa(id, key)``, where ``key`` is ``latin_binomial_key`` of
+   the scientific name (optionally only one kingdom, ``Plantae`` by default);
+2. extension rows -> ``raw(id, lang, name, preferred)`` with the language
+   normalised to a two-letter code where known (``eng``/``English`` -> ``en``);
+3. one join turns them into ``vernaculars(key, lang, name, preferred)``.
+
+The translation pipeline (``--vernacular-index``) runs ``collect_updates``
+for ru, en and nl before any other stage, so the network stages only see the
+names the index could not resolve.
+
+Usage:
+  python dwca_index.py inaturalist-taxonomy.dwca.zip [--index PATH] [--kingdom Plantae]
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import io
+import os
+import sqlite3
+import sys
+import time
+import xml.etree.ElementTree as ET
+import zipfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from stage_api import CellUpdates, Records, UpdateCallback
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from links.name_utils import latin_binomial_key
+
+DEFAULT_VERNACULAR_INDEX = Path(__file__).resolve().parents[1] / ".cache" / "vernacular_index.sqlite"
+
+DWC = "http://rs.tdwg.org/dwc/terms/"
+DC = "http://purl.org/dc/terms/"
+GBIF = "http://rs.gbif.org/terms/1.0/"
+TAXON_ROW_TYPE = DWC + "Taxon"
+VERNACULAR_ROW_TYPE = GBIF + "VernacularName"
+
+LANGUAGE_CODES = {
+    "en": "en", "eng": "en", "english": "en",
+    "ru": "ru", "rus": "ru", "russian": "ru",
+    "nl": "nl", "nld": "nl", "dut": "nl", "dutch": "nl",
+    "de": "de", "deu": "de", "ger": "de", "german": "de",
+    "fr": "fr", "fra": "fr", "fre": "fr", "french": "fr",
+}
+
+_INSERT_BATCH = 5000
+_QUERY_CHUNK = 500
+
+_SCHEMA = """
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE taxa (id TEXT PRIMARY KEY, key TEXT NOT NULL) WITHOUT ROWID;
+CREATE TABLE raw (id TEXT NOT NULL, lang TEXT NOT NULL, name TEXT NOT NULL, preferred INTEGER NOT NULL);
+CREATE TABLE vernaculars (
+    key TEXT NOT NULL,
+    lang TEXT NOT NULL,
+    name TEXT NOT NULL,
+    preferred INTEGER NOT NULL,
+    PRIMARY KEY (key, lang, name)
+) WITHOUT ROWID;
+"""
+
+
+class DwcaError(RuntimeError):
+    """The archive is not a Darwin Core Archive this importer understands."""
+
+
+@dataclass
+class ArchiveFile:
+    """One data file of the archive as described by ``meta.xml``."""
+
+    location: str
+    row_type: str
+    fields: Dict[str, int]  # term URI -> column index
+    id_index: int
+    delimiter: str = ","
+    quotechar: Optional[str] = '"'
+    header_lines: int = 0
+    encoding: str = "utf-8"
+
+    def column(self, *terms: str) -> Optional[int]:
+        for term in terms:
+            if term in self.fields:
+                return self.fields[term]
+        return None
+
+
+def _unescape(value: Optional[str], default: str) -> str:
+    if value is None:
+        return default
+    return value.replace("\\t", "\t").replace("\\n", "\n")
+
+
+def _parse_file_element(elem: ET.Element, id_tag: str) -> ArchiveFile:
+    ns = elem.tag[: elem.tag.index("}") + 1] if elem.tag.startswith("{") else ""
+    location = elem.findtext(f"{ns}files/{ns}location")
+    if not location:
+        raise DwcaError("meta.xml: data file without <location>")
+    id_elem = elem.find(f"{ns}{id_tag}")
+    fields = {
+        f.get("term", ""): int(f.get("index"))
+        for f in elem.findall(f"{ns}field") if f.get("index") is not None
+    }
+    quote = _unescape(elem.get("fieldsEnclosedBy"), '"')
+    return ArchiveFile(
+        location=location.strip(),
+        row_type=elem.get("rowType", ""),
+        fields=fields,
+        id_index=int(id_elem.get("index", 0)) if id_elem is not None else 0,
+        delimiter=_unescape(elem.get("fieldsTerminatedBy"), ","),
+        quotechar=quote or None,
+        header_lines=int(elem.get("ignoreHeaderLines", "0") or 0),
+        encoding=elem.get("encoding", "utf-8") or "utf-8",
+    )
+
+
+def read_meta(archive: zipfile.ZipFile) -> Tuple[ArchiveFile, List[ArchiveFile]]:
+    """The taxon core and the VernacularName extensions listed in ``meta.xml``."""
+    meta_name = next((n for n in archive.namelist() if n.rsplit("/", 1)[-1] == "meta.xml"), None)
+    if meta_name is None:
+        raise DwcaError("meta.xml not found in the archive")
+    root = ET.fromstring(archive.read(meta_name))
+    prefix = meta_name[: -len("meta.xml")]
+    core = None
+    files: List[ArchiveFile] = []
+    for elem in root:
+        tag = elem.tag.rsplit("}", 1)[-1]
+        if tag == "core":
+            core = _parse_file_element(elem, "id")
+        elif tag == "extension":
+            files.append(_parse_file_element(elem, "coreid"))
+    if core is None or core.row_type != TAXON_ROW_TYPE:
+        raise DwcaError(f"expected a {TAXON_ROW_TYPE} core, got {core.row_type if core else 'none'}")
+    extensions = [f for f in files if f.row_type == VERNACULAR_ROW_TYPE]
+    if not extensions:
+        raise DwcaError("the archive has no VernacularName extension")
+    for f in [core, *extensions]:
+        f.location = prefix + f.location
+    return core, extensions
+
+
+def iter_rows(archive: zipfile.ZipFile, spec: ArchiveFile) -> Iterator[List[str]]:
+    with archive.open(spec.location) as raw:
+        text = io.TextIOWrapper(raw, encoding=spec.encoding, errors="replace", newline="")
+        if spec.quotechar:
+            reader = csv.reader(text, delimiter=spec.delimiter, quotechar=spec.quotechar)
+        else:
+            reader = csv.reader(text, delimiter=spec.delimiter, quoting=csv.QUOTE_NONE)
+        for i, row in enumerate(reader):
+            if i >= spec.header_lines:
+                yield row
+
+
+def normalize_language(value: str) -> str:
+    value = (value or "").strip().lower()
+    return LANGUAGE_CODES.get(value, LANGUAGE_CODES.get(value.split("-")[0], value))
+
+
+def _at(row: Sequence[str], idx: Optional[int]) -> str:
+    return row[idx].strip() if idx is not None and idx < len(row) else ""
+
+
+def build_index(archive_path: Path, index: Path = DEFAULT_VERNACULAR_INDEX, kingdom: str = "Plantae") -> int:
+    """Import ``archive_path`` into a fresh index at ``index``; return the number of names."""
+    started = time.monotonic()
+    index.parent.mkdir(parents=True, exist_ok=True)
+    tmp = index.with_name(index.name + ".building")
+    tmp.unlink(missing_ok=True)
+    conn = sqlite3.connect(str(tmp))
+    conn.execute("PRAGMA journal_mode=OFF")
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.executescript(_SCHEMA)
+
+    with zipfile.ZipFile(archive_path) as archive:
+        core, extensions = read_meta(archive)
+        name_col = core.column(DWC + "scientificName", DWC + "canonicalName", GBIF + "canonicalName")
+        if name_col is None:
+            raise DwcaError(f"{core.location}: no dwc:scientificName column")
+        kingdom_col = core.column(DWC + "kingdom")
+        wanted_kingdom = kingdom.strip().lower()
+
+        batch = []
+        for row in iter_rows(archive, core):
+            if wanted_kingdom and kingdom_col is not None and _at(row, kingdom_col).lower() != wanted_kingdom:
+                continue
+            key = latin_binomial_key(_at(row, name_col))
+            if key:
+                batch.append((_at(row, core.id_index), key))
+            if len(batch) >= _INSERT_BATCH:
+                conn.executemany("INSERT OR REPLACE INTO taxa VALUES (?, ?)", batch)
+                batch = []
+        conn.executemany("INSERT OR REPLACE INTO taxa VALUES (?, ?)", batch)
+
+        for ext in extensions:
+            vname_col = ext.column(DWC + "vernacularName")
+            lang_col = ext.column(DC + "language", DWC + "language")
+            preferred_col = ext.column(GBIF + "isPreferredName", DWC + "isPreferredName")
+            if vname_col is None:
+                raise DwcaError(f"{ext.location}: no dwc:vernacularName column")
+            batch = []
+            for row in iter_rows(archive, ext):
+                name = _at(row, vname_col)
+                if not name:
+                    continue
+                preferred = _at(row, preferred_col).lower() in ("true", "1", "yes")
+                batch.append((_at(row, ext.id_index), normalize_language(_at(row, lang_col)), name, int(preferred)))
+                if len(batch) >= _INSERT_BATCH:
+                    conn.executemany("INSERT INTO raw VALUES (?, ?, ?, ?)", batch)
+                    batch = []
+            conn.executemany("INSERT INTO raw VALUES (?, ?, ?, ?)", batch)
+
+    conn.execute(
+        "INSERT INTO vernaculars (key, lang, name, preferred) "
+        "SELECT t.key, r.lang, r.name, MAX(r.preferred) FROM raw r JOIN taxa t ON t.id = r.id "
+        "GROUP BY t.key, r.lang, r.name"
+    )
+    conn.execute("DROP TABLE raw")
+    conn.execute("DROP TABLE taxa")
+    total = conn.execute("SELECT COUNT(*) FROM vernaculars").fetchone()[0]
+    stat = archive_path.stat()
+    conn.executemany("INSERT INTO meta (key, value) VALUES (?, ?)", [
+        ("archive", str(archive_path.resolve())),
+        ("archive_size", str(stat.st_size)),
+        ("archive_mtime_ns", str(stat.st_mtime_ns)),
+        ("kingdom", kingdom),
+        ("built_at", str(time.time())),
+    ])
+    conn.commit()
+    conn.execute("VACUUM")
+    conn.close()
+    os.replace(tmp, index)
+    print(f"Indexed {total:,} vernacular names in {time.monotonic() - started:.0f}s: {index}", file=sys.stderr)
+    return total
+
+
+class VernacularIndex:
+    """Read side: ``latin_binomial_key`` -> vernaculars of one language, preferred first."""
+
+    def __init__(self, path: Path = DEFAULT_VERNACULAR_INDEX) -> None:
+        self.path = Path(path)
+        if not self.path.exists():
+            raise FileNotFoundError(f"Vernacular index not found: {self.path} (build it with dwca_index.py)")
+        self._conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+
+    def lookup(self, names: Iterable[str], lang: str) -> Dict[str, List[str]]:
+        """``{scientific name: [vernaculars]}`` for the names the index knows."""
+        keys: Dict[str, List[str]] = {}
+        for name in names:
+            key = latin_binomial_key(name)
+            if key:
+                keys.setdefault(key, []).append(name)
+        wanted = sorted(keys)
+        out: Dict[str, List[str]] = {}
+        for i in range(0, len(wanted), _QUERY_CHUNK):
+            chunk = wanted[i:i + _QUERY_CHUNK]
+            marks = ",".join("?" * len(chunk))
+            for key, name in self._conn.execute(
+                f"SELECT key, name FROM vernaculars WHERE lang = ? AND key IN ({marks}) "
+                "ORDER BY key, preferred DESC, name", (lang, *chunk)
+            ):
+                for sci in keys[key]:
+                    out.setdefault(sci, []).append(name)
+        return out
+
+
+def collect_updates(rows: Records, index_path: Path, lang: str, sci_col: str = "sci",
+                    col: Optional[str] = None, on_update: Optional[UpdateCallback] = None) -> CellUpdates:
+    """Pipeline stage: fill empty ``col`` cells with the index's preferred ``lang`` name."""
+    col = col or lang
+    pending: Dict[str, List[int]] = {}
+    for i, row in enumerate(rows):
+        sci = (row.get(sci_col) or "").strip()
+        if sci and not (row.get(col) or "").strip():
+            pending.setdefault(sci, []).append(i)
+    updates: CellUpdates = {}
+    for sci, names in VernacularIndex(index_path).lookup(pending, lang).items():
+        for i in pending[sci]:
+            updates[i] = {col: names[0]}
+            if on_update:
+                on_update(i, updates[i])
+    print(f"Vernacular index ({lang}): {len(updates)} of {sum(map(len, pending.values()))} empty cells resolved.")
+    return updates
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Build the offline vernacular-name index from a Darwin Core Archive.")
+    ap.add_argument("archive", type=Path, help="DwC-A zip with a Taxon core and VernacularName extension(s)")
+    ap.add_argument("--index", type=Path, default=DEFAULT_VERNACULAR_INDEX,
+                    help=f"Index file (default: {DEFAULT_VERNACULAR_INDEX})")
+    ap.add_argument("--kingdom", default="Plantae", help="Only import taxa of this kingdom ('' for all)")
+    args = ap.parse_args()
+    if not args.archive.exists():
+        raise SystemExit(f"Archive not found: {args.archive}")
+    try:
+        build_index(args.archive, args.index, args.kingdom)
+    except (DwcaError, zipfile.BadZipFile) as ex:
+        raise SystemExit(f"{args.archive}: {ex}")
+
+
+if __name__ == "__main__":
+    main()
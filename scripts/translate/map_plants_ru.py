@@ -3,7 +3,16 @@
 """
 map_plants_ru.py
 Обновляет столбец 'ru' в исходном CSV (plants.csv) по латинскому названию из столбца 'sci',
-используя iNaturalist API. Делает два прохода по пустым 'ru' (на случай временных сбоев API).
+используя iNaturalist API.
+
+Поиск в два шага: имя -> ID таксона (поиск /v1/taxa?q=...), затем сведения об
+именах пачками до 30 таксонов одним запросом /v1/taxa/{id,id,...}. Из ответа
+all_names=true сохраняются сразу русские, английские и нидерландские названия
+(scripts/.cache/inat_taxa.sqlite), поэтому конвейер берёт из того же кэша
+кандидатов для пустых 'en' и 'nl' (collect_locale_updates) без новых запросов.
+Все запросы идут через одну сессию с пулом соединений. Повторный проход
+делается только для имён с временной ошибкой (сеть, 429, 5xx); «таксон не
+найден» и «нет названия» окончательны.
 
 Пример:
     python map_plants_ru.py plants.csv
@@ -19,66 +28,305 @@ map_plants_ru.py
 import csv
 import sys
 import time
+import sqlite3
 import argparse
 import logging
-from typing import Optional, List, Dict
+import threading
+from concurrent.futures import Future
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional, List, Dict, Iterable, Tuple
 import requests
 
+from stage_api import CellUpdates, Records, UpdateCallback, apply_updates, finish_updates
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from common.http_cache import CachedSession
+from common.rate_limit import get_limiter, host_of
+
 INAT_BASE = "https://api.inaturalist.org/v1/taxa"
 HEADERS = {"User-Agent": "latin-ru-mapper/1.1 (+contact@example.com)"}
+SESSION = CachedSession("inaturalist")
+SESSION.headers.update(HEADERS)
 
-def fetch_russian_names(scientific_name: str, timeout: float = 20.0) -> List[str]:
+BATCH_SIZE = 30  # предел /v1/taxa/{id,id,...}
+TAXON_DB = Path(__file__).resolve().parents[1] / ".cache" / "inat_taxa.sqlite"
+NEGATIVE_TTL = 30 * 24 * 60 * 60  # «не найдено» перепроверяем раз в месяц
+NAMES_TTL = 30 * 24 * 60 * 60     # собранные названия таксона обновляем раз в месяц
+
+# Языки, которые собираются из одного ответа all_names=true: код столбца -> лексиконы iNaturalist
+LEXICONS: Dict[str, Tuple[str, ...]] = {
+    "ru": ("russian",),
+    "en": ("english",),
+    "nl": ("dutch",),
+}
+
+# Итог поиска для одного имени
+FOUND = "found"
+NOT_FOUND = "not_found"    # таксон не найден (или 4xx) — повторять бессмысленно
+NO_NAME = "no_name"        # таксон есть, названия на нужном языке нет
+TRANSIENT = "transient"    # сеть, таймаут, 429, 5xx, битый JSON — можно повторить
+
+
+@dataclass(frozen=True)
+class TaxonNames:
+    """Всё, что сборщик узнал о латинском имени: ID таксона и названия по языкам."""
+
+    taxon_id: Optional[int]
+    names: Dict[str, List[str]]
+    status: str
+
+
+class TaxonCache:
     """
-    Ищет русские вернакуляры через iNaturalist /v1/taxa с all_names=true и locale=ru.
-    Возвращает список уникальных русских названий (может быть пустым).
+    Постоянный кэш iNaturalist: 'латинское имя -> ID таксона' (None = не найден)
+    и названия таксона по языкам из LEXICONS.
     """
-    params = {
-        "q": scientific_name,
-        "locale": "ru",
-        "per_page": 10,
-        "all_names": "true",
-        "is_active": "true"
-    }
+
+    def __init__(self, path: Path = TAXON_DB):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS taxon_ids (name TEXT PRIMARY KEY, taxon_id INTEGER, resolved_at REAL NOT NULL);
+            CREATE TABLE IF NOT EXISTS taxa (taxon_id INTEGER PRIMARY KEY, fetched_at REAL NOT NULL);
+            CREATE TABLE IF NOT EXISTS vernaculars (
+                taxon_id INTEGER NOT NULL, locale TEXT NOT NULL, position INTEGER NOT NULL, name TEXT NOT NULL,
+                PRIMARY KEY (taxon_id, locale, position)
+            );
+        """)
+        self._conn.commit()
+
+    def get(self, name: str) -> Tuple[bool, Optional[int]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT taxon_id, resolved_at FROM taxon_ids WHERE name = ?", (name.strip().lower(),)
+            ).fetchone()
+        if row is None or (row[0] is None and row[1] < time.time() - NEGATIVE_TTL):
+            return False, None
+        return True, row[0]
+
+    def put(self, name: str, taxon_id: Optional[int]) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO taxon_ids (name, taxon_id, resolved_at) VALUES (?, ?, ?)",
+                (name.strip().lower(), taxon_id, time.time()),
+            )
+            self._conn.commit()
+
+    def forget(self, name: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM taxon_ids WHERE name = ?", (name.strip().lower(),))
+            self._conn.commit()
+
+    def get_names(self, taxon_ids: Iterable[int]) -> Dict[int, Dict[str, List[str]]]:
+        """Названия таксонов, собранные не раньше NAMES_TTL назад."""
+        out: Dict[int, Dict[str, List[str]]] = {}
+        fresh_after = time.time() - NAMES_TTL
+        with self._lock:
+            for taxon_id in taxon_ids:
+                row = self._conn.execute("SELECT fetched_at FROM taxa WHERE taxon_id = ?", (taxon_id,)).fetchone()
+                if row is None or row[0] < fresh_after:
+                    continue
+                names: Dict[str, List[str]] = {locale: [] for locale in LEXICONS}
+                for locale, name in self._conn.execute(
+                    "SELECT locale, name FROM vernaculars WHERE taxon_id = ? ORDER BY locale, position", (taxon_id,)
+                ):
+                    names.setdefault(locale, []).append(name)
+                out[taxon_id] = names
+        return out
+
+    def put_names(self, taxon_id: int, names: Dict[str, List[str]]) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM vernaculars WHERE taxon_id = ?", (taxon_id,))
+            self._conn.executemany(
+                "INSERT INTO vernaculars (taxon_id, locale, position, name) VALUES (?, ?, ?, ?)",
+                [(taxon_id, locale, pos, name) for locale, values in names.items() for pos, name in enumerate(values)],
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO taxa (taxon_id, fetched_at) VALUES (?, ?)", (taxon_id, time.time())
+            )
+            self._conn.commit()
+
+
+_taxon_cache: Optional[TaxonCache] = None
+_taxon_cache_lock = threading.Lock()
+# Сборщик вызывается из нескольких этапов конвейера (ru, en, nl) параллельно.
+# Имя, которое уже запрашивает другой поток, ждёт его результата (_in_flight),
+# а не идёт в сеть второй раз; блокировка охраняет только этот словарь.
+_harvest_lock = threading.Lock()
+_in_flight: Dict[str, "Future[TaxonNames]"] = {}
+
+
+def get_taxon_cache() -> TaxonCache:
+    global _taxon_cache
+    with _taxon_cache_lock:
+        if _taxon_cache is None:
+            _taxon_cache = TaxonCache()
+        return _taxon_cache
+
+
+def _get_json(url: str, params: Dict[str, str], timeout: float = 20.0) -> Tuple[Optional[dict], str]:
+    """GET через общую сессию; возвращает (данные, FOUND) или (None, класс ошибки)."""
     try:
-        r = requests.get(INAT_BASE, params=params, headers=HEADERS, timeout=timeout)
-        r.raise_for_status()
-        data = r.json()
-    except Exception as e:
-        logging.debug("Request error for %s: %s", scientific_name, e)
-        return []
+        r = SESSION.get(url, params=params, timeout=timeout)
+    except requests.RequestException as e:
+        logging.debug("Request error for %s: %s", url, e)
+        return None, TRANSIENT
+    if r.status_code == 429 or r.status_code >= 500:
+        return None, TRANSIENT
+    if r.status_code != 200:
+        return None, NOT_FOUND
+    try:
+        return r.json(), FOUND
+    except ValueError:
+        return None, TRANSIENT
 
-    results = data.get("results", []) or []
-    if not results:
-        return []
 
+def choose_taxon(results: List[dict], scientific_name: str) -> dict:
     # Предпочитаем точное совпадение научного имени
     sci_lower = scientific_name.strip().lower()
-    chosen = None
     for tx in results:
         if str(tx.get("name", "")).strip().lower() == sci_lower:
-            chosen = tx
-            break
-    if chosen is None:
-        chosen = results[0]
-
-    names = chosen.get("names", []) or []
-
-    # Фильтруем русские
-    ru_names: List[str] = []
-    for n in names:
-        if (n.get("lexicon") == "Russian") and n.get("name"):
-            val = str(n.get("name")).strip()
-            if val and val not in ru_names:
-                ru_names.append(val)
-
-    # Если пусто, попробуем preferred_common_name и проверим на кириллицу
-    if not ru_names:
-        pref = chosen.get("preferred_common_name")
+            return tx
+    return results[0]
+
+
+def search_taxon_id(scientific_name: str) -> Tuple[Optional[int], str]:
+    """Шаг 1: ID таксона по латинскому имени (без all_names — ответ лёгкий)."""
+    data, status = _get_json(INAT_BASE, {"q": scientific_name, "per_page": "10", "is_active": "true"})
+    if data is None:
+        return None, status
+    results = data.get("results", []) or []
+    if not results:
+        return None, NOT_FOUND
+    taxon_id = choose_taxon(results, scientific_name).get("id")
+    return (int(taxon_id), FOUND) if taxon_id is not None else (None, NOT_FOUND)
+
+
+def fetch_taxa(taxon_ids: List[int]) -> Tuple[Dict[int, dict], str]:
+    """Шаг 2: полные записи (со всеми именами) до BATCH_SIZE таксонов за запрос."""
+    url = f"{INAT_BASE}/{','.join(str(i) for i in taxon_ids)}"
+    data, status = _get_json(url, {"locale": "ru", "all_names": "true"}, timeout=30.0)
+    if data is None:
+        return {}, status
+    return {int(tx["id"]): tx for tx in data.get("results", []) or [] if tx.get("id") is not None}, FOUND
+
+
+def vernaculars_of(taxon: dict) -> Dict[str, List[str]]:
+    """Названия таксона по языкам из LEXICONS, в порядке iNaturalist, без повторов."""
+    by_lexicon = {lex: locale for locale, lexicons in LEXICONS.items() for lex in lexicons}
+    out: Dict[str, List[str]] = {locale: [] for locale in LEXICONS}
+    for n in taxon.get("names", []) or []:
+        locale = by_lexicon.get(str(n.get("lexicon") or "").strip().lower())
+        val = str(n.get("name") or "").strip()
+        if locale and val and val not in out[locale]:
+            out[locale].append(val)
+
+    # Если русских нет, попробуем preferred_common_name (запрос с locale=ru) и проверим на кириллицу
+    if not out["ru"]:
+        pref = taxon.get("preferred_common_name")
         if isinstance(pref, str) and pref.strip():
             if any("а" <= ch.lower() <= "я" or ch.lower() == "ё" for ch in pref):
-                ru_names.append(pref.strip())
+                out["ru"].append(pref.strip())
+    return out
 
-    return ru_names
+
+def harvest_names(names: Iterable[str], cache: Optional[TaxonCache] = None) -> Dict[str, TaxonNames]:
+    """
+    Латинское имя -> TaxonNames. Один ответ /v1/taxa/{ids}?all_names=true даёт
+    русские, английские и нидерландские названия сразу; они запоминаются в кэше,
+    так что этапы для других языков сети уже не касаются.
+    """
+    own: Dict[str, "Future[TaxonNames]"] = {}
+    others: Dict[str, "Future[TaxonNames]"] = {}
+    with _harvest_lock:
+        for name in dict.fromkeys(n.strip() for n in names if n and n.strip()):
+            if name in _in_flight:
+                others[name] = _in_flight[name]
+            else:
+                own[name] = _in_flight[name] = Future()
+    try:
+        out = _harvest(list(own), cache or get_taxon_cache()) if own else {}
+        for name, future in own.items():
+            future.set_result(out[name])
+    except BaseException as exc:
+        for future in own.values():
+            if not future.done():
+                future.set_exception(exc)
+        raise
+    finally:
+        with _harvest_lock:
+            for name in own:
+                del _in_flight[name]
+    out.update((name, future.result()) for name, future in others.items())
+    return out
+
+
+def _harvest(names: List[str], cache: TaxonCache) -> Dict[str, TaxonNames]:
+    """Сетевая часть harvest_names для имён, которые не запрашивает другой поток."""
+    out: Dict[str, TaxonNames] = {}
+    by_id: Dict[int, List[str]] = {}
+    for name in names:
+        known, taxon_id = cache.get(name)
+        if not known:
+            taxon_id, status = search_taxon_id(name)
+            if status == TRANSIENT:
+                out[name] = TaxonNames(None, {}, TRANSIENT)
+                continue
+            cache.put(name, taxon_id)
+        if taxon_id is None:
+            out[name] = TaxonNames(None, {}, NOT_FOUND)
+            continue
+        by_id.setdefault(taxon_id, []).append(name)
+
+    harvested = cache.get_names(by_id)
+    missing = [taxon_id for taxon_id in by_id if taxon_id not in harvested]
+    for start in range(0, len(missing), BATCH_SIZE):
+        chunk = missing[start:start + BATCH_SIZE]
+        taxa, status = fetch_taxa(chunk)
+        for taxon_id in chunk:
+            taxon = taxa.get(taxon_id)
+            if taxon is not None:
+                harvested[taxon_id] = vernaculars_of(taxon)
+                cache.put_names(taxon_id, harvested[taxon_id])
+            elif status != TRANSIENT:
+                # ID устарел (таксон слит/удалён) — в следующий раз ищем заново
+                for name in by_id[taxon_id]:
+                    cache.forget(name)
+
+    for taxon_id, sci_names in by_id.items():
+        for name in sci_names:
+            if taxon_id in harvested:
+                out[name] = TaxonNames(taxon_id, harvested[taxon_id], FOUND)
+            else:
+                out[name] = TaxonNames(taxon_id, {}, TRANSIENT)
+    return out
+
+
+def resolve_names(names: Iterable[str], locale: str = "ru") -> Dict[str, Tuple[List[str], str]]:
+    """Латинское имя -> (названия на языке locale, итог: FOUND / NOT_FOUND / NO_NAME / TRANSIENT)."""
+    out: Dict[str, Tuple[List[str], str]] = {}
+    for name, result in harvest_names(names).items():
+        if result.status != FOUND:
+            out[name] = ([], result.status)
+            continue
+        values = result.names.get(locale) or []
+        out[name] = (list(values), FOUND if values else NO_NAME)
+    return out
+
+
+def resolve_russian_names(names: Iterable[str]) -> Dict[str, Tuple[List[str], str]]:
+    return resolve_names(names, "ru")
+
+
+def fetch_russian_names(scientific_name: str, timeout: float = 20.0) -> List[str]:
+    """
+    Русские вернакуляры одного таксона (может быть пустым списком).
+    Для многих имён выгоднее resolve_russian_names — он группирует запросы.
+    """
+    return resolve_russian_names([scientific_name]).get(scientific_name.strip(), ([], NOT_FOUND))[0]
 
 def load_csv(path: str):
     with open(path, "r", encoding="utf-8", newline="") as f:
@@ -100,32 +348,68 @@ def write_csv_inplace(path: str, fieldnames: List[str], rows: List[Dict[str, str
             out_row = {fn: row.get(fn, "") for fn in fieldnames}
             writer.writerow(out_row)
 
-def process_inplace(csv_path: str, delay: float = 0.3) -> None:
-    fieldnames, rows = load_csv(csv_path)
-    total = len(rows)
+def collect_locale_updates(rows: Records, locale: str, sci_col: str = "sci", name_col: Optional[str] = None,
+                           delay: float = 0.3, passes: int = 2,
+                           on_update: Optional[UpdateCallback] = None) -> CellUpdates:
+    """
+    Ищет названия на языке locale (см. LEXICONS) для строк с пустым name_col и
+    возвращает {индекс строки: {name_col: название}}, ничего не записывая в файл.
+    Каждая найденная строка сразу сообщается через on_update.
+    Следующие проходы повторяют только имена с временной ошибкой; если они
+    так и не ответили, результат помечается как неполный (IncompleteUpdates).
+    """
+    name_col = name_col or locale
+    # delay — только стартовый интервал; дальше темп подстраивает ограничитель.
+    # Повторный вызов с тем же delay (другие этапы) выученный темп не сбрасывает.
+    get_limiter().configure(host_of(INAT_BASE), interval=delay)
+    found: Dict[int, str] = {}
 
-    # Два прохода по пустым 'ru'
-    for pass_idx in range(2):
-        for idx, row in enumerate(rows, start=1):
-            sci_name = (row.get("sci") or "").strip()
-            ru_name = (row.get("ru") or "").strip()
+    pending: Dict[str, List[int]] = {}
+    for idx, row in enumerate(rows):
+        sci_name = (row.get(sci_col) or "").strip()
+        if sci_name and not (row.get(name_col) or "").strip():
+            pending.setdefault(sci_name, []).append(idx)
 
-            if not sci_name:
-                continue
-            if ru_name:
-                continue  # уже заполнено
-
-            ru_candidates = fetch_russian_names(sci_name)
-            if ru_candidates:
-                chosen = ru_candidates[0]
-                row["ru"] = chosen
-                print(f"[{idx}] {sci_name} -> {chosen}")
+    for pass_idx in range(max(1, passes)):
+        if not pending:
+            break
+        results = resolve_names(list(pending), locale)
+        retry: Dict[str, List[int]] = {}
+        for sci_name, indices in pending.items():
+            candidates, status = results.get(sci_name, ([], TRANSIENT))
+            if candidates:
+                chosen = candidates[0]
+                for idx in indices:
+                    found[idx] = chosen
+                    if on_update:
+                        on_update(idx, {name_col: chosen})
+                    print(f"[{idx + 1}] {sci_name} -> {chosen}")
+            elif status == TRANSIENT:
+                retry[sci_name] = indices
             else:
-                if pass_idx == 1:  # сообщаем окончательный итог только после второго прохода
-                    print(f"[{idx}] {sci_name} -> [no ru name]")
+                for idx in indices:
+                    print(f"[{idx + 1}] {sci_name} -> [no {locale} name]")
+        pending = retry
+
+    for sci_name, indices in pending.items():
+        for idx in indices:
+            print(f"[{idx + 1}] {sci_name} -> [error, try again later]")
+
+    updates = {idx: {name_col: name} for idx, name in found.items()}
+    return finish_updates(updates, sum(len(indices) for indices in pending.values()))
+
+
+def collect_updates(rows: Records, sci_col: str = "sci", ru_col: str = "ru",
+                    delay: float = 0.3, passes: int = 2,
+                    on_update: Optional[UpdateCallback] = None) -> CellUpdates:
+    """Этап конвейера: заполняет пустые 'ru' (см. collect_locale_updates)."""
+    return collect_locale_updates(rows, "ru", sci_col, ru_col, delay=delay, passes=passes, on_update=on_update)
+
+def process_inplace(csv_path: str, delay: float = 0.3) -> None:
+    fieldnames, rows = load_csv(csv_path)
+    total = len(rows)
 
-            if delay > 0:
-                time.sleep(delay)
+    apply_updates(rows, collect_updates(rows, delay=delay))
 
     # Записываем обратно в тот же файл
     write_csv_inplace(csv_path, fieldnames, rows)
@@ -134,9 +418,9 @@ def process_inplace(csv_path: str, delay: float = 0.3) -> None:
     print(f"Done. Filled 'ru' for {filled}/{total}. Saved in-place: {csv_path}")
 
 def main():
-    parser = argparse.ArgumentParser(description="Обновляет столбец 'ru' в исходном CSV по 'sci' с помощью iNaturalist API (2 прохода).")
+    parser = argparse.ArgumentParser(description="Обновляет столбец 'ru' в исходном CSV по 'sci' с помощью iNaturalist API (пакетные запросы, повтор временных ошибок).")
     parser.add_argument("input_csv", help="Путь к исходному CSV с колонками 'sci' и (опционально) 'ru'")
-    parser.add_argument("--delay", type=float, default=0.3, help="Задержка между запросами к API в секундах (по умолчанию 0.3)")
+    parser.add_argument("--delay", type=float, default=0.3, help="Начальная задержка между запросами к API в секундах, далее адаптивно (по умолчанию 0.3)")
     args = parser.parse_args()
 
     process_inplace(args.input_csv, delay=args.delay)
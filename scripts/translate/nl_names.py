@@ -8,6 +8,9 @@ import shutil
 from collections import defaultdict
 from pathlib import Path
 
+from reference_index import get_index
+from stage_api import CellUpdates, Records
+
 def norm_sci(s: str) -> str:
     if s is None:
         return ""
@@ -15,7 +18,9 @@ def norm_sci(s: str) -> str:
     return s.lower()
 
 def sniff_delimiter(path: Path, fallback=";"):
-    sample = path.read_text(encoding="utf-8-sig", errors="replace")[:65536]
+    # достаточно первых 64 КБ, файл целиком не читаем
+    with open(path, "r", encoding="utf-8-sig", errors="replace", newline="") as f:
+        sample = f.read(65536)
     try:
         dialect = csv.Sniffer().sniff(sample, delimiters=[",",";","\t","|"])
         return dialect.delimiter
@@ -36,41 +41,76 @@ def load_dutch_map(dutch_csv_path: Path):
     names_map = defaultdict(set)
     family_map = {}
 
+    # читаем построчно, без списка всех строк в памяти
     with open(dutch_csv_path, "r", encoding="utf-8-sig", newline="") as f:
         reader = csv.reader(f, delimiter=delim)
-        rows = list(reader)
+        first = next(reader, None)
+
+        if not first:
+            print("Ошибка: dutch_names.csv пуст.")
+            sys.exit(1)
+
+        # нормализуем заголовки
+        header = [ (h or "").strip().lstrip("\ufeff").lower() for h in first ]
+        print(f"[dutch] Заголовки: {header}")
+
+        try:
+            idx_sci = header.index("scientificname")
+            idx_nl  = header.index("vernacularname")
+            idx_fam = header.index("family")
+        except ValueError as e:
+            print("Ошибка: в dutch_names.csv нет ожидаемых колонок: family, scientificName, vernacularName")
+            sys.exit(1)
+
+        for r in reader:
+            # пропустим короткие строки
+            if len(r) <= max(idx_sci, idx_nl, idx_fam):
+                continue
+            sci = norm_sci(r[idx_sci])
+            nl  = (r[idx_nl] or "").strip()
+            fam = (r[idx_fam] or "").strip()
+            if not sci:
+                continue
+            if nl:
+                names_map[sci].add(nl)
+            if fam and sci not in family_map:
+                family_map[sci] = fam
 
-    if not rows:
-        print("Ошибка: dutch_names.csv пуст.")
-        sys.exit(1)
+    return names_map, family_map
 
-    # нормализуем заголовки
-    header = [ (h or "").strip().lstrip("\ufeff").lower() for h in rows[0] ]
-    print(f"[dutch] Заголовки: {header}")
+def lookup_dutch_names(dutch_csv_path: Path, keys):
+    """
+    Как load_dutch_map, но через скомпилированный индекс (reference_index.py):
+    CSV разбирается только если он изменился, а из индекса берутся лишь
+    нужные ключи norm_sci.
+    """
+    index = get_index()
+    if index.ensure("dutch_csv", dutch_csv_path, load_dutch_map):
+        print(f"[dutch] Индекс пересобран: {index.path}")
+    return index.lookup("dutch_csv", keys)
 
-    try:
-        idx_sci = header.index("scientificname")
-        idx_nl  = header.index("vernacularname")
-        idx_fam = header.index("family")
-    except ValueError as e:
-        print("Ошибка: в dutch_names.csv нет ожидаемых колонок: family, scientificName, vernacularName")
-        sys.exit(1)
+def collect_updates(rows: Records, names_map, family_map, sci_col: str = "sci",
+                    nl_col: str = "nl", family_col: str = "family") -> CellUpdates:
+    """
+    Этап конвейера: пустые NL и family из dutch_names.csv,
+    результат — {индекс строки: {колонка: значение}}.
+    """
+    updates: CellUpdates = {}
+    for i, row in enumerate(rows):
+        key = norm_sci(row.get(sci_col, ""))
+        cells = {}
 
-    for r in rows[1:]:
-        # пропустим короткие строки
-        if len(r) <= max(idx_sci, idx_nl, idx_fam):
-            continue
-        sci = norm_sci(r[idx_sci])
-        nl  = (r[idx_nl] or "").strip()
-        fam = (r[idx_fam] or "").strip()
-        if not sci:
-            continue
-        if nl:
-            names_map[sci].add(nl)
-        if fam and sci not in family_map:
-            family_map[sci] = fam
+        # NL
+        if (row.get(nl_col) or "").strip() == "" and key in names_map and names_map[key]:
+            cells[nl_col] = " | ".join(sorted(names_map[key], key=str.lower))
 
-    return names_map, family_map
+        # family
+        if (row.get(family_col) or "").strip() == "" and key in family_map:
+            cells[family_col] = family_map[key]
+
+        if cells:
+            updates[i] = cells
+    return updates
 
 def backup_file(path: Path) -> Path:
     ts = time.strftime("%Y%m%d_%H%M%S")
@@ -91,8 +131,6 @@ def main():
     if not dutch_path.exists():
         print(f"Не найден файл: {dutch_path}"); sys.exit(1)
 
-    names_map, family_map = load_dutch_map(dutch_path)
-
     # читаем plants.csv (допустим любой разделитель)
     delim_plants = sniff_delimiter(plants_path, fallback=",")
     print(f"[plants] Использую разделитель: {repr(delim_plants)}")
@@ -108,29 +146,21 @@ def main():
         print("Ошибка: в plants.csv отсутствуют колонки: " + ", ".join(missing))
         sys.exit(1)
 
-    # создаём бэкап
-    backup = backup_file(plants_path)
-    print(f"Создан бэкап: {backup.name}")
-
     # карта: нормализованное имя колонки -> оригинальное имя (чтобы сохранить порядок и регистр)
     colmap = { (h or "").strip().lower(): h for h in fieldnames }
 
-    updated_nl = 0
-    updated_fam = 0
+    names_map, family_map = lookup_dutch_names(
+        dutch_path, (norm_sci(row.get(colmap["sci"], "")) for row in rows))
 
-    for row in rows:
-        sci_raw = row.get(colmap["sci"], "")
-        key = norm_sci(sci_raw)
-
-        # NL
-        if (row.get(colmap["nl"]) or "").strip() == "" and key in names_map and names_map[key]:
-            row[colmap["nl"]] = " | ".join(sorted(names_map[key], key=str.lower))
-            updated_nl += 1
+    # создаём бэкап
+    backup = backup_file(plants_path)
+    print(f"Создан бэкап: {backup.name}")
 
-        # family
-        if (row.get(colmap["family"]) or "").strip() == "" and key in family_map:
-            row[colmap["family"]] = family_map[key]
-            updated_fam += 1
+    updates = collect_updates(rows, names_map, family_map, colmap["sci"], colmap["nl"], colmap["family"])
+    updated_nl = sum(1 for cells in updates.values() if colmap["nl"] in cells)
+    updated_fam = sum(1 for cells in updates.values() if colmap["family"] in cells)
+    for i, cells in updates.items():
+        rows[i].update(cells)
 
     # пишем обратно plants.csv тем же разделителем и теми же заголовками
     with open(plants_path, "w", encoding="utf-8-sig", newline="") as f:
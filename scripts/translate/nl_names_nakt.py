@@ -21,6 +21,9 @@ import shutil
 from pathlib import Path
 from collections import defaultdict
 
+from reference_index import get_index
+from stage_api import CellUpdates, Records
+
 def norm_space(s: str) -> str:
     if s is None:
         return ""
@@ -30,7 +33,9 @@ def norm_sci(s: str) -> str:
     return norm_space(s).lower()
 
 def sniff_delimiter(path: Path, fallback=","):
-    sample = path.read_text(encoding="utf-8-sig", errors="replace")[:65536]
+    # достаточно первых 64 КБ, файл целиком не читаем
+    with open(path, "r", encoding="utf-8-sig", errors="replace", newline="") as f:
+        sample = f.read(65536)
     try:
         dialect = csv.Sniffer().sniff(sample, delimiters=[",",";","\t","|"])
         return dialect.delimiter
@@ -120,6 +125,31 @@ def load_nakt_map(xlsx_path: Path):
 
     return names_map
 
+def lookup_nakt_names(xlsx_path: Path, keys):
+    """
+    Названия Naktuinbouw для нужных ключей norm_sci из скомпилированного
+    индекса (reference_index.py); Excel разбирается заново только если файл
+    изменился.
+    """
+    index = get_index()
+    if index.ensure("nakt", xlsx_path, lambda path: (load_nakt_map(path), {})):
+        print(f"[nakt] Индекс пересобран: {index.path}")
+    names_map, _ = index.lookup("nakt", keys)
+    return names_map
+
+def collect_updates(rows: Records, names_map, sci_col: str = "sci", nl_col: str = "nl") -> CellUpdates:
+    """
+    Этап конвейера: пустые NL из списка Naktuinbouw,
+    результат — {индекс строки: {nl_col: названия}}.
+    """
+    updates: CellUpdates = {}
+    for i, row in enumerate(rows):
+        key = norm_sci(row.get(sci_col, ""))
+        is_nl_empty = (row.get(nl_col) or "").strip() == ""
+        if is_nl_empty and key in names_map and names_map[key]:
+            updates[i] = {nl_col: " | ".join(sorted(names_map[key], key=str.lower))}
+    return updates
+
 def main():
     if len(sys.argv) != 3:
         print("Usage: py -3 nl_names_nakt.py plants.csv Naktuinbouw_Standaardlijst.xlsx")
@@ -135,9 +165,6 @@ def main():
         print(f"Не найден файл: {xlsx_path}")
         sys.exit(1)
 
-    names_map = load_nakt_map(xlsx_path)
-    print(f"[nakt] Найдено латинских ключей: {len(names_map)}")
-
     # читаем plants.csv
     delim_plants = sniff_delimiter(plants_path, fallback=",")
     print(f"[plants] Использую разделитель: {repr(delim_plants)}")
@@ -156,20 +183,17 @@ def main():
         print("Ошибка: в plants.csv отсутствуют колонки: " + ", ".join(missing))
         sys.exit(1)
 
+    names_map = lookup_nakt_names(xlsx_path, (norm_sci(row.get(colmap["sci"], "")) for row in rows))
+    print(f"[nakt] Найдено латинских ключей: {len(names_map)}")
+
     # бэкап
     backup = backup_file(plants_path)
     print(f"Создан бэкап: {backup.name}")
 
-    updated_nl = 0
-
-    for row in rows:
-        sci_raw = row.get(colmap["sci"], "")
-        key = norm_sci(sci_raw)
-
-        is_nl_empty = (row.get(colmap["nl"]) or "").strip() == ""
-        if is_nl_empty and key in names_map and names_map[key]:
-            row[colmap["nl"]] = " | ".join(sorted(names_map[key], key=str.lower))
-            updated_nl += 1
+    updates = collect_updates(rows, names_map, colmap["sci"], colmap["nl"])
+    updated_nl = len(updates)
+    for i, cells in updates.items():
+        rows[i].update(cells)
 
     # записываем обратно с теми же заголовками и разделителем
     with open(plants_path, "w", encoding="utf-8-sig", newline="") as f:
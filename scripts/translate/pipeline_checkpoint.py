@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Checkpoints for ``translation_pipeline.py``.
+
+A checkpoint directory holds, for one input table:
+
+``state.json``
+    the fingerprint (SHA-256) of the input file the run started from;
+``<stage>.jsonl``
+    every cell a stage has filled so far, one ``{"row": i, "cells": {...}}``
+    line per result, flushed as it arrives;
+``<stage>.done.json``
+    all updates of a stage that finished.
+
+On ``--resume`` finished stages are replayed from their ``.done.json`` and an
+interrupted stage starts with its journalled cells already in the table, so
+it continues with the rows it had not filled yet. The directory is removed
+after the pipeline has written its result.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+from pathlib import Path
+from typing import Dict, Optional
+
+from stage_api import CellUpdates
+
+STATE_FILE = "state.json"
+
+
+def file_fingerprint(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as fh:
+        for block in iter(lambda: fh.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def default_checkpoint_dir(plants_path: Path, root: Path) -> Path:
+    """``root/<stem>-<hash of the absolute path>`` so tables never share one."""
+    tag = hashlib.sha1(str(plants_path.resolve()).encode("utf-8")).hexdigest()[:10]
+    return root / f"{plants_path.stem}-{tag}"
+
+
+def _write_json_atomic(path: Path, data) -> None:
+    tmp = path.with_name(path.name + ".tmp")
+    with tmp.open("w", encoding="utf-8") as fh:
+        json.dump(data, fh, ensure_ascii=False)
+        fh.flush()
+        os.fsync(fh.fileno())
+    os.replace(tmp, path)
+
+
+def _updates_from_json(data: Dict[str, Dict[str, str]]) -> CellUpdates:
+    return {int(row): dict(cells) for row, cells in data.items()}
+
+
+class PipelineCheckpoint:
+    """Per-stage results of one pipeline run over one input file."""
+
+    def __init__(self, directory: Path, fingerprint: str) -> None:
+        self.directory = Path(directory)
+        self.fingerprint = fingerprint
+        self._lock = threading.Lock()
+        self._journals: Dict[str, object] = {}
+
+    @classmethod
+    def open(cls, directory: Path, fingerprint: str, resume: bool) -> "PipelineCheckpoint":
+        """Reuse ``directory`` when resuming the same input, start afresh otherwise."""
+        checkpoint = cls(directory, fingerprint)
+        state = checkpoint._read_state()
+        if not (resume and state and state.get("fingerprint") == fingerprint):
+            if resume and state:
+                print(f"[checkpoint] Input changed since {directory} was written; starting over.")
+            elif resume:
+                print(f"[checkpoint] Nothing to resume in {directory}.")
+            checkpoint.clear()
+        directory.mkdir(parents=True, exist_ok=True)
+        _write_json_atomic(directory / STATE_FILE, {"fingerprint": fingerprint})
+        return checkpoint
+
+    def _read_state(self) -> Optional[dict]:
+        try:
+            return json.loads((self.directory / STATE_FILE).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+
+    def completed(self, stage: str) -> Optional[CellUpdates]:
+        """Updates of ``stage`` if it finished in an earlier run."""
+        path = self.directory / f"{stage}.done.json"
+        try:
+            return _updates_from_json(json.loads(path.read_text(encoding="utf-8")))
+        except (OSError, ValueError):
+            return None
+
+    def partial(self, stage: str) -> CellUpdates:
+        """Cells journalled by an interrupted run of ``stage``."""
+        updates: CellUpdates = {}
+        path = self.directory / f"{stage}.jsonl"
+        if not path.exists():
+            return updates
+        with path.open("r", encoding="utf-8") as fh:
+            for line in fh:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    break  # torn last line of a killed run
+                updates.setdefault(int(entry["row"]), {}).update(entry["cells"])
+        return updates
+
+    def record(self, stage: str, row: int, cells: Dict[str, str]) -> None:
+        """Append one result of ``stage`` to its journal."""
+        line = json.dumps({"row": row, "cells": cells}, ensure_ascii=False) + "\n"
+        with self._lock:
+            fh = self._journals.get(stage)
+            if fh is None:
+                fh = (self.directory / f"{stage}.jsonl").open("a", encoding="utf-8")
+                self._journals[stage] = fh
+            fh.write(line)
+            fh.flush()
+
+    def complete(self, stage: str, updates: CellUpdates) -> None:
+        """Mark ``stage`` finished with all of its ``updates``."""
+        _write_json_atomic(
+            self.directory / f"{stage}.done.json",
+            {str(row): cells for row, cells in sorted(updates.items())},
+        )
+        with self._lock:
+            fh = self._journals.pop(stage, None)
+            if fh is not None:
+                fh.close()
+        (self.directory / f"{stage}.jsonl").unlink(missing_ok=True)
+
+    def close(self) -> None:
+        with self._lock:
+            for fh in self._journals.values():
+                fh.close()
+            self._journals.clear()
+
+    def clear(self) -> None:
+        self.close()
+        shutil.rmtree(self.directory, ignore_errors=True)
@@ -16,20 +16,26 @@
 import argparse
 import csv
 import sys
-import time
-from typing import List, Dict, Tuple, Optional
+from typing import List, Dict, Set, Tuple, Optional
 import re
 import shutil
+from pathlib import Path
 import requests
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 from urllib.parse import urlencode, quote_plus
 from bs4 import BeautifulSoup
 
+from stage_api import CellUpdates, Records, UpdateCallback, apply_updates, finish_updates
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from common.http_cache import CachedSession
+from common.rate_limit import get_limiter, host_of
+
 BASE = "https://www.plantarium.ru"
 SEARCH = f"{BASE}/page/search.html"
 UA = "Plantarium-RU-Filler/2.0 (+https://example.org)"
-REQ_SLEEP = 0.25
+REQ_SLEEP = 0.25  # стартовый интервал адаптивного ограничителя
 
 RANK_WORDS = (
     "род", "вид", "семейство", "подсемейство", "триба", "секция",
@@ -43,7 +49,7 @@ def eprint(*args, **kwargs):
     print(*args, file=sys.stderr, **kwargs)
 
 def make_session() -> requests.Session:
-    s = requests.Session()
+    s = CachedSession("plantarium")
     s.headers.update({"User-Agent": UA})
     retry = Retry(
         total=5,
@@ -240,12 +246,16 @@ def fetch_ru_name(sess: requests.Session, latin: str) -> Optional[str]:
         for match in ("equal", "begin", "part"):
             url = build_search_url(sample, match=match)
             r = sess.get(url, timeout=30)
+            if r.status_code == 429 or r.status_code >= 500:
+                r.raise_for_status()  # временная ошибка, а не «не найдено»
             if r.status_code != 200:
                 continue
             href = first_taxon_href_from_search(r.text, sample)
             if not href:
                 continue
             rp = sess.get(href, timeout=30)
+            if rp.status_code == 429 or rp.status_code >= 500:
+                rp.raise_for_status()
             if rp.status_code != 200:
                 continue
             ru = extract_ru_name_from_taxon_page(rp.text, sample)
@@ -253,37 +263,62 @@ def fetch_ru_name(sess: requests.Session, latin: str) -> Optional[str]:
                 ru = cleanup_ru(ru)
                 if ru:
                     return ru
-            time.sleep(REQ_SLEEP)
     return None
 
-def process_pass(sess: requests.Session, rows: List[Dict[str, str]], sci_col: str, ru_col: str, sleep: float) -> int:
+def process_pass(sess: requests.Session, rows: Records, sci_col: str, ru_col: str,
+                 found: Dict[int, str], on_update: Optional[UpdateCallback] = None,
+                 failed: Optional[Set[int]] = None) -> int:
+    """Один проход по пустым 'ru'; строки с сетевой ошибкой попадают в failed."""
     filled = 0
     for i, row in enumerate(rows):
         latin = (row.get(sci_col) or "").strip()
-        ru_val = (row.get(ru_col) or "").strip()
+        ru_val = found.get(i) or (row.get(ru_col) or "").strip()
         if not latin or ru_val:
             continue
         try:
             ru = fetch_ru_name(sess, latin)
         except requests.RequestException as ex:
             eprint(f"[{i}] network error for '{latin}': {ex}")
-            ru = None
+            if failed is not None:
+                failed.add(i)
+            continue
+        if failed is not None:
+            failed.discard(i)
         if ru:
-            rows[i][ru_col] = ru
+            found[i] = ru
+            if on_update:
+                on_update(i, {ru_col: ru})
             filled += 1
             eprint(f"[{i}] {latin} -> {ru}")
         else:
             eprint(f"[{i}] {latin} -> not found")
-        time.sleep(sleep)
     return filled
 
+def collect_updates(rows: Records, sci_col: str = "sci", ru_col: str = "ru", passes: int = 2,
+                    sleep: float = REQ_SLEEP, sess: Optional[requests.Session] = None,
+                    on_update: Optional[UpdateCallback] = None) -> CellUpdates:
+    """Этап конвейера: возвращает {индекс строки: {ru_col: название}} для пустых 'ru'."""
+    get_limiter().configure(host_of(BASE), interval=max(0.0, sleep))
+    sess = sess or make_session()
+    found: Dict[int, str] = {}
+    failed: Set[int] = set()
+    for p in range(1, max(1, passes) + 1):
+        eprint(f"Pass {p}...")
+        added = process_pass(sess, rows, sci_col, ru_col, found, on_update, failed)
+        eprint(f"Pass {p}: filled {added}.")
+        if added == 0:
+            break
+    if failed:
+        eprint(f"{len(failed)} rows failed with network errors; try again later.")
+    return finish_updates({i: {ru_col: ru} for i, ru in found.items()}, len(failed))
+
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("csv_path", help="Path to plants.csv")
     ap.add_argument("--sci-col", default="sci", help="CSV column with scientific names")
     ap.add_argument("--ru-col", default="ru", help="CSV column to fill with Russian names")
     ap.add_argument("--passes", type=int, default=2, help="How many passes over still-empty cells")
-    ap.add_argument("--sleep", type=float, default=REQ_SLEEP, help="Pause between requests (seconds)")
+    ap.add_argument("--sleep", type=float, default=REQ_SLEEP, help="Initial pause between requests (seconds); adapted to server responses")
     ap.add_argument("--output", default=None, help="Write to a separate CSV instead of in-place update")
     ap.add_argument("--backup", action="store_true", help="Create .bak backup when writing in-place")
     args = ap.parse_args()
@@ -300,16 +335,8 @@ def main():
             shutil.copyfile(args.csv_path, bak)
             eprint(f"Backup created: {bak}")
 
-    sess = make_session()
-
-    total = 0
-    for p in range(1, max(1, args.passes) + 1):
-        eprint(f"Pass {p}...")
-        added = process_pass(sess, rows, args.sci_col, args.ru_col, sleep=max(0.0, args.sleep))
-        total += added
-        eprint(f"Pass {p}: filled {added}.")
-        if added == 0:
-            break
+    updates = collect_updates(rows, args.sci_col, args.ru_col, args.passes, args.sleep)
+    total = apply_updates(rows, updates)
 
     write_csv_rows(out_path, rows, fieldnames)
     eprint(f"Done. Wrote: {out_path}. Newly filled: {total}. Rows total: {len(rows)}")
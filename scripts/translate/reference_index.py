@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Compiled lookup index for the Dutch reference lists.
+
+Parsing ``Naktuinbouw_Standaardlijst.xlsx`` with openpyxl or the whole
+``dutch_names.csv`` takes seconds, while a pipeline run only needs the few
+hundred scientific names of the plants table. ``ReferenceIndex`` compiles a
+source once into an SQLite file keyed by ``norm_sci`` and answers lookups from
+it. A source is recompiled only when its file changed: size and mtime are
+compared first, and if they differ the SHA-256 decides (a touched but
+identical file only refreshes the stored stat).
+"""
+from __future__ import annotations
+
+import hashlib
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Mapping, Set, Tuple
+
+__all__ = [
+    "DEFAULT_INDEX_PATH",
+    "ReferenceIndex",
+    "get_index",
+]
+
+DEFAULT_INDEX_PATH = Path(__file__).resolve().parents[1] / ".cache" / "reference_index.sqlite"
+
+NamesMap = Mapping[str, Iterable[str]]
+FamilyMap = Mapping[str, str]
+Compiler = Callable[[Path], Tuple[NamesMap, FamilyMap]]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sources (
+    source TEXT PRIMARY KEY,
+    path TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    sha256 TEXT NOT NULL,
+    built_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS names (
+    source TEXT NOT NULL,
+    sci TEXT NOT NULL,
+    name TEXT NOT NULL,
+    PRIMARY KEY (source, sci, name)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS families (
+    source TEXT NOT NULL,
+    sci TEXT NOT NULL,
+    family TEXT NOT NULL,
+    PRIMARY KEY (source, sci)
+) WITHOUT ROWID;
+"""
+
+_QUERY_CHUNK = 500
+
+
+def file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as fh:
+        for block in iter(lambda: fh.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ReferenceIndex:
+    """Thread-safe SQLite index of ``norm_sci -> names / family`` per source."""
+
+    def __init__(self, path: Path | str = DEFAULT_INDEX_PATH) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+
+    def ensure(self, source: str, path: Path, compiler: Compiler) -> bool:
+        """Compile ``path`` into ``source`` unless the stored copy is current.
+
+        Returns True when the source was (re)built.
+        """
+        path = Path(path)
+        stat = path.stat()
+        resolved = str(path.resolve())
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT path, size, mtime_ns, sha256 FROM sources WHERE source = ?", (source,)
+            ).fetchone()
+        if row and row[0] == resolved and row[1] == stat.st_size and row[2] == stat.st_mtime_ns:
+            return False
+        sha = file_sha256(path)
+        if row and row[0] == resolved and row[3] == sha:
+            with self._lock, self._conn:
+                self._conn.execute(
+                    "UPDATE sources SET size = ?, mtime_ns = ? WHERE source = ?",
+                    (stat.st_size, stat.st_mtime_ns, source),
+                )
+            return False
+
+        names_map, family_map = compiler(path)
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM names WHERE source = ?", (source,))
+            self._conn.execute("DELETE FROM families WHERE source = ?", (source,))
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO names (source, sci, name) VALUES (?, ?, ?)",
+                ((source, sci, name) for sci, names in names_map.items() for name in names),
+            )
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO families (source, sci, family) VALUES (?, ?, ?)",
+                ((source, sci, family) for sci, family in family_map.items()),
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sources (source, path, size, mtime_ns, sha256, built_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (source, resolved, stat.st_size, stat.st_mtime_ns, sha, time.time()),
+            )
+        return True
+
+    def lookup(self, source: str, keys: Iterable[str]) -> Tuple[Dict[str, Set[str]], Dict[str, str]]:
+        """Names and families of ``source`` for the given ``norm_sci`` keys."""
+        wanted = sorted({k for k in keys if k})
+        names: Dict[str, Set[str]] = {}
+        families: Dict[str, str] = {}
+        with self._lock:
+            for i in range(0, len(wanted), _QUERY_CHUNK):
+                chunk = wanted[i:i + _QUERY_CHUNK]
+                marks = ",".join("?" * len(chunk))
+                for sci, name in self._conn.execute(
+                    f"SELECT sci, name FROM names WHERE source = ? AND sci IN ({marks})", (source, *chunk)
+                ):
+                    names.setdefault(sci, set()).add(name)
+                for sci, family in self._conn.execute(
+                    f"SELECT sci, family FROM families WHERE source = ? AND sci IN ({marks})", (source, *chunk)
+                ):
+                    families[sci] = family
+        return names, families
+
+
+_shared_index: ReferenceIndex | None = None
+_shared_lock = threading.Lock()
+
+
+def get_index() -> ReferenceIndex:
+    """Return the process-wide index at ``DEFAULT_INDEX_PATH``."""
+    global _shared_index
+    with _shared_lock:
+        if _shared_index is None:
+            _shared_index = ReferenceIndex()
+        return _shared_index
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Stage API shared by the translation scripts and ``translation_pipeline.py``.
+
+A stage receives the plants table as a list of ``{column: value}`` rows and
+returns the cells it wants to change as ``{row_index: {column: value}}``; it
+never reads or writes files itself. A stage whose lookups failed transiently
+returns ``IncompleteUpdates`` instead, so the pipeline reruns it next time. The pipeline keeps one ``PlantTable`` in
+memory, applies every stage's updates to it and writes the file once.
+
+``stage_branches`` turns the stage list into a dependency graph: stages that
+write the same column or name each other in ``after`` form one branch and run
+in order; different branches touch disjoint columns and may run concurrently.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Mapping, Sequence, Tuple
+
+CellUpdates = Dict[int, Dict[str, str]]
+Records = Sequence[Mapping[str, str]]
+# on_update(row_index, cells): a stage reports each row it fills as soon as it
+# has it, so the pipeline can checkpoint partial results
+UpdateCallback = Callable[[int, Dict[str, str]], None]
+
+
+class IncompleteUpdates(dict):
+    """``CellUpdates`` of a stage whose lookups partly failed for now.
+
+    ``pending`` counts the rows left unanswered by transient errors (timeouts,
+    429/5xx, no network); they are worth another run, so the build cache does
+    not record such a stage as up to date.
+    """
+
+    def __init__(self, updates: CellUpdates, pending: int) -> None:
+        super().__init__(updates)
+        self.pending = pending
+
+
+def finish_updates(updates: CellUpdates, pending: int) -> CellUpdates:
+    """Return ``updates``, marked incomplete if ``pending`` rows are still unanswered."""
+    return IncompleteUpdates(updates, pending) if pending else updates
+
+
+def normalize_header(h: str) -> str:
+    h = (h or "").replace("\ufeff", "")
+    return " ".join(h.strip().split()).lower()
+
+
+def apply_updates(rows: List[Dict[str, str]], updates: CellUpdates) -> int:
+    """Write ``updates`` into dict rows (as the CLIs hold them); return cells changed."""
+    changed = 0
+    for idx, values in updates.items():
+        for col, value in values.items():
+            if rows[idx].get(col) != value:
+                rows[idx][col] = value
+                changed += 1
+    return changed
+
+
+@dataclass(frozen=True)
+class Stage:
+    """One enrichment step: ``run(records, on_update=None) -> CellUpdates`` filling ``columns``.
+
+    ``after`` names stages whose results this one must see (Plantarium only
+    looks at rows iNaturalist left empty). ``reads``, ``inputs`` (reference
+    files) and ``options`` together with ``columns`` are everything the
+    stage's result depends on; see ``stage_cache.py``.
+    """
+
+    name: str
+    title: str
+    columns: Tuple[str, ...]
+    run: Callable[..., CellUpdates]
+    after: Tuple[str, ...] = ()
+    reads: Tuple[str, ...] = ()
+    inputs: Tuple[Path, ...] = ()
+    options: Mapping[str, object] = field(default_factory=dict)
+
+
+def stage_branches(stages: Sequence[Stage]) -> List[List[Stage]]:
+    """Split ``stages`` into independent branches.
+
+    A branch is a connected group of stages linked by a shared column or an
+    ``after`` edge; inside it stages keep a dependency-respecting order (ties
+    broken by list order). Branches are ordered by their first stage and write
+    pairwise disjoint columns.
+    """
+    names = {stage.name: i for i, stage in enumerate(stages)}
+    parent = list(range(len(stages)))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def union(a: int, b: int) -> None:
+        ra, rb = find(a), find(b)
+        if ra != rb:
+            parent[max(ra, rb)] = min(ra, rb)
+
+    writers: Dict[str, int] = {}
+    for i, stage in enumerate(stages):
+        for col in stage.columns:
+            if col in writers:
+                union(writers[col], i)
+            writers.setdefault(col, i)
+        for dep in stage.after:
+            if dep in names:
+                union(names[dep], i)
+
+    groups: Dict[int, List[int]] = {}
+    for i in range(len(stages)):
+        groups.setdefault(find(i), []).append(i)
+
+    branches: List[List[Stage]] = []
+    for root in sorted(groups):
+        pending = list(groups[root])
+        done: List[int] = []
+        while pending:
+            for i in pending:
+                deps = [names[d] for d in stages[i].after if d in names]
+                if all(d in done or d not in pending for d in deps):
+                    break
+            else:
+                raise ValueError("circular 'after' dependency between stages: "
+                                 + ", ".join(stages[i].name for i in pending))
+            pending.remove(i)
+            done.append(i)
+        branches.append([stages[i] for i in done])
+    return branches
+
+
+@dataclass
+class PlantTable:
+    """Header plus raw rows; stages see it through ``records()``."""
+
+    fieldnames: List[str]
+    rows: List[List[str]] = field(default_factory=list)
+
+    @classmethod
+    def from_rows(cls, rows: Sequence[Sequence[str]]) -> "PlantTable":
+        if not rows:
+            return cls([], [])
+        return cls([str(h) for h in rows[0]], [list(row) for row in rows[1:]])
+
+    def to_rows(self) -> List[List[str]]:
+        return [list(self.fieldnames)] + [list(row) for row in self.rows]
+
+    def find_column(self, name: str) -> str | None:
+        """Actual header for ``name``, ignoring case, spaces and a BOM."""
+        wanted = normalize_header(name)
+        for h in self.fieldnames:
+            if normalize_header(h) == wanted:
+                return h
+        return None
+
+    def ensure_column(self, name: str) -> str:
+        found = self.find_column(name)
+        if found is not None:
+            return found
+        self.fieldnames.append(name)
+        return name
+
+    def column_values(self, name: str) -> List[str]:
+        c = self.fieldnames.index(name)
+        return [row[c] if c < len(row) else "" for row in self.rows]
+
+    def records(self) -> List[Dict[str, str]]:
+        out: List[Dict[str, str]] = []
+        for row in self.rows:
+            rec: Dict[str, str] = {}
+            for i, h in enumerate(self.fieldnames):
+                if h not in rec:
+                    rec[h] = row[i] if i < len(row) else ""
+            out.append(rec)
+        return out
+
+    def copy(self) -> "PlantTable":
+        return PlantTable(list(self.fieldnames), [list(row) for row in self.rows])
+
+    def diff(self, other: "PlantTable") -> CellUpdates:
+        """Cells of ``self`` that differ from ``other`` (same rows and header)."""
+        updates: CellUpdates = {}
+        for r, row in enumerate(self.rows):
+            base = other.rows[r]
+            for c, h in enumerate(self.fieldnames):
+                value = row[c] if c < len(row) else ""
+                if value != (base[c] if c < len(base) else ""):
+                    updates.setdefault(r, {})[h] = value
+        return updates
+
+    def apply(self, updates: CellUpdates) -> int:
+        """Write ``updates`` into the table; return the number of cells changed."""
+        index = {}
+        for i, h in enumerate(self.fieldnames):
+            index.setdefault(h, i)
+        changed = 0
+        for r, values in sorted(updates.items()):
+            row = self.rows[r]
+            for col, value in values.items():
+                c = index.get(col)
+                if c is None:
+                    raise KeyError(f"unknown column {col!r}")
+                if c >= len(row):
+                    row.extend([""] * (c + 1 - len(row)))
+                if row[c] != value:
+                    row[c] = value
+                    changed += 1
+        return changed
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Build cache for ``translation_pipeline.py``: skip stages with unchanged inputs.
+
+A stage's fingerprint covers its name and options, the columns it reads
+(``sci``) and writes, and the contents of its reference files
+(``dutch_names.csv``, the Naktuinbouw list). After a successful run the
+fingerprint of every stage is stored as computed on the final table; a later
+run skips a stage whose fingerprint, computed on the table it is about to
+receive, is the same. Such a stage would only see the cells it produced
+last time. A stage that returned ``IncompleteUpdates`` (lookups failed
+transiently) gets no fingerprint, so the next run tries it again.
+
+Reference files are hashed once per size/mtime; the digests are kept in the
+same JSON file so a no-op run does not reread them.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, Set
+
+from stage_api import PlantTable, Stage
+
+
+def _file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as fh:
+        for block in iter(lambda: fh.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class BuildCache:
+    """Stage fingerprints of one plants table, stored in a JSON file."""
+
+    def __init__(self, path: Path, table_key: str, force: bool = False) -> None:
+        self.path = Path(path)
+        self.table_key = table_key
+        # force: treat every stage as stale but still record the new fingerprints
+        self.force = force
+        self._incomplete: Set[str] = set()
+        self._lock = threading.Lock()
+        try:
+            self._data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            self._data = {}
+        self._data.setdefault("tables", {})
+        self._data.setdefault("files", {})
+
+    def file_digest(self, path: Path) -> str:
+        stat = path.stat()
+        key = str(path.resolve())
+        with self._lock:
+            entry = self._data["files"].get(key)
+            if entry and entry[0] == stat.st_size and entry[1] == stat.st_mtime_ns:
+                return entry[2]
+        digest = _file_sha256(path)
+        with self._lock:
+            self._data["files"][key] = [stat.st_size, stat.st_mtime_ns, digest]
+        return digest
+
+    def fingerprint(self, stage: Stage, table: PlantTable) -> str:
+        digest = hashlib.sha256()
+        header = {
+            "stage": stage.name,
+            "options": stage.options,
+            "reads": list(stage.reads),
+            "columns": list(stage.columns),
+            "inputs": [self.file_digest(Path(p)) for p in stage.inputs],
+        }
+        digest.update(json.dumps(header, sort_keys=True, default=str).encode("utf-8"))
+        for column in stage.reads + stage.columns:
+            digest.update(b"\x1e")
+            for value in table.column_values(column):
+                digest.update(value.encode("utf-8"))
+                digest.update(b"\x1f")
+        return digest.hexdigest()
+
+    def is_fresh(self, stage: Stage, table: PlantTable) -> bool:
+        """True if ``stage`` ran successfully last time on exactly these inputs."""
+        if self.force:
+            return False
+        with self._lock:
+            stored = self._data["tables"].get(self.table_key, {}).get(stage.name)
+        return stored is not None and stored == self.fingerprint(stage, table)
+
+    def mark_incomplete(self, stage: Stage) -> None:
+        """Keep ``stage`` out of the next ``update``: its result is not final."""
+        with self._lock:
+            self._incomplete.add(stage.name)
+
+    def update(self, stages: Iterable[Stage], table: PlantTable) -> None:
+        """Store the fingerprints of ``stages`` for the final ``table`` and save.
+
+        Stages marked incomplete lose their stored fingerprint instead.
+        """
+        with self._lock:
+            incomplete = set(self._incomplete)
+        fingerprints: Dict[str, str] = {
+            stage.name: self.fingerprint(stage, table) for stage in stages if stage.name not in incomplete
+        }
+        with self._lock:
+            stored = self._data["tables"].setdefault(self.table_key, {})
+            stored.update(fingerprints)
+            for name in incomplete:
+                stored.pop(name, None)
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_name(self.path.name + ".tmp")
+            tmp.write_text(json.dumps(self._data, ensure_ascii=False, indent=1), encoding="utf-8")
+            os.replace(tmp, self.path)
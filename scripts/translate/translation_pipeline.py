@@ -2,18 +2,45 @@
 # -*- coding: utf-8 -*-
 """Unified pipeline for plant name enrichment.
 
-This helper runs the existing translation/enrichment scripts sequentially so that
+This helper runs the existing translation/enrichment scripts so that
 `PlantData.csv` (or a compatible dataset) receives the same updates as when each
-script is invoked manually. It also understands `.ods` spreadsheets: they are
-converted to a temporary CSV for processing and then updated in-place once all
-stages succeed (a `.ods.bak` backup is created automatically).
+script is invoked manually. The stages run in this process through the stage
+API of `stage_api.py`: the table is parsed once, every stage returns the cells
+it wants to change, and the file is backed up and written once after all
+stages succeed. `.ods` spreadsheets are handled the same way (with a `.ods.bak`
+backup); CSV files get one timestamped `<name>_backup_<time>.csv` copy.
 
 Stages (in order):
+0. `dwca_index.py` – with `--vernacular-index`, fill ru/en/nl from an offline
+   index of an iNaturalist/GBIF Darwin Core Archive before anything else.
 1. `map_plants_ru.py`  – fill Russian names via iNaturalist.
 2. `plantarium_fill_ru.py` – try Plantarium for the remaining Russian names.
-3. `wikidata_fill_en.py` – fill English names via Wikidata.
+3. `wikidata_fill_en.py` – fill English names via Wikidata (with
+   `--wikidata-langs en,ru,nl` the same queries also fill empty ru/nl cells,
+   after the dedicated sources for those columns).
 4. `nl_names.py` – fill Dutch names and families from a CSV export.
 5. `nl_names_nakt.py` – fill Dutch names from the Naktuinbouw Excel list.
+6. `map_plants_ru.py` again – English and Dutch names that iNaturalist
+   returned along with the Russian ones, for cells still empty after
+   Wikidata and the Dutch lists.
+
+Stages that fill different columns form independent branches (ru:
+iNaturalist -> Plantarium, en: Wikidata -> iNaturalist, nl: CSV ->
+Naktuinbouw -> iNaturalist) which run concurrently, each on its own copy of
+the table; their updates touch disjoint columns and are merged in branch
+order. `--sequential` restores one-by-one
+execution.
+
+Progress is checkpointed under `scripts/.cache/pipeline/` (see
+`pipeline_checkpoint.py`): finished stages and every cell filled so far. If a
+run dies, `--resume` replays the finished stages and continues the interrupted
+one with the rows it had not filled yet, as long as the input file is
+unchanged.
+
+A stage whose inputs (the `sci` column, its own target columns, its reference
+files and options) are the same as after the last successful run is skipped
+entirely (see `stage_cache.py`); `--force` runs everything. A stage whose
+lookups failed with temporary errors is never recorded as up to date.
 
 Each stage can be skipped with command-line flags if the corresponding data or
 network resources are unavailable. Options allow forwarding the most common
@@ -23,23 +50,29 @@ from __future__ import annotations
 
 import argparse
 import csv
+import os
 import shutil
-import subprocess
 import sys
-import tempfile
-import zipfile
+import time
+import threading
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from functools import partial
 from pathlib import Path
-from typing import Iterable, List, Sequence
-from xml.etree import ElementTree as ET
+from typing import List, Sequence, Tuple
+
+from pipeline_checkpoint import PipelineCheckpoint, default_checkpoint_dir, file_fingerprint
+from stage_cache import BuildCache
+from stage_api import CellUpdates, PlantTable, Records, Stage, UpdateCallback, stage_branches
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from common.ods import OdsError, read_sheet_rows, write_sheet_rows
 
 ROOT = Path(__file__).resolve().parent
 PROJECT_ROOT = ROOT.parent.parent
 DEFAULT_PLANTS_PATH = PROJECT_ROOT / "PlantData.csv"
-ODS_NS = {
-    "office": "urn:oasis:names:tc:opendocument:xmlns:office:1.0",
-    "table": "urn:oasis:names:tc:opendocument:xmlns:table:1.0",
-    "text": "urn:oasis:names:tc:opendocument:xmlns:text:1.0",
-}
+DEFAULT_CHECKPOINT_ROOT = ROOT.parent / ".cache" / "pipeline"
+DEFAULT_BUILD_CACHE = DEFAULT_CHECKPOINT_ROOT / "build_cache.json"
 
 
 class StageError(RuntimeError):
@@ -51,140 +84,364 @@ def ensure_exists(path: Path, description: str) -> None:
         raise FileNotFoundError(f"{description} not found: {path}")
 
 
-def build_python_cmd(script: Path, *extra: str) -> List[str]:
-    return [sys.executable, str(script), *extra]
+def load_ods_rows(ods_path: Path) -> List[List[str]]:
+    """Extract rows from the first sheet of an ODS workbook.
 
+    Trailing empty rows and columns (LibreOffice pads sheets with huge
+    repeats) are dropped; see ``common/ods.py``.
+    """
 
-def load_ods_rows(ods_path: Path) -> List[List[str]]:
-    """Extract rows from the first sheet of an ODS workbook."""
+    try:
+        rows = read_sheet_rows(ods_path)
+    except OdsError as exc:
+        raise StageError(str(exc)) from exc
+    return [row or [""] for row in rows]
 
-    with zipfile.ZipFile(ods_path, "r") as zf:
-        try:
-            content = zf.read("content.xml")
-        except KeyError as exc:  # pragma: no cover - defensive branch
-            raise StageError(f"{ods_path} is missing content.xml") from exc
-
-    root = ET.fromstring(content)
-    table = root.find(".//table:table", ODS_NS)
-    if table is None:  # pragma: no cover - unexpected structure
-        raise StageError(f"{ods_path} does not contain a spreadsheet table")
-
-    rows: List[List[str]] = []
-    def iter_table_rows() -> Iterable[ET.Element]:
-        for header in table.findall("table:table-header-rows", ODS_NS):
-            for row in header.findall("table:table-row", ODS_NS):
-                yield row
-        for row in table.findall("table:table-row", ODS_NS):
-            yield row
-
-    for row in iter_table_rows():
-        repeat = int(row.attrib.get(f"{{{ODS_NS['table']}}}number-rows-repeated", "1"))
-        values: List[str] = []
-
-        for cell in row:
-            if cell.tag == f"{{{ODS_NS['table']}}}table-cell":
-                text_parts = [
-                    "".join(p.itertext())
-                    for p in cell.findall("text:p", ODS_NS)
-                ]
-                value = "\n".join(part for part in text_parts if part)
-                repeat_cols = int(
-                    cell.attrib.get(
-                        f"{{{ODS_NS['table']}}}number-columns-repeated", "1"
-                    )
-                )
-                values.extend([value] * repeat_cols)
-            elif cell.tag == f"{{{ODS_NS['table']}}}covered-table-cell":
-                repeat_cols = int(
-                    cell.attrib.get(
-                        f"{{{ODS_NS['table']}}}number-columns-repeated", "1"
-                    )
-                )
-                values.extend([""] * repeat_cols)
 
-        if not values:
-            values = [""]
+@dataclass
+class TableFile:
+    """Where the plants table came from and how to write it back."""
+
+    path: Path
+    is_ods: bool
+    delimiter: str = ","
+    bom: bool = False
 
-        for _ in range(repeat):
-            rows.append(values.copy())
 
-    return rows
+def sniff_delimiter(sample: str, fallback: str = ",") -> str:
+    try:
+        return csv.Sniffer().sniff(sample, delimiters=[",", ";", "\t", "|"]).delimiter
+    except csv.Error:
+        return fallback
 
 
-def write_csv(path: Path, rows: Sequence[Sequence[str]]) -> None:
-    with path.open("w", encoding="utf-8", newline="") as fh:
-        writer = csv.writer(fh)
+def read_csv(path: Path) -> Tuple[List[List[str]], str, bool]:
+    with path.open("r", encoding="utf-8", newline="") as fh:
+        text = fh.read()
+    bom = text.startswith("\ufeff")
+    if bom:
+        text = text[1:]
+    delimiter = sniff_delimiter(text[:65536])
+    rows = [list(row) for row in csv.reader(text.splitlines(keepends=True), delimiter=delimiter)]
+    return rows, delimiter, bom
+
+
+def write_csv(path: Path, rows: Sequence[Sequence[str]], delimiter: str = ",", bom: bool = False) -> None:
+    with path.open("w", encoding="utf-8-sig" if bom else "utf-8", newline="") as fh:
+        writer = csv.writer(fh, delimiter=delimiter)
         for row in rows:
             writer.writerow(list(row))
 
 
-def read_csv(path: Path) -> List[List[str]]:
-    with path.open("r", encoding="utf-8", newline="") as fh:
-        reader = csv.reader(fh)
-        return [list(row) for row in reader]
+def load_table(path: Path) -> Tuple[PlantTable, TableFile]:
+    """Parse the plants table once, from CSV or the first sheet of an ODS."""
+    if path.suffix.lower() == ".ods":
+        return PlantTable.from_rows(load_ods_rows(path)), TableFile(path, True)
+    rows, delimiter, bom = read_csv(path)
+    return PlantTable.from_rows(rows), TableFile(path, False, delimiter, bom)
+
+
+def backup_path_for(target: TableFile) -> Path:
+    if target.is_ods:
+        return target.path.with_suffix(target.path.suffix + ".bak")
+    ts = time.strftime("%Y%m%d_%H%M%S")
+    return target.path.with_name(f"{target.path.stem}_backup_{ts}{target.path.suffix}")
+
+
+def save_table(table: PlantTable, target: TableFile) -> None:
+    if target.is_ods:
+        replace_ods_content(target.path, table.to_rows())
+    else:
+        write_csv(target.path, table.to_rows(), target.delimiter, target.bom)
 
 
 def replace_ods_content(ods_path: Path, rows: Sequence[Sequence[str]]) -> None:
     """Update the first sheet of an ODS file with the provided rows."""
 
-    with zipfile.ZipFile(ods_path, "r") as zin:
-        infos = zin.infolist()
-        payload = {info.filename: zin.read(info.filename) for info in infos}
-
-    content_xml = payload.get("content.xml")
-    if content_xml is None:  # pragma: no cover - defensive branch
-        raise StageError(f"{ods_path} is missing content.xml")
-
-    root = ET.fromstring(content_xml)
-    table = root.find(".//table:table", ODS_NS)
-    if table is None:  # pragma: no cover - defensive branch
-        raise StageError(f"{ods_path} does not contain a spreadsheet table")
-
-    # Remove existing table rows
-    for header in list(table.findall("table:table-header-rows", ODS_NS)):
-        table.remove(header)
-    for row_el in list(table.findall("table:table-row", ODS_NS)):
-        table.remove(row_el)
-
-    max_cols = max((len(r) for r in rows), default=0)
-
-    for row in rows:
-        row_el = ET.Element(f"{{{ODS_NS['table']}}}table-row")
-        padded = list(row) + [""] * (max_cols - len(row))
-        for value in padded:
-            cell_el = ET.Element(
-                f"{{{ODS_NS['table']}}}table-cell",
-                {f"{{{ODS_NS['office']}}}value-type": "string"},
+    try:
+        write_sheet_rows(ods_path, rows)
+    except OdsError as exc:
+        raise StageError(str(exc)) from exc
+
+
+def run_stage(
+    stage: Stage,
+    table: PlantTable,
+    checkpoint: PipelineCheckpoint | None = None,
+    cache: BuildCache | None = None,
+) -> int:
+    """Run one stage against the in-memory table and apply its updates."""
+    print(f"\n=== {stage.title} ===")
+    if cache is not None and cache.is_fresh(stage, table):
+        print(f"{stage.title}: inputs unchanged since the last run, skipped.")
+        return 0
+    resumed: CellUpdates = {}
+    on_update: UpdateCallback | None = None
+    if checkpoint is not None:
+        done = checkpoint.completed(stage.name)
+        if done is not None:
+            changed = table.apply(done)
+            print(f"{stage.title}: {changed} cells restored from checkpoint.")
+            return changed
+        resumed = checkpoint.partial(stage.name)
+        if resumed:
+            print(f"{stage.title}: resuming, {len(resumed)} rows already filled.")
+        on_update = partial(checkpoint.record, stage.name)
+    changed = table.apply(resumed)
+    try:
+        updates = stage.run(table.records(), on_update=on_update)
+    except SystemExit as exc:  # the scripts' loaders still exit on bad input
+        raise StageError(f"Stage '{stage.title}' failed with exit code {exc.code}") from None
+    changed += table.apply(updates)
+    pending = getattr(updates, "pending", 0)
+    if pending and cache is not None:
+        cache.mark_incomplete(stage)
+    if checkpoint is not None:
+        if pending:
+            # stays partial, so --resume retries the rows that failed
+            for row, cells in updates.items():
+                checkpoint.record(stage.name, row, cells)
+        else:
+            for row, cells in updates.items():
+                resumed.setdefault(row, {}).update(cells)
+            checkpoint.complete(stage.name, resumed)
+    print(f"{stage.title}: {changed} cells updated.")
+    if pending:
+        print(f"{stage.title}: {pending} rows failed with temporary errors; the stage will run again next time.")
+    return changed
+
+
+def run_branch(
+    branch: List[Stage],
+    table: PlantTable,
+    checkpoint: PipelineCheckpoint | None = None,
+    cache: BuildCache | None = None,
+    cancel: threading.Event | None = None,
+) -> CellUpdates:
+    """Run a chain of dependent stages on a private copy of ``table``.
+
+    Once ``cancel`` is set no further stage is started.
+    """
+    scratch = table.copy()
+    for stage in branch:
+        if cancel is not None and cancel.is_set():
+            raise StageError(f"Stage '{stage.title}' not started: the run was aborted")
+        run_stage(stage, scratch, checkpoint, cache)
+    return scratch.diff(table)
+
+
+def run_stages(
+    stages: List[Stage],
+    table: PlantTable,
+    sequential: bool = False,
+    checkpoint: PipelineCheckpoint | None = None,
+    cache: BuildCache | None = None,
+) -> int:
+    """Run ``stages`` against ``table``; return the number of cells changed.
+
+    Branches (see ``stage_branches``) run in parallel threads and their
+    updates are applied afterwards in branch order, so the result does not
+    depend on which branch finished first. Any failing stage, or Ctrl-C,
+    aborts the run before anything is applied: the error is raised as soon as
+    it happens and the other branches start no further stage (a stage already
+    running finishes in the background; its rows are in the checkpoint).
+    ``sequential`` runs the branches one after another in the same order, so
+    both modes see the same dependencies.
+    """
+    branches = stage_branches(stages)
+    if sequential or len(stages) < 2:
+        return sum(run_stage(stage, table, checkpoint, cache) for branch in branches for stage in branch)
+
+    print("Running branches in parallel: "
+          + "; ".join(" -> ".join(stage.name for stage in branch) for branch in branches))
+    cancel = threading.Event()
+    pool = ThreadPoolExecutor(max_workers=len(branches), thread_name_prefix="stage-branch")
+    try:
+        futures = [pool.submit(run_branch, branch, table, checkpoint, cache, cancel) for branch in branches]
+        done, _ = wait(futures, return_when=FIRST_EXCEPTION)
+        for future in futures:
+            if future in done and future.exception() is not None:
+                raise future.exception()
+        results = [future.result() for future in futures]
+    finally:
+        cancel.set()
+        pool.shutdown(wait=False, cancel_futures=True)
+    return sum(table.apply(updates) for updates in results)
+
+
+def require_column(table: PlantTable, name: str, stage: str) -> str:
+    column = table.find_column(name)
+    if column is None:
+        raise StageError(f"Stage '{stage}' needs a '{name}' column; header is {table.fieldnames}")
+    return column
+
+
+def run_dutch_csv(records: Records, dutch_csv: Path, sci_col: str, nl_col: str, family_col: str,
+                  on_update: UpdateCallback | None = None) -> CellUpdates:
+    import nl_names
+
+    keys = (nl_names.norm_sci(record.get(sci_col, "")) for record in records)
+    names_map, family_map = nl_names.lookup_dutch_names(dutch_csv, keys)
+    return nl_names.collect_updates(records, names_map, family_map, sci_col, nl_col, family_col)
+
+
+def run_dutch_nakt(records: Records, nakt_xlsx: Path, sci_col: str, nl_col: str,
+                   on_update: UpdateCallback | None = None) -> CellUpdates:
+    import nl_names_nakt
+
+    keys = (nl_names_nakt.norm_sci(record.get(sci_col, "")) for record in records)
+    names_map = nl_names_nakt.lookup_nakt_names(nakt_xlsx, keys)
+    return nl_names_nakt.collect_updates(records, names_map, sci_col, nl_col)
+
+
+def build_stages(args: argparse.Namespace, table: PlantTable) -> List[Stage]:
+    """Bind the enabled stages to the table's column names and CLI options.
+
+    ``options`` only lists settings that change a stage's result; pacing
+    (delays, sleeps) does not invalidate the build cache.
+    """
+    # Imported here so that --no-http-cache is in effect before any
+    # module-level CachedSession is created.
+    import map_plants_ru
+    import plantarium_fill_ru
+    import wikidata_fill_en
+
+    stages: List[Stage] = []
+
+    if args.vernacular_index is not None:
+        # Listed first: within a column's branch, stages without an ordering
+        # constraint run in list order, so the network stages only see what
+        # the offline index left empty.
+        ensure_exists(args.vernacular_index, "Vernacular index")
+        import dwca_index
+
+        for lang in ("ru", "en", "nl"):
+            title = f"Vernacular index ({lang} names)"
+            sci, col = require_column(table, "sci", title), table.ensure_column(lang)
+            stages.append(Stage(
+                f"index_{lang}", title, (col,),
+                partial(dwca_index.collect_updates, index_path=args.vernacular_index, lang=lang,
+                        sci_col=sci, col=col),
+                reads=(sci,),
+                inputs=(args.vernacular_index,),
+            ))
+
+    if not args.skip_inat:
+        title = "iNaturalist (Russian names)"
+        sci, ru = require_column(table, "sci", title), table.ensure_column("ru")
+        delay = max(args.inat_delay, 0.0)
+        stages.append(Stage(
+            "inat", title, (ru,),
+            partial(map_plants_ru.collect_updates, sci_col=sci, ru_col=ru, delay=delay),
+            reads=(sci,),
+        ))
+
+    if not args.skip_plantarium:
+        title = "Plantarium (Russian names)"
+        sci, ru = require_column(table, "sci", title), table.ensure_column("ru")
+        passes, sleep = max(1, args.plantarium_passes), max(args.plantarium_sleep, 0.0)
+        stages.append(Stage(
+            "plantarium", title, (ru,),
+            partial(plantarium_fill_ru.collect_updates, sci_col=sci, ru_col=ru, passes=passes, sleep=sleep),
+            after=("inat",),
+            reads=(sci,),
+            options={"passes": passes},
+        ))
+
+    if not args.skip_wikidata:
+        title = "Wikidata (English names)"
+        sci, en = require_column(table, "sci", title), table.ensure_column("en")
+        batch, passes = max(1, args.wikidata_batch), max(1, args.wikidata_passes)
+        sleep = max(args.wikidata_sleep, 0.0)
+        concurrency = max(1, args.wikidata_concurrency)
+        try:
+            langs = wikidata_fill_en.parse_langs(args.wikidata_langs)
+        except ValueError as exc:
+            raise StageError(f"--wikidata-langs: {exc}") from None
+        dump_index = args.wikidata_dump_index
+        if dump_index is not None:
+            ensure_exists(dump_index, "Wikidata dump index")
+        dump_inputs = (dump_index,) if dump_index is not None else ()
+        stages.append(Stage(
+            "wikidata", title, (en,),
+            partial(
+                wikidata_fill_en.collect_updates,
+                sci_col=sci, en_col=en, batch_size=batch, passes=passes, sleep=sleep,
+                langs=langs, concurrency=concurrency, dump_index=dump_index,
+            ),
+            reads=(sci,),
+            inputs=dump_inputs,
+            options={"passes": passes},
+        ))
+        # Other languages come from the same queries and only fill what the
+        # dedicated sources for that column left empty.
+        wikidata_after = {"ru": ("inat", "plantarium"), "nl": ("dutch_csv", "dutch_nakt")}
+        for lang in langs:
+            if lang == "en":
+                continue
+            title = f"Wikidata ({lang} names)"
+            col = table.ensure_column(lang)
+            stages.append(Stage(
+                f"wikidata_{lang}", title, (col,),
+                partial(
+                    wikidata_fill_en.collect_lang_updates,
+                    lang=lang, sci_col=sci, col=col, langs=langs, batch_size=batch, passes=passes,
+                    sleep=sleep, concurrency=concurrency, dump_index=dump_index,
+                ),
+                after=wikidata_after[lang],
+                reads=(sci,),
+                inputs=dump_inputs,
+                options={"passes": passes, "langs": list(langs)},
+            ))
+
+    if not args.skip_dutch_csv:
+        title = "Dutch CSV names"
+        ensure_exists(args.dutch_csv, "dutch_names.csv")
+        if args.dutch_csv.suffix.lower() == ".ods":
+            raise StageError(
+                f"{args.dutch_csv} looks like an ODS spreadsheet. "
+                "Export it to CSV (e.g. dutch_names.csv) or pass --skip-dutch-csv."
             )
-            text_el = ET.SubElement(cell_el, f"{{{ODS_NS['text']}}}p")
-            if value:
-                text_el.text = value
-            row_el.append(cell_el)
-        table.append(row_el)
-
-    new_content = ET.tostring(root, encoding="utf-8", xml_declaration=True)
-
-    with zipfile.ZipFile(ods_path, "w") as zout:
-        for info in infos:
-            data = new_content if info.filename == "content.xml" else payload[info.filename]
-            new_info = zipfile.ZipInfo(info.filename)
-            new_info.date_time = info.date_time
-            new_info.compress_type = info.compress_type
-            new_info.create_system = info.create_system
-            new_info.flag_bits = info.flag_bits
-            new_info.external_attr = info.external_attr
-            new_info.internal_attr = info.internal_attr
-            new_info.comment = info.comment
-            new_info.extra = info.extra
-            zout.writestr(new_info, data)
-
-
-def run_stage(name: str, cmd: List[str]) -> None:
-    print(f"\n=== {name} ===")
-    print(" ".join(cmd))
-    proc = subprocess.run(cmd, check=False)
-    if proc.returncode != 0:
-        raise StageError(f"Stage '{name}' failed with exit code {proc.returncode}")
+        for name in ("id", "ru", "en"):
+            require_column(table, name, title)
+        sci = require_column(table, "sci", title)
+        nl = require_column(table, "nl", title)
+        family = require_column(table, "family", title)
+        stages.append(Stage(
+            "dutch_csv", title, (nl, family),
+            partial(run_dutch_csv, dutch_csv=args.dutch_csv, sci_col=sci, nl_col=nl, family_col=family),
+            reads=(sci,),
+            inputs=(args.dutch_csv,),
+        ))
+
+    if not args.skip_dutch_nakt:
+        title = "Naktuinbouw Excel names"
+        ensure_exists(args.nakt_xlsx, "Naktuinbouw Excel file")
+        sci, nl = require_column(table, "sci", title), require_column(table, "nl", title)
+        stages.append(Stage(
+            "dutch_nakt", title, (nl,),
+            partial(run_dutch_nakt, nakt_xlsx=args.nakt_xlsx, sci_col=sci, nl_col=nl),
+            after=("dutch_csv",),
+            reads=(sci,),
+            inputs=(args.nakt_xlsx,),
+        ))
+
+    if not args.skip_inat and not args.skip_inat_candidates:
+        # The iNaturalist stage keeps English and Dutch names from the same
+        # responses; these stages offer them for cells the other sources left
+        # empty, served from map_plants_ru's taxon cache.
+        delay = max(args.inat_delay, 0.0)
+        for locale, after in (("en", ("wikidata",)), ("nl", ("dutch_csv", "dutch_nakt"))):
+            title = f"iNaturalist candidates ({locale})"
+            sci, col = require_column(table, "sci", title), table.ensure_column(locale)
+            stages.append(Stage(
+                f"inat_{locale}", title, (col,),
+                partial(map_plants_ru.collect_locale_updates, locale=locale, sci_col=sci, name_col=col, delay=delay),
+                after=after,
+                reads=(sci,),
+            ))
+
+    return stages
 
 
 def parse_args() -> argparse.Namespace:
@@ -213,6 +470,12 @@ def parse_args() -> argparse.Namespace:
         default=ROOT / "Naktuinbouw_Standaardlijst.xlsx",
         help="Path to the Naktuinbouw Excel file",
     )
+    parser.add_argument(
+        "--vernacular-index",
+        type=Path,
+        default=None,
+        help="Offline vernacular index built by dwca_index.py; consulted for ru/en/nl before any network stage",
+    )
     parser.add_argument(
         "--skip-inat",
         action="store_true",
@@ -222,7 +485,12 @@ def parse_args() -> argparse.Namespace:
         "--inat-delay",
         type=float,
         default=0.3,
-        help="Delay between iNaturalist API requests (seconds)",
+        help="Initial delay between iNaturalist API requests (seconds); adapted at runtime",
+    )
+    parser.add_argument(
+        "--skip-inat-candidates",
+        action="store_true",
+        help="Do not fill empty English/Dutch names from the iNaturalist responses",
     )
     parser.add_argument(
         "--skip-plantarium",
@@ -239,7 +507,7 @@ def parse_args() -> argparse.Namespace:
         "--plantarium-sleep",
         type=float,
         default=0.25,
-        help="Sleep between Plantarium requests (seconds)",
+        help="Initial pause between Plantarium requests (seconds); adapted at runtime",
     )
     parser.add_argument(
         "--skip-wikidata",
@@ -250,7 +518,24 @@ def parse_args() -> argparse.Namespace:
         "--wikidata-batch",
         type=int,
         default=25,
-        help="Batch size for Wikidata SPARQL lookups",
+        help="Initial batch size for Wikidata SPARQL lookups; adapted to query latency",
+    )
+    parser.add_argument(
+        "--wikidata-langs",
+        default="en",
+        help="Languages fetched in each Wikidata query (e.g. en,ru,nl); ru/nl also fill empty ru/nl cells",
+    )
+    parser.add_argument(
+        "--wikidata-dump-index",
+        type=Path,
+        default=None,
+        help="Offline Wikidata taxon index (wikidata_dump_index.py); no SPARQL/API requests are made",
+    )
+    parser.add_argument(
+        "--wikidata-concurrency",
+        type=int,
+        default=2,
+        help="Wikidata SPARQL batches in flight at once",
     )
     parser.add_argument(
         "--wikidata-passes",
@@ -262,7 +547,7 @@ def parse_args() -> argparse.Namespace:
         "--wikidata-sleep",
         type=float,
         default=0.2,
-        help="Sleep between Wikidata batches (seconds)",
+        help="Initial pause between Wikidata batches (seconds); adapted at runtime",
     )
     parser.add_argument(
         "--skip-dutch-csv",
@@ -274,10 +559,37 @@ def parse_args() -> argparse.Namespace:
         action="store_true",
         help="Skip importing Dutch names from the Naktuinbouw Excel list",
     )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Continue an interrupted run from its checkpoint (same input file only)",
+    )
+    parser.add_argument(
+        "--checkpoint-dir",
+        type=Path,
+        default=None,
+        help="Checkpoint directory (default: scripts/.cache/pipeline/<table>-<hash>)",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Run every enabled stage even if its inputs are unchanged since the last run",
+    )
+    parser.add_argument(
+        "--sequential",
+        action="store_true",
+        help="Run the stages one after another instead of the ru/en/nl branches in parallel",
+    )
+    parser.add_argument(
+        "--no-http-cache",
+        action="store_true",
+        help="Bypass the shared on-disk HTTP response cache (scripts/.cache)",
+    )
     parser.add_argument(
         "--create-backups",
         action="store_true",
-        help="Forward the --backup flag to Plantarium and Wikidata stages",
+        # Kept for old command lines: the pipeline always backs up once now
+        help=argparse.SUPPRESS,
     )
     return parser.parse_args()
 
@@ -287,119 +599,52 @@ def main() -> None:
 
     ensure_exists(args.plants_csv, "plants file")
 
-    plants_csv = args.plants_csv
-    temp_dir: tempfile.TemporaryDirectory[str] | None = None
-    backup_path: Path | None = None
-
-    if plants_csv.suffix.lower() == ".ods":
-        print(
-            f"Detected ODS spreadsheet: {plants_csv}. Converting to a temporary CSV for processing..."
-        )
-        temp_dir = tempfile.TemporaryDirectory()
-        temp_csv = Path(temp_dir.name) / "plants.csv"
-        rows = load_ods_rows(plants_csv)
-        write_csv(temp_csv, rows)
-        plants_csv = temp_csv
-        backup_path = args.plants_csv.with_suffix(args.plants_csv.suffix + ".bak")
-        if backup_path.exists():
-            raise StageError(
-                f"Backup file already exists: {backup_path}. "
-                "Please remove or rename it before running the pipeline."
-            )
+    if args.no_http_cache:
+        # Read by every CachedSession, see scripts/common/http_cache.py
+        os.environ["ENRICH_HTTP_CACHE"] = "0"
 
-    try:
-        if not args.skip_inat:
-            script = ROOT / "map_plants_ru.py"
-            ensure_exists(script, "map_plants_ru.py")
-            run_stage(
-                "iNaturalist (Russian names)",
-                build_python_cmd(
-                    script,
-                    str(plants_csv),
-                    "--delay",
-                    str(max(args.inat_delay, 0.0)),
-                ),
-            )
+    checkpoint_dir = args.checkpoint_dir or default_checkpoint_dir(args.plants_csv, DEFAULT_CHECKPOINT_ROOT)
+    checkpoint = PipelineCheckpoint.open(checkpoint_dir, file_fingerprint(args.plants_csv), args.resume)
 
-        if not args.skip_plantarium:
-            script = ROOT / "plantarium_fill_ru.py"
-            ensure_exists(script, "plantarium_fill_ru.py")
-            cmd = build_python_cmd(
-                script,
-                str(plants_csv),
-                "--passes",
-                str(max(1, args.plantarium_passes)),
-                "--sleep",
-                str(max(args.plantarium_sleep, 0.0)),
-            )
-            if args.create_backups:
-                cmd.append("--backup")
-            run_stage("Plantarium (Russian names)", cmd)
-
-        if not args.skip_wikidata:
-            script = ROOT / "wikidata_fill_en.py"
-            ensure_exists(script, "wikidata_fill_en.py")
-            cmd = build_python_cmd(
-                script,
-                str(plants_csv),
-                "--batch",
-                str(max(1, args.wikidata_batch)),
-                "--passes",
-                str(max(1, args.wikidata_passes)),
-                "--sleep",
-                str(max(args.wikidata_sleep, 0.0)),
-            )
-            if args.create_backups:
-                cmd.append("--backup")
-            run_stage("Wikidata (English names)", cmd)
-
-        if not args.skip_dutch_csv:
-            ensure_exists(args.dutch_csv, "dutch_names.csv")
-            if args.dutch_csv.suffix.lower() == ".ods":
+    try:
+        table, target = load_table(args.plants_csv)
+        if target.is_ods:
+            print(f"Detected ODS spreadsheet: {args.plants_csv}.")
+            if backup_path_for(target).exists():
                 raise StageError(
-                    f"{args.dutch_csv} looks like an ODS spreadsheet. "
-                    "Export it to CSV (e.g. dutch_names.csv) or pass --skip-dutch-csv."
+                    f"Backup file already exists: {backup_path_for(target)}. "
+                    "Please remove or rename it before running the pipeline."
                 )
-            script = ROOT / "nl_names.py"
-            ensure_exists(script, "nl_names.py")
-            run_stage(
-                "Dutch CSV names",
-                build_python_cmd(
-                    script,
-                    str(plants_csv),
-                    str(args.dutch_csv),
-                ),
-            )
-
-        if not args.skip_dutch_nakt:
-            script = ROOT / "nl_names_nakt.py"
-            ensure_exists(script, "nl_names_nakt.py")
-            ensure_exists(args.nakt_xlsx, "Naktuinbouw Excel file")
-            run_stage(
-                "Naktuinbouw Excel names",
-                build_python_cmd(
-                    script,
-                    str(plants_csv),
-                    str(args.nakt_xlsx),
-                ),
-            )
+        original_header = list(table.fieldnames)
+        stages = build_stages(args, table)
+        cache = BuildCache(DEFAULT_BUILD_CACHE, str(args.plants_csv.resolve()), force=args.force)
+        changed = run_stages(stages, table, args.sequential, checkpoint, cache)
 
     except (StageError, FileNotFoundError) as exc:
+        checkpoint.close()
         print(f"\nPipeline aborted: {exc}", file=sys.stderr)
+        print(f"Finished work is kept in {checkpoint_dir}; rerun with --resume.", file=sys.stderr)
         sys.exit(1)
-
+    except KeyboardInterrupt:
+        checkpoint.close()
+        print(f"\nInterrupted. Finished work is kept in {checkpoint_dir}; rerun with --resume.",
+              file=sys.stderr)
+        sys.exit(130)
+
+    if changed or table.fieldnames != original_header:
+        backup_path = backup_path_for(target)
+        shutil.copy2(args.plants_csv, backup_path)
+        try:
+            save_table(table, target)
+        except StageError as exc:
+            checkpoint.close()
+            print(f"\nPipeline aborted: {exc}", file=sys.stderr)
+            sys.exit(1)
+        print(f"\nUpdated {args.plants_csv}: {changed} cells (backup saved to {backup_path}).")
     else:
-        if args.plants_csv.suffix.lower() == ".ods":
-            assert backup_path is not None
-            shutil.copy2(args.plants_csv, backup_path)
-            updated_rows = read_csv(plants_csv)
-            replace_ods_content(args.plants_csv, updated_rows)
-            print(
-                f"\nUpdated {args.plants_csv} using pipeline results (backup saved to {backup_path})."
-            )
-    finally:
-        if temp_dir is not None:
-            temp_dir.cleanup()
+        print(f"\nNo changes; {args.plants_csv} left untouched.")
+    cache.update(stages, table)
+    checkpoint.clear()
 
     print("\nPipeline completed successfully.")
 
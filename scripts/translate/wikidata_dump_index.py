@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Offline taxon name index built from a Wikidata JSON dump.
+
+``latest-all.json.bz2`` (or ``.gz``) holds one entity per line inside a JSON
+array. The builder streams it line by line, so memory use does not depend on
+the dump size:
+
+* decompression runs in ``lbzip2``/``pbzip2``/``pigz`` when one is installed
+  (all cores), otherwise in this process through ``bz2``/``gzip``;
+* the reader drops every line without ``"P225"`` (taxon name) with a plain
+  byte search, so only candidate lines are pickled to the workers;
+* candidates are handed out in chunks to a pool of worker processes which
+  parse them and keep only the taxon name, QID, labels and P1843
+  vernaculars in ``LANGS``;
+* at most a few chunks per worker are in flight at any time.
+
+The result is a small SQLite file (default ``scripts/.cache/wikidata_taxa.sqlite``)
+that ``wikidata_fill_en.py --dump-index`` queries instead of the network.
+
+Usage:
+  python wikidata_dump_index.py latest-all.json.bz2 [--index PATH] [--workers N]
+"""
+from __future__ import annotations
+
+import argparse
+import bz2
+import gzip
+import json
+import multiprocessing
+import os
+import shutil
+import sqlite3
+import subprocess
+import sys
+import time
+from collections import deque
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Deque, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+DEFAULT_DUMP_INDEX = Path(__file__).resolve().parents[1] / ".cache" / "wikidata_taxa.sqlite"
+LANGS = ("en", "ru", "nl")
+CHUNK_LINES = 2000
+IN_FLIGHT_PER_WORKER = 4
+_QUERY_CHUNK = 500
+
+# (name, qid, kind, lang, value); kind is "vern" (P1843) or "label"
+Row = Tuple[str, str, str, str, str]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS names (
+    name TEXT NOT NULL,
+    qid TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    lang TEXT NOT NULL,
+    value TEXT NOT NULL,
+    PRIMARY KEY (name, qid, kind, lang, value)
+) WITHOUT ROWID;
+"""
+
+_PARALLEL_DECOMPRESSORS = {
+    ".bz2": ("lbzip2", "pbzip2"),
+    ".gz": ("pigz",),
+}
+
+
+@contextmanager
+def open_dump(path: Path) -> Iterator[Iterable[bytes]]:
+    """Yield the dump's decompressed lines, using a parallel decompressor if available."""
+    suffix = path.suffix.lower()
+    for tool in _PARALLEL_DECOMPRESSORS.get(suffix, ()):
+        exe = shutil.which(tool)
+        if exe:
+            proc = subprocess.Popen([exe, "-dc", str(path)], stdout=subprocess.PIPE, bufsize=1 << 20)
+            try:
+                yield proc.stdout
+            finally:
+                proc.stdout.close()
+                proc.kill()
+                proc.wait()
+            return
+    if suffix == ".bz2":
+        fh = bz2.open(path, "rb")
+    elif suffix == ".gz":
+        fh = gzip.open(path, "rb")
+    else:
+        fh = path.open("rb")
+    with fh:
+        yield fh
+
+
+def _claim_values(entity: dict, prop: str) -> List:
+    values = []
+    for claim in (entity.get("claims") or {}).get(prop, []):
+        value = ((claim.get("mainsnak") or {}).get("datavalue") or {}).get("value")
+        if value is not None and claim.get("rank") != "deprecated":
+            values.append(value)
+    return values
+
+
+def extract_rows(lines: Sequence[bytes], langs: Sequence[str] = LANGS) -> List[Row]:
+    """Index rows of the taxon entities among ``lines`` (runs in the workers)."""
+    wanted = set(langs)
+    rows: List[Row] = []
+    for raw in lines:
+        line = raw.strip().rstrip(b",")
+        if not line.startswith(b"{"):
+            continue
+        try:
+            entity = json.loads(line)
+        except ValueError:
+            continue
+        qid = entity.get("id", "")
+        names = {v for v in _claim_values(entity, "P225") if isinstance(v, str) and v.strip()}
+        if not qid or not names:
+            continue
+        values: Set[Tuple[str, str, str]] = set()
+        for lang, label in (entity.get("labels") or {}).items():
+            if lang in wanted and label.get("value"):
+                values.add(("label", lang, label["value"]))
+        for value in _claim_values(entity, "P1843"):
+            if isinstance(value, dict) and value.get("language") in wanted and value.get("text"):
+                values.add(("vern", value["language"], value["text"]))
+        for name in names:
+            rows.extend((name, qid, kind, lang, text) for kind, lang, text in values)
+    return rows
+
+
+class _TaxonLines:
+    """Iterate over the lines that can hold a taxon, counting every line read."""
+
+    def __init__(self, lines: Iterable[bytes]) -> None:
+        self.lines = lines
+        self.seen = 0
+
+    def __iter__(self) -> Iterator[bytes]:
+        for line in self.lines:
+            self.seen += 1
+            if b'"P225"' in line:
+                yield line
+
+
+def _chunks(lines: Iterable[bytes], size: int) -> Iterator[List[bytes]]:
+    batch: List[bytes] = []
+    for line in lines:
+        batch.append(line)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def build_index(dump: Path, index: Path = DEFAULT_DUMP_INDEX, workers: Optional[int] = None,
+                langs: Sequence[str] = LANGS) -> int:
+    """Stream ``dump`` into a fresh index at ``index``; return the number of rows.
+
+    The index is written next to the target and moved into place at the end,
+    so readers never see a half-built file.
+    """
+    workers = max(1, workers or os.cpu_count() or 1)
+    index.parent.mkdir(parents=True, exist_ok=True)
+    tmp = index.with_name(index.name + ".building")
+    tmp.unlink(missing_ok=True)
+    conn = sqlite3.connect(str(tmp))
+    conn.execute("PRAGMA journal_mode=OFF")
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.executescript(_SCHEMA)
+
+    started = time.monotonic()
+    total = 0
+    with open_dump(dump) as lines, multiprocessing.Pool(workers) as pool:
+        candidates = _TaxonLines(lines)
+        pending: Deque = deque()
+
+        def drain(limit: int) -> None:
+            nonlocal total
+            while len(pending) > limit:
+                rows = pending.popleft().get()
+                conn.executemany("INSERT OR IGNORE INTO names VALUES (?, ?, ?, ?, ?)", rows)
+                total += len(rows)
+
+        for n, batch in enumerate(_chunks(candidates, CHUNK_LINES), start=1):
+            pending.append(pool.apply_async(extract_rows, (batch, tuple(langs))))
+            drain(workers * IN_FLIGHT_PER_WORKER)
+            if n % 100 == 0:
+                print(f"{candidates.seen:,} lines read, {total:,} rows, {time.monotonic() - started:.0f}s",
+                      file=sys.stderr)
+        drain(0)
+        lines_seen = candidates.seen
+
+    stat = dump.stat()
+    conn.executemany("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", [
+        ("dump", str(dump.resolve())),
+        ("dump_size", str(stat.st_size)),
+        ("dump_mtime_ns", str(stat.st_mtime_ns)),
+        ("langs", ",".join(langs)),
+        ("built_at", str(time.time())),
+    ])
+    conn.commit()
+    conn.close()
+    os.replace(tmp, index)
+    print(f"Wrote {total:,} index rows from {lines_seen:,} dump lines in {time.monotonic() - started:.0f}s: {index}",
+          file=sys.stderr)
+    return total
+
+
+class DumpIndex:
+    """Read side of the index; answers in the ``wikidata_fill_en.collect`` format."""
+
+    def __init__(self, path: Path = DEFAULT_DUMP_INDEX) -> None:
+        self.path = Path(path)
+        if not self.path.exists():
+            raise FileNotFoundError(f"Wikidata dump index not found: {self.path} (build it with wikidata_dump_index.py)")
+        self._conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+
+    def lookup(self, names: Iterable[str], langs: Sequence[str] = LANGS) -> Dict[str, Dict[str, object]]:
+        wanted = sorted({n for n in names if n})
+        out: Dict[str, Dict[str, object]] = {}
+        for i in range(0, len(wanted), _QUERY_CHUNK):
+            chunk = wanted[i:i + _QUERY_CHUNK]
+            marks = ",".join("?" * len(chunk))
+            for name, qid, kind, lang, value in self._conn.execute(
+                f"SELECT name, qid, kind, lang, value FROM names WHERE name IN ({marks})", chunk
+            ):
+                info = out.setdefault(name, {"vern": {}, "label": {}, "qid": set()})
+                info["qid"].add(qid)
+                if lang in langs:
+                    info[kind].setdefault(lang, set()).add(value)
+        return out
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Build the offline taxon name index from a Wikidata JSON dump.")
+    ap.add_argument("dump", type=Path, help="latest-all.json.bz2 / .json.gz (or uncompressed .json)")
+    ap.add_argument("--index", type=Path, default=DEFAULT_DUMP_INDEX, help=f"Index file (default: {DEFAULT_DUMP_INDEX})")
+    ap.add_argument("--workers", type=int, default=None, help="Parser processes (default: all cores)")
+    args = ap.parse_args()
+    if not args.dump.exists():
+        raise SystemExit(f"Dump not found: {args.dump}")
+    build_index(args.dump, args.index, args.workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -10,37 +10,74 @@ Usage:
 
 Notes:
 - Fills only the target English column; other columns are preserved.
-- Queries only English vernacular names (P1843@en) and falls back to English label when absent.
+- Queries English vernacular names (P1843@en) and falls back to the English label when absent.
+- With --langs en,ru,nl one query fetches vernaculars and labels in all listed
+  languages, and the ru/nl columns are filled too (from the same results).
+- The VALUES block size starts at --batch and adapts to measured latency: it
+  grows while queries are fast and shrinks after slow ones or timeouts (a timed
+  out batch is split and retried). Up to --concurrency batches run at once.
+- Every scientific name -> QID match found by SPARQL is kept in
+  scripts/.cache/wikidata_qids.sqlite. Names with known QIDs skip the
+  expensive `wdt:P225 ?latin` match: their labels and P1843 claims come from
+  batched wbgetentities calls (50 IDs each); SPARQL is only used for new names
+  and for QIDs that no longer carry that P225.
+- --dump-index answers from an offline index of a Wikidata JSON dump (built by
+  wikidata_dump_index.py) with no network access at all.
 - Runs multiple passes over still-empty cells if --passes > 1.
 """
 
 import argparse
 import csv
+import sqlite3
 import sys
+import threading
 import time
-from typing import List, Dict, Set, Tuple
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from functools import partial
+from typing import Callable, Deque, Iterable, List, Dict, Optional, Sequence, Set, Tuple
 import os
 import shutil
+from pathlib import Path
 import requests
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 
+from stage_api import CellUpdates, Records, UpdateCallback, apply_updates, finish_updates
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from common.http_cache import CachedSession
+from common.rate_limit import get_limiter, host_of
+
 SPARQL_URL = "https://query.wikidata.org/sparql"
+API_URL = "https://www.wikidata.org/w/api.php"
+ENTITY_BATCH_SIZE = 50  # wbgetentities limit for anonymous clients
+QID_CACHE_PATH = Path(__file__).resolve().parents[1] / ".cache" / "wikidata_qids.sqlite"
 USER_AGENT = "WD-PlantEN-Filler/1.0 (+https://example.org)"
-DEFAULT_BATCH_SIZE = 25
-SLEEP = 0.2  # pause between batches to be polite
+DEFAULT_BATCH_SIZE = 25  # initial VALUES size; adapted at runtime
+MIN_BATCH_SIZE = 5
+MAX_BATCH_SIZE = 200
+TARGET_LATENCY = 8.0  # seconds; WDQS kills queries after 60 s
+QUERY_TIMEOUT = 65.0
+MAX_BATCH_FAILURES = 3  # a name is given up for this pass after that many failed batches
+DEFAULT_CONCURRENCY = 2
+SUPPORTED_LANGS = ("en", "ru", "nl")
+SLEEP = 0.2  # initial pause between batches; the rate limiter adapts it
 
 def eprint(*args, **kwargs):
     print(*args, file=sys.stderr, **kwargs)
 
 def make_session() -> requests.Session:
-    s = requests.Session()
+    s = CachedSession("wikidata", cache_post=True)  # SPARQL queries are POSTed
     s.headers.update({
         "User-Agent": USER_AGENT,
         "Accept": "application/sparql-results+json",
     })
+    # Read timeouts are not retried here: they mean the batch is too big for
+    # the endpoint right now, which BatchSizer handles by splitting it.
     retry = Retry(
         total=5,
+        read=0,
         backoff_factor=0.6,
         status_forcelist=(429, 500, 502, 503, 504),
         allowed_methods=frozenset(["GET", "POST"]),
@@ -49,72 +86,359 @@ def make_session() -> requests.Session:
     s.mount("https://", HTTPAdapter(max_retries=retry))
     return s
 
-def chunk(seq: List[str], n: int):
-    for i in range(0, len(seq), n):
-        yield seq[i:i+n]
-
-def build_query(names: List[str]) -> str:
+def build_query(names: List[str], langs: Sequence[str] = ("en",)) -> str:
     esc = []
     for n in names:
         s = n.replace("\\", "\\\\").replace('"', '\\"')
         esc.append(f'("{s}")')
     values = "\n  ".join(esc)
+    lang_list = ", ".join(f'"{lang}"' for lang in langs)
     return f"""
-SELECT ?latin ?qid ?vname ?enLabel WHERE {{
+SELECT ?latin ?qid ?vname ?label WHERE {{
   VALUES (?latin) {{
     {values}
   }}
   ?item wdt:P225 ?latin .
   BIND(STRAFTER(STR(?item), "entity/") AS ?qid)
-  OPTIONAL {{ ?item wdt:P1843 ?vname . FILTER(LANG(?vname) = "en") }}
-  OPTIONAL {{ ?item rdfs:label ?enLabel . FILTER(LANG(?enLabel) = "en") }}
+  OPTIONAL {{ ?item wdt:P1843 ?vname . FILTER(LANG(?vname) IN ({lang_list})) }}
+  OPTIONAL {{ ?item rdfs:label ?label . FILTER(LANG(?label) IN ({lang_list})) }}
 }}
 """.strip()
 
-def fetch_batch(sess: requests.Session, names: List[str]) -> List[Dict]:
-    q = build_query(names)
-    for attempt in range(1, 6):
+def fetch_batch(sess: requests.Session, names: List[str], langs: Sequence[str] = ("en",),
+                attempts: int = 5) -> Optional[List[Dict]]:
+    """SPARQL bindings for ``names``, or None if every attempt failed."""
+    q = build_query(names, langs)
+    for attempt in range(1, attempts + 1):
         try:
-            r = sess.post(SPARQL_URL, data={"query": q, "format": "json"}, timeout=60)
+            r = sess.post(SPARQL_URL, data={"query": q, "format": "json"}, timeout=QUERY_TIMEOUT)
         except requests.RequestException as ex:
+            # The session's rate limiter has already backed off for this host
             eprint(f"Request error (attempt {attempt}): {ex}")
-            time.sleep(min(1.0 * attempt, 5.0))
             continue
         if r.status_code == 200:
             try:
                 return r.json().get("results", {}).get("bindings", [])
             except Exception as ex:
                 eprint(f"JSON parse error: {ex}")
-                return []
+                return None
         eprint(f"HTTP {r.status_code} from WD (attempt {attempt}).")
-        time.sleep(min(1.0 * attempt, 5.0))
-    return []
+    return None
+
+def empty_info() -> Dict[str, object]:
+    return {"vern": {}, "label": {}, "qid": set()}
 
-def collect(rows: List[Dict]) -> Dict[str, Dict[str, Set[str]]]:
-    out: Dict[str, Dict[str, Set[str]]] = {}
+def collect(rows: List[Dict]) -> Dict[str, Dict[str, object]]:
+    """Bindings -> ``{latin: {"vern": {lang: names}, "label": {lang: names}, "qid": qids}}``."""
+    out: Dict[str, Dict[str, object]] = {}
     for b in rows:
         def v(key):
             x = b.get(key)
             return x.get("value") if x else None
+        def lang(key):
+            x = b.get(key)
+            return x.get("xml:lang", "") if x else ""
         latin = v("latin")
         if not latin:
             continue
-        entry = out.setdefault(latin, {"vern": set(), "label": set(), "qid": set()})
+        entry = out.setdefault(latin, empty_info())
         if v("vname"):
-            entry["vern"].add(v("vname"))
-        if v("enLabel"):
-            entry["label"].add(v("enLabel"))
+            entry["vern"].setdefault(lang("vname"), set()).add(v("vname"))
+        if v("label"):
+            entry["label"].setdefault(lang("label"), set()).add(v("label"))
         if v("qid"):
             entry["qid"].add(v("qid"))
     return out
 
-def pick_en(info: Dict[str, Set[str]]) -> str:
-    if info["vern"]:
-        return " | ".join(sorted(info["vern"], key=str.lower))
-    if info["label"]:
-        return " | ".join(sorted(info["label"], key=str.lower))
+def pick_name(info: Dict[str, object], lang: str) -> str:
+    """Vernaculars in ``lang`` joined with " | ", else the label."""
+    vern = info["vern"].get(lang) or set()
+    if vern:
+        return " | ".join(sorted(vern, key=str.lower))
+    labels = info["label"].get(lang) or set()
+    if labels:
+        return " | ".join(sorted(labels, key=str.lower))
     return ""
 
+def pick_en(info: Dict[str, object]) -> str:
+    return pick_name(info, "en")
+
+class BatchSizer:
+    """VALUES block size driven by measured latency (additive increase, multiplicative decrease).
+
+    A query well under ``target`` seconds grows the size by a quarter; a slower
+    one scales its batch size by ``target / latency``; a timeout or error
+    halves it.
+    """
+
+    def __init__(self, initial: int = DEFAULT_BATCH_SIZE, minimum: int = MIN_BATCH_SIZE,
+                 maximum: int = MAX_BATCH_SIZE, target: float = TARGET_LATENCY) -> None:
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.target = target
+        self.size = min(self.maximum, max(self.minimum, initial))
+        self._lock = threading.Lock()
+
+    def record(self, batch_len: int, latency: Optional[float]) -> None:
+        with self._lock:
+            # Shrink relative to the failed batch, so several batches that
+            # were in flight together only cut the size once.
+            if latency is None:
+                self.size = max(self.minimum, min(self.size, batch_len // 2))
+            elif latency > self.target:
+                self.size = max(self.minimum, min(self.size, int(batch_len * self.target / latency)))
+            elif latency < self.target / 2 and batch_len >= self.size:
+                self.size = min(self.maximum, self.size + max(1, self.size // 4))
+
+def _timed_fetch(sess: requests.Session, names: List[str], langs: Sequence[str]) -> Tuple[Optional[List[Dict]], float]:
+    started = time.monotonic()
+    bindings = fetch_batch(sess, names, langs, attempts=1)
+    return bindings, time.monotonic() - started
+
+def query_names(sess: requests.Session, names: List[str], langs: Sequence[str], sizer: BatchSizer,
+                concurrency: int = DEFAULT_CONCURRENCY) -> Dict[str, Dict[str, object]]:
+    """Look ``names`` up in adaptively sized batches, up to ``concurrency`` at once.
+
+    Names whose batches kept failing are missing from the result.
+    """
+    queue: Deque[str] = deque(names)
+    failures: Dict[str, int] = {}
+    results: Dict[str, Dict[str, object]] = {}
+    with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="wdqs") as pool:
+        in_flight = {}
+        while queue or in_flight:
+            while queue and len(in_flight) < max(1, concurrency):
+                group = [queue.popleft() for _ in range(min(sizer.size, len(queue)))]
+                eprint(f"Querying Wikidata for {len(group)} names...")
+                in_flight[pool.submit(_timed_fetch, sess, group, langs)] = group
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                group = in_flight.pop(future)
+                bindings, latency = future.result()
+                sizer.record(len(group), latency if bindings is not None else None)
+                if bindings is None:
+                    retry = []
+                    for latin in group:
+                        failures[latin] = failures.get(latin, 0) + 1
+                        if failures[latin] < MAX_BATCH_FAILURES:
+                            retry.append(latin)
+                    eprint(f"Batch of {len(group)} failed; retrying {len(retry)} names in batches of {sizer.size}.")
+                    queue.extendleft(reversed(retry))
+                    continue
+                data = collect(bindings)
+                for latin in group:
+                    results[latin] = data.get(latin) or empty_info()
+    return results
+
+class QidCache:
+    """Persistent ``scientific name -> QIDs`` map (a name can match several items)."""
+
+    def __init__(self, path: Path = QID_CACHE_PATH) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS qids (name TEXT NOT NULL, qid TEXT NOT NULL, resolved_at REAL NOT NULL, "
+            "PRIMARY KEY (name, qid)) WITHOUT ROWID"
+        )
+        self._conn.commit()
+
+    def get(self, names: Iterable[str]) -> Dict[str, Set[str]]:
+        out: Dict[str, Set[str]] = {}
+        with self._lock:
+            for name in names:
+                for (qid,) in self._conn.execute("SELECT qid FROM qids WHERE name = ?", (name,)):
+                    out.setdefault(name, set()).add(qid)
+        return out
+
+    def put(self, name: str, qids: Iterable[str]) -> None:
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM qids WHERE name = ?", (name,))
+            self._conn.executemany(
+                "INSERT INTO qids (name, qid, resolved_at) VALUES (?, ?, ?)", [(name, q, now) for q in set(qids)]
+            )
+
+    def forget(self, name: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM qids WHERE name = ?", (name,))
+
+_qid_cache: Optional[QidCache] = None
+_qid_cache_lock = threading.Lock()
+
+def get_qid_cache() -> QidCache:
+    global _qid_cache
+    with _qid_cache_lock:
+        if _qid_cache is None:
+            _qid_cache = QidCache()
+        return _qid_cache
+
+def fetch_entities(sess: requests.Session, qids: List[str], langs: Sequence[str],
+                   attempts: int = 3) -> Optional[Dict[str, Dict]]:
+    """``{requested QID: entity}`` for up to ENTITY_BATCH_SIZE ids, or None on failure.
+
+    Missing (deleted) items are left out; redirected ones are keyed by the
+    requested id.
+    """
+    params = {
+        "action": "wbgetentities",
+        "ids": "|".join(qids),
+        "props": "labels|claims",
+        "languages": "|".join(langs),
+        "format": "json",
+    }
+    for attempt in range(1, attempts + 1):
+        try:
+            r = sess.get(API_URL, params=params, headers={"Accept": "application/json"}, timeout=30)
+        except requests.RequestException as ex:
+            eprint(f"Request error (attempt {attempt}): {ex}")
+            continue
+        if r.status_code != 200:
+            eprint(f"HTTP {r.status_code} from the Wikidata API (attempt {attempt}).")
+            continue
+        try:
+            data = r.json()
+        except ValueError as ex:
+            eprint(f"JSON parse error: {ex}")
+            return None
+        if "error" in data:
+            eprint(f"Wikidata API error: {data['error'].get('info', data['error'])}")
+            return None
+        out: Dict[str, Dict] = {}
+        for key, entity in (data.get("entities") or {}).items():
+            if "missing" in entity:
+                continue
+            out[key] = entity
+            redirect = entity.get("redirects") or {}
+            if redirect.get("from"):
+                out[redirect["from"]] = entity
+        return out
+    return None
+
+def _claim_values(entity: Dict, prop: str) -> List:
+    values = []
+    for claim in (entity.get("claims") or {}).get(prop, []):
+        value = ((claim.get("mainsnak") or {}).get("datavalue") or {}).get("value")
+        if value is not None and claim.get("rank") != "deprecated":
+            values.append(value)
+    return values
+
+def entity_info(entity: Dict, info: Optional[Dict[str, object]] = None) -> Dict[str, object]:
+    """Add an entity's labels and P1843 vernaculars to a ``collect``-style record."""
+    info = info or empty_info()
+    info["qid"].add(entity.get("id", ""))
+    for lang, label in (entity.get("labels") or {}).items():
+        if label.get("value"):
+            info["label"].setdefault(lang, set()).add(label["value"])
+    for value in _claim_values(entity, "P1843"):
+        if isinstance(value, dict) and value.get("text"):
+            info["vern"].setdefault(value.get("language", ""), set()).add(value["text"])
+    return info
+
+def entity_names(entity: Dict) -> Set[str]:
+    return {v for v in _claim_values(entity, "P225") if isinstance(v, str)}
+
+def query_known(sess: requests.Session, known: Dict[str, Set[str]], langs: Sequence[str],
+                qid_cache: QidCache) -> Tuple[Dict[str, Dict[str, object]], List[str]]:
+    """Look up names with cached QIDs through wbgetentities.
+
+    Returns the results and the names that need SPARQL again: those whose
+    batch failed or whose items are gone or no longer carry the name as P225.
+    """
+    qids = sorted({q for values in known.values() for q in values})
+    entities: Dict[str, Dict] = {}
+    failed: Set[str] = set()
+    for start in range(0, len(qids), ENTITY_BATCH_SIZE):
+        group = qids[start:start + ENTITY_BATCH_SIZE]
+        eprint(f"Fetching {len(group)} Wikidata entities...")
+        got = fetch_entities(sess, group, langs)
+        if got is None:
+            failed.update(group)
+        else:
+            entities.update(got)
+
+    results: Dict[str, Dict[str, object]] = {}
+    stale: List[str] = []
+    for latin, values in known.items():
+        if values & failed:
+            stale.append(latin)
+            continue
+        matching = [entities[q] for q in sorted(values) if q in entities and latin in entity_names(entities[q])]
+        if len(matching) != len(values):
+            qid_cache.forget(latin)
+            stale.append(latin)
+            continue
+        info = empty_info()
+        for entity in matching:
+            entity_info(entity, info)
+        results[latin] = info
+    return results, stale
+
+# Results per (languages, scientific name) for this process: the per-language
+# pipeline stages share them, so each name is queried once. A name another
+# stage is querying right now is waited for through _in_flight (None = failed).
+# The lock only guards these two dicts; queries run outside it.
+MemoKey = Tuple[Tuple[str, ...], str]
+_memo: Dict[MemoKey, Dict[str, object]] = {}
+_in_flight: Dict[MemoKey, "Future[Optional[Dict[str, object]]]"] = {}
+_memo_lock = threading.Lock()
+
+# names -> {latin: collect()-style record}; online (lookup_names) or from a dump index
+Lookup = Callable[[List[str]], Dict[str, Dict[str, object]]]
+
+def lookup_names(sess: requests.Session, names: List[str], langs: Sequence[str], sizer: BatchSizer,
+                 concurrency: int = DEFAULT_CONCURRENCY) -> Dict[str, Dict[str, object]]:
+    key = tuple(langs)
+    out: Dict[str, Dict[str, object]] = {}
+    own: Dict[str, "Future[Optional[Dict[str, object]]]"] = {}
+    others: Dict[str, "Future[Optional[Dict[str, object]]]"] = {}
+    with _memo_lock:
+        for latin in dict.fromkeys(names):
+            if (key, latin) in _memo:
+                out[latin] = _memo[(key, latin)]
+            elif (key, latin) in _in_flight:
+                others[latin] = _in_flight[(key, latin)]
+            else:
+                own[latin] = _in_flight[(key, latin)] = Future()
+    try:
+        found = _query_missing(sess, list(own), langs, sizer, concurrency) if own else {}
+        with _memo_lock:
+            for latin, info in found.items():
+                _memo[(key, latin)] = info
+        for latin, future in own.items():
+            future.set_result(found.get(latin))
+    except BaseException as exc:
+        for future in own.values():
+            if not future.done():
+                future.set_exception(exc)
+        raise
+    finally:
+        with _memo_lock:
+            for latin in own:
+                del _in_flight[(key, latin)]
+    out.update(found)
+    for latin, future in others.items():
+        info = future.result()
+        if info is not None:
+            out[latin] = info
+    return out
+
+def _query_missing(sess: requests.Session, names: List[str], langs: Sequence[str], sizer: BatchSizer,
+                   concurrency: int) -> Dict[str, Dict[str, object]]:
+    """Cached QIDs through wbgetentities, everything else through SPARQL."""
+    qid_cache = get_qid_cache()
+    known = qid_cache.get(names)
+    found, stale = query_known(sess, known, langs, qid_cache) if known else ({}, [])
+    unknown = [latin for latin in names if latin not in known] + stale
+    if unknown:
+        resolved = query_names(sess, unknown, langs, sizer, concurrency)
+        for latin, info in resolved.items():
+            if info["qid"]:
+                qid_cache.put(latin, info["qid"])
+        found.update(resolved)
+    return found
+
 def read_csv_rows(path: str) -> Tuple[List[Dict[str, str]], List[str]]:
     with open(path, "r", encoding="utf-8-sig", newline="") as f:
         r = csv.DictReader(f)
@@ -137,55 +461,129 @@ def ensure_columns(fieldnames: List[str], sci_col: str, en_col: str) -> List[str
         f.append(en_col)
     return f
 
-def process_pass(sess: requests.Session, rows: List[Dict[str, str]], sci_col: str, en_col: str, batch_size: int) -> int:
+def parse_langs(value: str) -> Tuple[str, ...]:
+    langs = tuple(dict.fromkeys(x.strip().lower() for x in value.split(",") if x.strip()))
+    unknown = [x for x in langs if x not in SUPPORTED_LANGS]
+    if unknown or not langs:
+        raise ValueError(f"unsupported language(s) {unknown or value!r}; choose from {', '.join(SUPPORTED_LANGS)}")
+    return langs
+
+def process_pass(rows: Records, sci_col: str, col: str, lang: str, lookup: Lookup,
+                 found: Dict[int, str], on_update: Optional[UpdateCallback] = None,
+                 failed: Optional[Set[int]] = None) -> int:
+    """Fill ``found`` for rows still without a name; return how many were filled.
+
+    Rows whose name got no answer at all (its batches kept failing) are
+    collected in ``failed``.
+    """
     to_lookup: List[str] = []
     idx_map: Dict[str, List[int]] = {}
     for i, row in enumerate(rows):
         latin = (row.get(sci_col) or "").strip()
-        en_val = (row.get(en_col) or "").strip()
-        if latin and not en_val:
-            to_lookup.append(latin)
+        val = found.get(i) or (row.get(col) or "").strip()
+        if latin and not val:
+            if latin not in idx_map:
+                to_lookup.append(latin)
             idx_map.setdefault(latin, []).append(i)
 
     if not to_lookup:
         return 0
 
     filled = 0
-    for group in chunk(to_lookup, batch_size):
-        eprint(f"Querying Wikidata for {len(group)} names...")
-        data = collect(fetch_batch(sess, group))
-        for latin in group:
-            info = data.get(latin)
-            if not info:
-                continue
-            en_name = pick_en(info)
-            if not en_name:
-                continue
-            for i in idx_map.get(latin, []):
-                if not (rows[i].get(en_col) or "").strip():
-                    rows[i][en_col] = en_name
-                    filled += 1
-        time.sleep(SLEEP)
+    data = lookup(to_lookup)
+    if failed is not None:
+        failed.clear()
+        failed.update(i for latin in to_lookup if latin not in data for i in idx_map[latin])
+    for latin in to_lookup:
+        info = data.get(latin)
+        if not info:
+            continue
+        name = pick_name(info, lang)
+        if not name:
+            continue
+        for i in idx_map.get(latin, []):
+            if i not in found:
+                found[i] = name
+                if on_update:
+                    on_update(i, {col: name})
+                filled += 1
     return filled
 
-def main():
-    global SLEEP  # moved to the top of the function
+def collect_lang_updates(rows: Records, lang: str, sci_col: str = "sci", col: Optional[str] = None,
+                         langs: Sequence[str] = ("en",), batch_size: int = DEFAULT_BATCH_SIZE,
+                         passes: int = 2, sleep: float = SLEEP, concurrency: int = DEFAULT_CONCURRENCY,
+                         sess: Optional[requests.Session] = None,
+                         on_update: Optional[UpdateCallback] = None,
+                         dump_index: Optional[Path] = None) -> CellUpdates:
+    """Pipeline stage: return ``{row_index: {col: name}}`` for rows with an empty ``lang`` name.
+
+    ``langs`` are the languages asked for in each query; stages for different
+    languages with the same ``langs`` share the results. With ``dump_index``
+    (see ``wikidata_dump_index.py``) names come from that file and nothing is
+    sent over the network.
+    """
+    col = col or lang
+    langs = tuple(dict.fromkeys(tuple(langs) + (lang,)))
+    if dump_index is not None:
+        from wikidata_dump_index import DumpIndex
 
+        lookup: Lookup = partial(DumpIndex(dump_index).lookup, langs=langs)
+        passes = 1  # an offline answer does not change on a second pass
+    else:
+        get_limiter().configure(host_of(SPARQL_URL), interval=max(0.0, float(sleep)))
+        lookup = partial(lookup_names, sess or make_session(), langs=langs, sizer=BatchSizer(batch_size),
+                         concurrency=concurrency)
+    found: Dict[int, str] = {}
+    # the dump index simply has no entry for unknown names; online, a missing
+    # name means its batches failed
+    failed: Optional[Set[int]] = set() if dump_index is None else None
+    for p in range(1, max(1, passes) + 1):
+        filled = process_pass(rows, sci_col, col, lang, lookup, found, on_update, failed)
+        eprint(f"Pass {p} ({lang}): filled {filled} rows.")
+        # a pass that filled nothing only ends the run when no batch failed:
+        # rows lost to a transient outage get the remaining passes
+        if filled == 0 and not failed:
+            break
+    if failed:
+        eprint(f"{len(failed)} rows ({lang}) got no answer from Wikidata; try again later.")
+    return finish_updates({i: {col: name} for i, name in found.items()}, len(failed or ()))
+
+def collect_updates(rows: Records, sci_col: str = "sci", en_col: str = "en", batch_size: int = DEFAULT_BATCH_SIZE,
+                    passes: int = 2, sleep: float = SLEEP,
+                    sess: Optional[requests.Session] = None,
+                    on_update: Optional[UpdateCallback] = None,
+                    langs: Sequence[str] = ("en",), concurrency: int = DEFAULT_CONCURRENCY,
+                    dump_index: Optional[Path] = None) -> CellUpdates:
+    """Pipeline stage: return ``{row_index: {en_col: name}}`` for rows with an empty English name."""
+    return collect_lang_updates(rows, "en", sci_col, en_col, langs, batch_size, passes, sleep,
+                                concurrency, sess, on_update, dump_index)
+
+def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("csv_path", help="Path to plants.csv")
     ap.add_argument("--sci-col", default="sci", help="CSV column with scientific names")
     ap.add_argument("--en-col", default="en", help="CSV column to fill with English names")
-    ap.add_argument("--batch", type=int, default=DEFAULT_BATCH_SIZE, help="Batch size for SPARQL VALUES")
+    ap.add_argument("--batch", type=int, default=DEFAULT_BATCH_SIZE, help="Initial batch size for SPARQL VALUES; adapted to latency")
+    ap.add_argument("--langs", default="en", help="Comma-separated languages to query and fill (en,ru,nl); ru/nl fill columns of the same name")
+    ap.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="Batches queried at the same time")
+    ap.add_argument("--dump-index", type=Path, default=None,
+                    help="Answer from an index built by wikidata_dump_index.py instead of the network")
     ap.add_argument("--passes", type=int, default=2, help="Number of passes over still-empty cells")
-    ap.add_argument("--sleep", type=float, default=SLEEP, help="Pause between batches (seconds)")
+    ap.add_argument("--sleep", type=float, default=SLEEP, help="Initial pause between batches (seconds); adapted to server responses")
     ap.add_argument("--output", default=None, help="Write to a separate CSV instead of in-place update")
     ap.add_argument("--backup", action="store_true", help="Create .bak backup when writing in-place")
     args = ap.parse_args()
 
-    SLEEP = max(0.0, float(args.sleep))
+    try:
+        langs = parse_langs(args.langs)
+    except ValueError as ex:
+        raise SystemExit(str(ex))
 
     rows, fieldnames = read_csv_rows(args.csv_path)
     fieldnames = ensure_columns(fieldnames, args.sci_col, args.en_col)
+    for lang in langs:
+        if lang != "en" and lang not in fieldnames:
+            fieldnames.append(lang)
 
     if args.output:
         out_path = args.output
@@ -196,15 +594,13 @@ def main():
             shutil.copyfile(args.csv_path, bak)
             eprint(f"Backup created: {bak}")
 
-    sess = make_session()
-
+    sess = None if args.dump_index else make_session()
     total_filled = 0
-    for p in range(1, max(1, args.passes) + 1):
-        filled = process_pass(sess, rows, args.sci_col, args.en_col, args.batch)
-        total_filled += filled
-        eprint(f"Pass {p}: filled {filled} rows.")
-        if filled == 0:
-            break
+    for lang in langs:
+        col = args.en_col if lang == "en" else lang
+        updates = collect_lang_updates(rows, lang, args.sci_col, col, langs, args.batch, args.passes,
+                                       args.sleep, args.concurrency, sess, dump_index=args.dump_index)
+        total_filled += apply_updates(rows, updates)
 
     write_csv_rows(out_path, rows, fieldnames)
     eprint(f"Done. Wrote: {out_path}. Newly filled: {total_filled}. Rows total: {len(rows)}")